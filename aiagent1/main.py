@@ -4,12 +4,16 @@
 import os
 from agents import Agent, Runner, GuardrailFunctionOutput, InputGuardrailTripwireTriggered, OpenAIChatCompletionsModel, input_guardrail
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
-from openai.types.responses import ResponseTextDeltaEvent
 from pydantic import BaseModel
 from typing import Literal
 from openai import AsyncOpenAI
 from agents import set_tracing_export_api_key
 from agents.mcp.server import MCPServerStreamableHttp
+from mcp_pool import MCPServerPool
+from optimistic_guardrail import run_guarded
+from safety_cache import CachedSafetyClassifier
+from fast_router import Route, run_routed
+from stream_gateway import StreamGateway, write_frames
 
 # ============================================================
 # 環境設定：取得 OpenAI API 金鑰並建立客戶端
@@ -29,12 +33,16 @@ set_tracing_export_api_key(api_key)
 # ============================================================
 # MCP Server 設定：連接到外部的 MCP 伺服器
 # 用於提供工具函數（例如查詢庫存資料）
+# 以連線池維持多條暖連線，讓多個 Runner.run 可以同時呼叫工具
 # ============================================================
-mcp_server = MCPServerStreamableHttp(
-    params = {
-        "url": "https://savourless-mullishly-vanda.ngrok-free.dev/mcp"
-    },
-    cache_tools_list=True  # 快取工具列表以提升效能
+mcp_server = MCPServerPool(
+    lambda: MCPServerStreamableHttp(
+        params = {
+            "url": "https://savourless-mullishly-vanda.ngrok-free.dev/mcp"
+        },
+    ),
+    size=int(os.getenv("MCP_POOL_SIZE", "4")),  # 暖連線數量
+    cache_tools_list=True  # 快取工具列表以提升效能（整個連線池共用）
 )
 
 # ============================================================
@@ -96,6 +104,21 @@ guardrail_agent=Agent(
     output_type=SafetyCheckOutput  # 指定輸出格式為 SafetyCheckOutput
 )
 
+async def llm_safety_check(user_input, context):
+    """呼叫 guardrail_agent 審核，回傳 (審核結果, token 用量)"""
+    result = await Runner.run(guardrail_agent, user_input, context=context)
+    return result.final_output_as(SafetyCheckOutput), result.context_wrapper.usage
+
+# 判定快取 + 關鍵字前置分類器：重複的輸入與明確違規的輸入不必再呼叫 LLM
+# 價格為 gpt-4.1 每百萬 token 的美元價格，僅用於估算省下的費用
+safety_classifier = CachedSafetyClassifier(
+    llm_safety_check,
+    SafetyCheckOutput,
+    ttl=float(os.getenv("GUARDRAIL_CACHE_TTL", "600")),
+    input_price_per_m=2.0,
+    output_price_per_m=8.0,
+)
+
 # ============================================================
 # 輸入防護函數
 # 在使用者輸入傳遞給主要 Agent 之前，先進行安全檢查
@@ -106,14 +129,13 @@ async def safety_guardrail(ctx, agent, user_input):
     安全防護函數，用於檢查使用者輸入是否安全
 
     流程：
-    1. 將使用者輸入傳給 guardrail_agent 進行審核
+    1. 先查判定快取與關鍵字規則（只會攔截），其餘輸入交給 guardrail_agent 審核
     2. 取得審核結果（類別和是否應該攔截）
     3. 如果包含不當內容，觸發 tripwire 機制攔截請求
     4. 將判斷的類別資訊傳遞給後續處理
     """
     # 執行安全審核
-    result = await Runner.run(guardrail_agent, user_input, context=ctx.context)
-    verdict = result.final_output_as(SafetyCheckOutput)
+    verdict = await safety_classifier.classify(user_input, ctx.context)
 
     # 決定是否觸發 tripwire（熔斷機制）
     tripwire = verdict.should_block
@@ -144,6 +166,12 @@ gm_assistant = Agent (
     input_guardrails=[safety_guardrail]  # 套用輸入安全檢查
 )
 
+# 確定性路由表：防護判斷出的類別可直接對應到專業助手，省下總經理助手的交接回合
+ROUTES = [
+    Route("inventory", inventory_assistant),
+    Route("therapy", therapy_assistant),
+]
+
 
 # ============================================================
 # 主程式：執行多個測試案例
@@ -161,11 +189,13 @@ async def main():
     try:
         # ========================================
         # 測試 1: 查詢庫存
-        # 總經理助手會將此請求轉交給庫存小幫手
+        # 安全檢查判定為 inventory，run_routed 直接交給庫存小幫手，
+        # 不必再讓總經理助手花一個回合決定交接
         # ========================================
-        result = await Runner.run(
+        result = await run_routed(
             gm_assistant,
             input="洋芋片還有多少庫存",
+            routes=ROUTES,
         )
         print(f"Response: {result.final_output}")
 
@@ -175,17 +205,15 @@ async def main():
         # ========================================
         result = Runner.run_streamed(gm_assistant, input="我好痛苦，請幫我解決人生難題")
 
-        # 逐字輸出串流回應
-        async for event in result.stream_events():
-            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
-                print(event.data.delta, end="", flush=True)
+        # 串流回應合併成訊框後輸出（每個訊框一次寫入，而不是每個 token 一次）
+        await write_frames(StreamGateway(result).subscribe())
 
         # ========================================
         # 測試 3: 不當請求測試
-        # 此請求會被 safety_guardrail 判定為違規並攔截
+        # 此請求會被 safety_guardrail 判定為違規並攔截（run_guarded：判定前不會執行交接或工具）
         # ========================================
         try:
-            result = await Runner.run(
+            result = await run_guarded(
                 gm_assistant,
                 input="我想要做偏門生意，請幫我想個好方法",
             )
@@ -194,6 +222,8 @@ async def main():
             # 捕捉安全防護觸發的異常
             print("Response: 你的輸入不合格!!")
     finally:
+        # 安全審核略過 LLM 的比例與估算節省量
+        print(f"[Guardrail] {safety_classifier.stats.summary()}")
         # 清理 MCP Server 連線
         await mcp_server.cleanup()
 
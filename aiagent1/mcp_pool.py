@@ -0,0 +1,292 @@
+"""
+MCP 連線池
+
+單一 MCPServerStreamableHttp 只有一條 MCP session，
+多個 Runner.run 同時呼叫工具時全部擠在同一條連線上，
+連線斷掉後也不會自動重連。
+
+MCPServerPool 本身實作 agents 的 MCPServer 介面，可以直接放進 Agent(mcp_servers=[...])：
+1. 啟動時預先建立 size 條暖連線（warm session）
+2. call_tool 挑目前進行中請求最少的健康連線，傳輸層失敗（連線關閉、中斷）時標記該連線並重連；
+   只有請求還沒寫出就失敗（session 的寫入串流已關閉）才換一條連線重試，
+   請求送出後才斷線時伺服器可能已經執行過工具，除非該工具列在 idempotent_tools，否則直接拋出；
+   list_tools / list_prompts / get_prompt 不會改變狀態，傳輸層失敗一律重試。
+   工具本身回報的錯誤（McpError、參數錯誤等）直接拋給呼叫端，不會拆掉健康的連線，也不會重跑工具
+3. 每條連線由專屬的背景 task 管理：定期 ping 做健康檢查，失敗就自動重連
+   （connect 與 cleanup 在同一個 task 內執行，符合 anyio cancel scope 的限制）
+4. 工具清單在整個連線池共用一份快取
+
+用法：
+    pool = MCPServerPool(
+        lambda: MCPServerStreamableHttp(params={"url": "..."}),
+        size=4,
+    )
+    await pool.connect()
+    ...
+    await pool.cleanup()
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, List, Optional
+
+import anyio
+import httpx
+from agents.mcp.server import MCPServer
+from agents.logger import logger
+from mcp import Tool as MCPTool
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult, GetPromptResult, ListPromptsResult
+
+# 代表連線本身已經不能用的例外
+_TRANSPORT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    EOFError,
+    httpx.TransportError,
+)
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """連線關閉或中斷時為 True；工具或參數錯誤等應用層錯誤為 False"""
+    if isinstance(error, BaseExceptionGroup):
+        return all(is_transport_error(inner) for inner in error.exceptions)
+    if isinstance(error, McpError):
+        # session 的讀取串流結束時，進行中的請求會收到 CONNECTION_CLOSED
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+# session 的寫入串流已經關閉：請求還沒寫出，伺服器不可能收到
+_UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+def is_unsent_error(error: BaseException) -> bool:
+    """請求還沒送出就失敗時為 True（重試不會讓工具執行兩次）"""
+    if isinstance(error, BaseExceptionGroup):
+        return all(is_unsent_error(inner) for inner in error.exceptions)
+    return isinstance(error, _UNSENT_ERRORS)
+
+
+@dataclass
+class _Slot:
+    """連線池中的一個位置：目前的連線、進行中請求數與狀態事件"""
+    index: int
+    server: Optional[MCPServer] = None
+    inflight: int = 0
+    healthy: asyncio.Event = field(default_factory=asyncio.Event)
+    broken: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+class MCPServerPool(MCPServer):
+    """以多條暖連線分擔工具呼叫的 MCP server，具備健康檢查與自動重連"""
+
+    def __init__(
+            self,
+            factory: Callable[[], MCPServer],
+            size: int = 4,
+            cache_tools_list: bool = True,
+            health_check_interval: float = 30.0,
+            health_check_timeout: float = 5.0,
+            acquire_timeout: float = 10.0,
+            max_attempts: int = 3,
+            reconnect_backoff: float = 1.0,
+            name: Optional[str] = None,
+            use_structured_content: bool = False,
+            idempotent_tools: Collection[str] = (),
+    ):
+        """
+        參數：
+            factory: 建立單一連線的函式，例如 lambda: MCPServerStreamableHttp(...)
+            size: 暖連線數量
+            cache_tools_list: 是否快取工具清單（整個連線池共用；使用動態 tool_filter 時請設為 False）
+            health_check_interval: 閒置時多久 ping 一次（秒）
+            health_check_timeout: ping 的逾時（秒）
+            acquire_timeout: 沒有健康連線時最多等待多久（秒）
+            max_attempts: 傳輸層失敗時，同一次呼叫最多嘗試幾條連線
+            idempotent_tools: 重複執行也安全的工具名稱；請求送出後才斷線時也會換一條連線重試
+            reconnect_backoff: 重連失敗後的基本等待時間，之後指數增加（秒）
+        """
+        super().__init__(use_structured_content=use_structured_content)
+        self._factory = factory
+        self._slots = [_Slot(index=i) for i in range(size)]
+        self._cache_tools_list = cache_tools_list
+        self._tools_list: Optional[List[MCPTool]] = None
+        self._health_check_interval = health_check_interval
+        self._health_check_timeout = health_check_timeout
+        self._acquire_timeout = acquire_timeout
+        self._max_attempts = max_attempts
+        self._reconnect_backoff = reconnect_backoff
+        self._name = name
+        self._idempotent_tools = frozenset(idempotent_tools)
+        self._closing = False
+        self._available = asyncio.Condition()
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            sample = self._slots[0].server or self._factory()
+            self._name = f"pool[{len(self._slots)}]: {sample.name}"
+        return self._name
+
+    # ========================================================
+    # 連線生命週期
+    # ========================================================
+    async def connect(self):
+        """啟動所有連線的背景 task，等到每條都嘗試過第一次連線"""
+        self._closing = False
+        first_attempts = []
+        for slot in self._slots:
+            attempted = asyncio.Event()
+            first_attempts.append(attempted)
+            slot.task = asyncio.create_task(self._supervise(slot, attempted))
+        await asyncio.gather(*(attempted.wait() for attempted in first_attempts))
+        if not any(slot.healthy.is_set() for slot in self._slots):
+            await self.cleanup()
+            raise RuntimeError(f"Could not open any MCP session for {self.name}")
+
+    async def cleanup(self):
+        """通知所有背景 task 關閉連線並等待結束"""
+        self._closing = True
+        for slot in self._slots:
+            slot.broken.set()
+        await asyncio.gather(*(slot.task for slot in self._slots if slot.task), return_exceptions=True)
+        for slot in self._slots:
+            slot.task = None
+
+    async def _supervise(self, slot: _Slot, attempted: asyncio.Event) -> None:
+        """單一連線的背景 task：連線、健康檢查、失敗時重連"""
+        failures = 0
+        while not self._closing:
+            server = self._factory()
+            try:
+                await server.connect()
+            except Exception as e:
+                attempted.set()
+                failures += 1
+                logger.warning(f"MCP pool slot {slot.index} failed to connect: {e}")
+                # 以 broken 事件等待退避時間，cleanup 時可以立即中斷
+                slot.broken.clear()
+                if self._closing:
+                    break
+                try:
+                    delay = min(self._reconnect_backoff * 2 ** (failures - 1), 60)
+                    await asyncio.wait_for(slot.broken.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            failures = 0
+            slot.server = server
+            slot.broken.clear()
+            slot.healthy.set()
+            attempted.set()
+            async with self._available:
+                self._available.notify_all()
+
+            # 連線正常時定期 ping；被標記為壞掉或 ping 失敗就離開迴圈重連
+            while not slot.broken.is_set():
+                try:
+                    await asyncio.wait_for(slot.broken.wait(), self._health_check_interval)
+                except asyncio.TimeoutError:
+                    if slot.inflight == 0 and not await self._ping(server):
+                        logger.warning(f"MCP pool slot {slot.index} failed health check")
+                        slot.broken.set()
+
+            slot.healthy.clear()
+            slot.server = None
+            await server.cleanup()
+
+    async def _ping(self, server: MCPServer) -> bool:
+        session = getattr(server, "session", None)
+        if session is None:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), self._health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    # ========================================================
+    # 取得連線
+    # ========================================================
+    async def _acquire(self) -> _Slot:
+        """挑選進行中請求最少的健康連線並占用它（inflight + 1）；暫時沒有時等待重連"""
+        async def pick() -> _Slot:
+            async with self._available:
+                while True:
+                    candidates = [
+                        slot for slot in self._slots
+                        if slot.healthy.is_set() and slot.server is not None
+                    ]
+                    if candidates:
+                        # 在挑選的同時占用，同時到達的呼叫才會看到彼此、分散到不同連線
+                        slot = min(candidates, key=lambda slot: slot.inflight)
+                        slot.inflight += 1
+                        return slot
+                    if self._closing:
+                        raise RuntimeError(f"{self.name} is closed")
+                    await self._available.wait()
+
+        return await asyncio.wait_for(pick(), self._acquire_timeout)
+
+    async def _with_session(self, operation: Callable[[MCPServer], Any], retry_sent: bool = True) -> Any:
+        """
+        在一條連線上執行操作；傳輸層失敗時標記該連線並改用另一條（或等它重連），其他錯誤直接拋出
+
+        參數：
+            retry_sent: 請求送出後才斷線時是否也重試（操作不可重複執行時設為 False，只重試還沒送出的請求）
+        """
+        attempts = 0
+        while True:
+            slot = await self._acquire()
+            server = slot.server
+            try:
+                return await operation(server)
+            except Exception as e:
+                if not is_transport_error(e):
+                    raise
+                attempts += 1
+                if slot.server is server:
+                    slot.healthy.clear()
+                    slot.broken.set()
+                if attempts >= self._max_attempts or not (retry_sent or is_unsent_error(e)):
+                    raise
+            finally:
+                slot.inflight -= 1
+
+    # ========================================================
+    # MCPServer 介面
+    # ========================================================
+    async def list_tools(self, run_context=None, agent=None) -> List[MCPTool]:
+        if self._cache_tools_list and self._tools_list is not None:
+            return self._tools_list
+        tools = await self._with_session(lambda server: server.list_tools(run_context, agent))
+        if self._cache_tools_list:
+            self._tools_list = tools
+        return tools
+
+    def invalidate_tools_cache(self):
+        self._tools_list = None
+
+    async def call_tool(self, tool_name: str, arguments: Optional[dict]) -> CallToolResult:
+        return await self._with_session(
+            lambda server: server.call_tool(tool_name, arguments),
+            retry_sent=tool_name in self._idempotent_tools,
+        )
+
+    async def list_prompts(self) -> ListPromptsResult:
+        return await self._with_session(lambda server: server.list_prompts())
+
+    async def get_prompt(self, name: str, arguments: Optional[dict] = None) -> GetPromptResult:
+        return await self._with_session(lambda server: server.get_prompt(name, arguments))
+
+    def stats(self) -> List[dict]:
+        """各連線目前的狀態，方便觀察負載是否平均"""
+        return [
+            {"slot": slot.index, "healthy": slot.healthy.is_set(), "inflight": slot.inflight}
+            for slot in self._slots
+        ]
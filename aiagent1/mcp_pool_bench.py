@@ -0,0 +1,175 @@
+"""
+MCP 連線池驗證與量測（使用本機假 MCP server，不需要網路）
+
+FakeMCPServer 模擬一條 MCP 連線：每次工具呼叫固定延遲，同一條連線一次只處理一個請求，
+並可指定下一次呼叫以哪種方式失敗。依序檢查：
+1. 平行呼叫分散到多條連線，比較連線池大小 1 與 size 的耗時
+2. 請求還沒送出就斷線：換一條連線重試，工具只執行一次
+3. 請求送出後才斷線：一般工具直接拋出（不會執行第二次），idempotent_tools 中的工具會重試
+4. 工具本身回報的錯誤：直接拋出，不會重試也不會拆掉健康的連線
+5. 斷線的連線由背景 task 自動重連
+
+用法：
+    uv run python mcp_pool_bench.py --calls 200 --latency-ms 20 --size 4
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List, Optional
+
+import anyio
+from agents.mcp.server import MCPServer
+from mcp import Tool as MCPTool
+from mcp.shared.exceptions import McpError
+from mcp.types import (
+    CONNECTION_CLOSED, INVALID_PARAMS, CallToolResult, ErrorData, GetPromptResult, ListPromptsResult, TextContent,
+)
+
+from mcp_pool import MCPServerPool
+
+
+class FakeBackend:
+    """所有假連線共用的狀態：工具實際執行次數、建立過的連線數、預先排定的失敗"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.executions: Counter = Counter()
+        self.connections = 0
+        self.failures: List[str] = []
+
+
+class FakeMCPServer(MCPServer):
+    """
+    假的單一 MCP 連線
+
+    failures 依序決定接下來的呼叫如何失敗：
+        "unsent": 寫入串流已關閉，請求沒有送出（ClosedResourceError）
+        "sent": 伺服器執行完工具後連線中斷（McpError CONNECTION_CLOSED）
+        "tool": 工具回報參數錯誤（McpError INVALID_PARAMS），連線仍然正常
+    """
+
+    def __init__(self, backend: FakeBackend):
+        super().__init__()
+        self._backend = backend
+        self._lock = asyncio.Lock()
+        self.closed = False
+        self.session = self  # MCPServerPool 以 session.send_ping() 做健康檢查
+
+    @property
+    def name(self) -> str:
+        return "fake-mcp"
+
+    async def connect(self):
+        self._backend.connections += 1
+
+    async def cleanup(self):
+        self.closed = True
+
+    async def send_ping(self):
+        if self.closed:
+            raise anyio.ClosedResourceError()
+
+    async def list_tools(self, run_context=None, agent=None) -> List[MCPTool]:
+        return [MCPTool(name="get_stock", inputSchema={"type": "object"})]
+
+    async def call_tool(self, tool_name: str, arguments: Optional[dict]) -> CallToolResult:
+        if self.closed:
+            raise anyio.ClosedResourceError()
+        failure = self._backend.failures.pop(0) if self._backend.failures else None
+        if failure == "unsent":
+            self.closed = True
+            raise anyio.ClosedResourceError()
+        async with self._lock:
+            await asyncio.sleep(self._backend.latency)
+            self._backend.executions[tool_name] += 1
+        if failure == "sent":
+            self.closed = True
+            raise McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed"))
+        if failure == "tool":
+            raise McpError(ErrorData(code=INVALID_PARAMS, message="unknown branch"))
+        return CallToolResult(content=[TextContent(type="text", text="30")])
+
+    async def list_prompts(self) -> ListPromptsResult:
+        return ListPromptsResult(prompts=[])
+
+    async def get_prompt(self, name: str, arguments: Optional[dict] = None) -> GetPromptResult:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"unknown prompt {name}"))
+
+
+def make_pool(backend: FakeBackend, size: int) -> MCPServerPool:
+    return MCPServerPool(
+        lambda: FakeMCPServer(backend),
+        size=size,
+        health_check_interval=0.05,
+        reconnect_backoff=0.01,
+        idempotent_tools={"get_stock"},
+    )
+
+
+async def call(pool: MCPServerPool, tool_name: str) -> str:
+    try:
+        await pool.call_tool(tool_name, {"branch": "台北"})
+        return "ok"
+    except Exception as e:
+        return type(e).__name__
+
+
+async def run(args: argparse.Namespace) -> None:
+    latency = args.latency_ms / 1000
+    print(f"calls={args.calls}  latency={args.latency_ms}ms  (fake server handles one request per connection at a time)")
+
+    # 1. 負載分散
+    for size in (1, args.size):
+        backend = FakeBackend(latency)
+        pool = make_pool(backend, size)
+        await pool.connect()
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.call_tool("get_stock", {}) for _ in range(args.calls)))
+        print(f"pool size={size:<3} seconds={time.perf_counter() - started:.2f}")
+        await pool.cleanup()
+
+    backend = FakeBackend(latency)
+    pool = make_pool(backend, args.size)
+    await pool.connect()
+
+    # 2. 請求還沒送出就斷線
+    backend.executions.clear()
+    backend.failures = ["unsent"]
+    result = await call(pool, "update_stock")
+    print(f"unsent failure, non-idempotent tool: result={result} executions={backend.executions['update_stock']}")
+
+    # 3. 請求送出後才斷線
+    backend.executions.clear()
+    backend.failures = ["sent"]
+    result = await call(pool, "update_stock")
+    print(f"sent failure,   non-idempotent tool: result={result} executions={backend.executions['update_stock']}")
+    backend.failures = ["sent"]
+    result = await call(pool, "get_stock")
+    print(f"sent failure,   idempotent tool:     result={result} executions={backend.executions['get_stock']}")
+
+    # 4. 工具錯誤
+    healthy_before = sum(slot["healthy"] for slot in pool.stats())
+    backend.executions.clear()
+    backend.failures = ["tool"]
+    result = await call(pool, "get_stock")
+    healthy_after = sum(slot["healthy"] for slot in pool.stats())
+    print(
+        f"tool error:                          result={result} executions={backend.executions['get_stock']} "
+        f"healthy slots {healthy_before} -> {healthy_after}"
+    )
+
+    # 5. 自動重連
+    await asyncio.sleep(0.2)
+    healthy = sum(slot["healthy"] for slot in pool.stats())
+    print(f"after reconnect: healthy slots={healthy}/{args.size} connections opened={backend.connections}")
+    await pool.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MCP connection pool checks with a fake MCP server")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--size", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,137 @@
+"""
+輸入防護判定前不執行工具與交接（gated input guardrail）
+
+openai-agents 的 Runner.run 已經讓 run_in_parallel=True（預設）的輸入防護與第一個回合同時執行，
+延遲本來就是「防護、第一回合取大者」。但第一個回合包含工具呼叫與交接：
+防護還沒判定完，模型要求的工具可能已經執行；觸發 tripwire 時，第一回合也不會被取消。
+
+run_guarded() 保持同樣的並行，另外：
+1. 以 _VerdictGate 讓工具呼叫與交接（handoff）等到防護判定通過才執行
+2. 觸發 tripwire 時立即取消主要 Agent 並丟棄其輸出
+3. 可選的 reroute 依防護結果改由其他 Agent 處理（例如 fast_router 的確定性路由）：
+   主要 Agent 的回合同樣被取消，它的工具與交接因為還沒放行而不會執行
+
+觸發 tripwire 時同樣拋出 InputGuardrailTripwireTriggered，呼叫端的錯誤處理不需要改變。
+需要完全循序（判定完才呼叫模型）時，改用 @input_guardrail(run_in_parallel=False) 即可。
+
+用法：
+    result = await run_guarded(gm_agent, "台北店洋芋片還有多少?")
+"""
+
+import asyncio
+from typing import Any, Callable, List, Optional
+
+from agents import (
+    Agent,
+    InputGuardrailTripwireTriggered,
+    RunContextWrapper,
+    RunHooks,
+    Runner,
+    RunResult,
+)
+from agents.guardrail import InputGuardrail, InputGuardrailResult
+from agents.tracing import guardrail_span
+
+class _VerdictGate(RunHooks):
+    """
+    在有副作用的步驟（工具、交接）前等待防護結果的 RunHooks
+
+    其餘事件原封不動轉給呼叫端提供的 hooks。
+    """
+
+    def __init__(self, verdict: asyncio.Future, inner: Optional[RunHooks]):
+        self._verdict = verdict
+        self._inner = inner or RunHooks()
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        await self._inner.on_llm_start(context, agent, system_prompt, input_items)
+
+    async def on_llm_end(self, context, agent, response):
+        await self._inner.on_llm_end(context, agent, response)
+
+    async def on_agent_start(self, context, agent):
+        await self._inner.on_agent_start(context, agent)
+
+    async def on_agent_end(self, context, agent, output):
+        await self._inner.on_agent_end(context, agent, output)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        await asyncio.shield(self._verdict)
+        await self._inner.on_handoff(context, from_agent, to_agent)
+
+    async def on_tool_start(self, context, agent, tool):
+        await asyncio.shield(self._verdict)
+        await self._inner.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        await self._inner.on_tool_end(context, agent, tool, result)
+
+
+async def _run_guardrail(
+        guardrail: InputGuardrail, agent: Agent, input: Any, wrapper: RunContextWrapper,
+) -> InputGuardrailResult:
+    # 與 Runner 內建的防護一樣產生 guardrail span，追蹤紀錄才看得到防護所花的時間
+    with guardrail_span(guardrail.get_name()) as span:
+        result = await guardrail.run(agent, input, wrapper)
+        span.span_data.triggered = result.output.tripwire_triggered
+        return result
+
+
+async def check_input(agent: Agent, input: Any, context: Any = None) -> List[InputGuardrailResult]:
+    """同時執行 agent 的所有輸入防護，任一觸發 tripwire 即拋出例外"""
+    wrapper = RunContextWrapper(context=context)
+    results = await asyncio.gather(*(
+        _run_guardrail(guardrail, agent, input, wrapper) for guardrail in agent.input_guardrails
+    ))
+    for result in results:
+        if result.output.tripwire_triggered:
+            raise InputGuardrailTripwireTriggered(result)
+    return list(results)
+
+
+async def run_guarded(
+        agent: Agent,
+        input: Any,
+        *,
+        hooks: Optional[RunHooks] = None,
+        reroute: Optional[Callable[[List[InputGuardrailResult]], Optional[Agent]]] = None,
+        **kwargs: Any,
+) -> RunResult:
+    """
+    與 Runner.run 相同，但工具與交接要等輸入防護判定通過才執行
+
+    參數：
+        agent: 設有 input_guardrails 的入口 Agent
+        input: 使用者輸入
+        hooks, **kwargs: 原樣傳給 Runner.run
+        reroute: 防護通過後呼叫；回傳 Agent 時取消 agent 的回合，改由該 Agent 處理（不再執行防護）
+
+    返回：
+        RunResult，其 input_guardrail_results 含有防護結果（例如 category）
+    """
+    if not agent.input_guardrails:
+        return await Runner.run(agent, input, hooks=hooks, **kwargs)
+
+    # 防護由這裡執行，避免 Runner 再跑一次
+    unguarded = agent.clone(input_guardrails=[])
+    verdict: asyncio.Future = asyncio.get_running_loop().create_future()
+    main_turn = asyncio.create_task(
+        Runner.run(unguarded, input, hooks=_VerdictGate(verdict, hooks), **kwargs)
+    )
+    try:
+        guardrail_results = await check_input(agent, input, kwargs.get("context"))
+    except BaseException:
+        # tripwire（或防護本身失敗）：取消主要 Agent，丟棄它已產生的任何輸出
+        main_turn.cancel()
+        await asyncio.gather(main_turn, return_exceptions=True)
+        raise
+    target = reroute(guardrail_results) if reroute is not None else None
+    if target is not None:
+        main_turn.cancel()
+        await asyncio.gather(main_turn, return_exceptions=True)
+        result = await Runner.run(target, input, hooks=hooks, **kwargs)
+    else:
+        verdict.set_result(guardrail_results)
+        result = await main_turn
+    result.input_guardrail_results = guardrail_results + result.input_guardrail_results
+    return result
@@ -0,0 +1,122 @@
+"""
+非阻塞的稽核事件輸出（audit sink）
+
+AuditHooks 原本在每次工具開始、結束與交接時直接 print（包含完整的工具結果），
+請求量一大，同步寫 stdout 會卡住 event loop，拖慢所有代理。
+
+AuditSink 改為：
+1. emit() 只把事件放進記憶體中的環形緩衝區（deque），不做任何 I/O
+2. 背景 task 每 flush_interval 秒（或累積 batch_size 筆）把事件批次寫入 JSONL，
+   實際寫檔在 thread pool 中執行，不佔用 event loop
+3. 緩衝區滿了（寫入跟不上）就丟棄最舊的事件並計數，不會無限制佔用記憶體
+4. 每個事件可帶 duration_ms，summary() 彙整各階段（工具、交接）的次數與延遲
+
+用法：
+    sink = AuditSink("audit.jsonl")
+    sink.emit("tool_end", agent="...", tool="...", duration_ms=12.3)
+    await sink.close()   # 程式結束前寫出剩餘事件
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Union
+
+
+class AuditSink:
+    """以環形緩衝區與背景批次寫入收集稽核事件"""
+
+    def __init__(
+            self,
+            path: Union[str, Path],
+            capacity: int = 10_000,
+            batch_size: int = 256,
+            flush_interval: float = 1.0,
+    ):
+        """
+        參數：
+            path: JSONL 輸出檔
+            capacity: 緩衝區最多保留幾筆尚未寫出的事件
+            batch_size: 累積多少筆就提早寫出
+            flush_interval: 最長多久寫出一次（秒）
+        """
+        self._path = Path(path)
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closing = False
+        self._stages: Dict[str, List[float]] = {}  # stage -> [次數, 總延遲, 最大延遲]
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """記錄一個事件（不做 I/O，可在任何 hook 中呼叫）"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append({"ts": time.time(), "event": event, **fields})
+        self.emitted += 1
+
+        duration = fields.get("duration_ms")
+        if duration is not None:
+            stage = f"{event}:{fields.get('tool') or fields.get('to_agent') or fields.get('agent', '')}"
+            stats = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+        self._ensure_writer()
+        if len(self._buffer) >= self._batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None or self._closing:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 沒有 event loop 時先累積在緩衝區，close() 時再寫出
+        self._wakeup = asyncio.Event()
+        self._writer = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """把緩衝區中的事件寫入檔案"""
+        if not self._buffer:
+            return
+        batch = [self._buffer.popleft() for _ in range(len(self._buffer))]
+        lines = "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in batch)
+        await asyncio.to_thread(self._append, lines)
+        self.written += len(batch)
+
+    def _append(self, lines: str) -> None:
+        with self._path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def close(self) -> None:
+        """停止背景寫入並寫出剩餘事件"""
+        self._closing = True
+        if self._writer is not None:
+            self._wakeup.set()
+            await self._writer
+            self._writer = None
+        await self.flush()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各階段的次數、平均與最大延遲（毫秒）"""
+        return {
+            stage: {"count": count, "avg_ms": round(total / count, 1), "max_ms": round(peak, 1)}
+            for stage, (count, total, peak) in self._stages.items()
+        }
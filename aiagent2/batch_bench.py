@@ -0,0 +1,159 @@
+"""
+批次執行器吞吐量量測（使用本機模擬模型伺服器，不需要 API 金鑰）
+
+在背景執行緒啟動一個相容 OpenAI Chat Completions API 的模擬伺服器（固定延遲），
+讓 gm_agent、分店助手（OpenAIChatCompletionsModel）與心理諮商助手（Gemini 候選模型改以 LiteLLM 連到同一個伺服器）
+都透過 ModelScheduler 與真正的 HTTP 呼叫執行，再以不同的 concurrency 跑同一批問題，比較吞吐量與延遲。
+最後以同一個輸出檔重跑一次，確認已完成的問題會被略過（checkpoint / resume）。
+
+用法：
+    uv run python batch_bench.py --questions 200 --latency-ms 200 --concurrency 1 8 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+# ============================================================
+# 模擬的 OpenAI Chat Completions 伺服器
+# ============================================================
+def _fill(schema: dict, defs: dict):
+    """依 JSON Schema 產生最簡單的合法值（供結構化輸出使用）"""
+    if "$ref" in schema:
+        return _fill(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _fill(schema["anyOf"][0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _fill(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    if kind == "boolean":
+        return False
+    if kind in ("integer", "number"):
+        return 0
+    return "ok"
+
+
+def mock_app(latency: float) -> Starlette:
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        await asyncio.sleep(latency)
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            value = _fill(schema, schema.get("$defs", {}))
+            # 安全審核把心理支持的問題分類為 therapy，讓路由交給心理諮商助手（therapy 等級）
+            if "category" in value and "壓力" in json.dumps(body.get("messages", []), ensure_ascii=False):
+                value["category"] = "therapy"
+            content = json.dumps(value)
+        else:
+            content = "模擬回覆"
+        prompt_tokens = len(json.dumps(body.get("messages", []), ensure_ascii=False)) // 4
+        return JSONResponse({
+            "id": f"chatcmpl-mock-{time.monotonic_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 8, "total_tokens": prompt_tokens + 8},
+        })
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/chat/completions", chat_completions, methods=["POST"]),
+    ])
+
+
+def start_mock_server(latency: float) -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock_app(latency), port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+# ============================================================
+# 量測
+# ============================================================
+def questions(count: int) -> list:
+    """混合問題：指定分店的庫存（直接路由）、一般問題（審核 + gm_agent）、心理支持（LiteLLM）"""
+    templates = ["台北店洋芋片還有多少? #{i}", "第 {i} 號問題：請介紹你們的會員制度", "最近壓力好大 #{i}"]
+    return [templates[i % len(templates)].format(i=i) for i in range(count)]
+
+
+async def run(args: argparse.Namespace, base_url: str) -> None:
+    from agents import set_tracing_disabled
+
+    import main
+    from batch_runner import BatchItem, run_batch_to_file
+    from fast_router import run_routed
+
+    set_tracing_disabled(True)
+    # Gemini 候選模型改以 LiteLLM 的 OpenAI 相容介面連到模擬伺服器：仍經過 therapy 等級的排程與統計，
+    # 也仍計入 litellm 的速率限制
+    main.gemini_option.model = main.provider_clients.litellm_model("openai/mock", api_key="stub", base_url=base_url)
+
+    def run_one(user_input, hooks):
+        return run_routed(main.gm_agent, user_input, main.ROUTES, hooks=hooks)
+
+    await main.provider_clients.start(warmup=False)
+
+    items = [BatchItem(id=str(i), input=text) for i, text in enumerate(questions(args.questions))]
+    rate_limits = {"openai": args.openai_rpm, "litellm": args.litellm_rpm}
+    print(f"questions={len(items)}  model latency={args.latency_ms}ms  rate limits={rate_limits}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            main.safety_classifier.clear()  # 每輪重新審核，避免沿用上一輪的判定快取
+            output = Path(tmp) / f"results-{concurrency}.jsonl"
+            summary = await run_batch_to_file(
+                run_one, items, output, concurrency=concurrency, rate_limits=rate_limits,
+            )
+            print(f"concurrency={concurrency:<4} {json.dumps(summary)}")
+
+        resumed = await run_batch_to_file(run_one, items, output, concurrency=args.concurrency[-1])
+        print(f"resume (same output file): processed={resumed['processed']} skipped={resumed['skipped']}")
+
+    print(f"connections: {json.dumps(main.provider_clients.metrics())}")
+    print(f"models: {json.dumps(main.model_scheduler.stats())}")
+    await main.provider_clients.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch runner throughput benchmark against a local mock model server")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--openai-rpm", type=float, default=6000)
+    parser.add_argument("--litellm-rpm", type=float, default=600)
+    args = parser.parse_args()
+
+    base_url = start_mock_server(args.latency_ms / 1000)
+    # main.py 的 OpenAI client（ProviderClients）在載入時建立，需先指向模擬伺服器
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    asyncio.run(run(args, base_url))
@@ -0,0 +1,256 @@
+"""
+批次查詢執行器
+
+一次處理大量問題（例如每晚數千筆）時：
+1. 以 concurrency 限制同時進行的 Runner.run 數量，避免一次開出數千個請求
+2. 依模型提供者（OpenAI、LiteLLM/Gemini）分別限制每分鐘的模型呼叫數；
+   在每次模型呼叫前（RunHooks.on_llm_start）取得額度，交接後換成另一個提供者也會正確計算；
+   分級模型（ScheduledModel）則在呼叫每個候選模型前才取得額度，備援到另一個提供者時計入該提供者；
+   輸入防護等巢狀的 Runner.run 以 current_hooks() 取得同一組 hooks，它們的模型呼叫也會計入
+3. 每完成一筆就以 JSONL 追加寫入輸出檔，同一個檔案也是 checkpoint：
+   重新執行時略過已成功的 id，只補跑尚未完成或失敗的問題
+
+輸入檔每行一筆，可以是 JSON（{"id": ..., "input": ...}）或純文字（以行號為 id）。
+
+用法：
+    uv run python batch_runner.py questions.jsonl results.jsonl --concurrency 16 --openai-rpm 500 --litellm-rpm 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from agents import InputGuardrailTripwireTriggered, RunHooks, RunResult
+
+from model_scheduler import ScheduledModel, before_model_call
+
+
+# ============================================================
+# 每個提供者的速率限制
+# ============================================================
+class RateLimiter:
+    """Token bucket：每分鐘 per_minute 次，最多累積 burst 次"""
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None):
+        self._rate = per_minute / 60
+        self._capacity = burst or max(1, int(self._rate))
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # 持有 lock 等待，讓等待者依序取得額度
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+def provider_of(model: Any) -> str:
+    """依實際呼叫的模型判斷提供者名稱"""
+    is_litellm = any(cls.__name__ == "LitellmModel" for cls in type(model).__mro__)
+    return "litellm" if is_litellm else "openai"
+
+
+# 目前批次項目的 hooks；每個項目在自己的 task 中設定，不會互相影響
+_current_hooks: ContextVar[Optional[RunHooks]] = ContextVar("batch_hooks", default=None)
+
+
+def current_hooks() -> Optional[RunHooks]:
+    """
+    目前批次項目的 RunHooks（不在批次中時為 None）
+
+    在 run() 內另外呼叫的 Runner.run（例如輸入防護的 guardrail_agent）傳入 hooks=current_hooks()，
+    它的模型呼叫才會取得速率限制的額度。
+    """
+    return _current_hooks.get()
+
+
+class _RateLimitHooks(RunHooks):
+    """在每次模型呼叫前向對應提供者的 RateLimiter 取得額度"""
+
+    def __init__(self, limiters: Dict[str, RateLimiter]):
+        self._limiters = limiters
+        self.llm_calls = 0
+
+    async def acquire(self, model: Any) -> None:
+        self.llm_calls += 1
+        limiter = self._limiters.get(provider_of(model))
+        if limiter is not None:
+            await limiter.acquire()
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        # 分級模型要到挑選候選模型時才知道提供者，由 before_model_call 取得額度
+        if not isinstance(agent.model, ScheduledModel):
+            await self.acquire(agent.model)
+
+
+# ============================================================
+# 輸入 / checkpoint
+# ============================================================
+@dataclass
+class BatchItem:
+    id: str
+    input: str
+
+
+def read_items(path: Path) -> List[BatchItem]:
+    items = []
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                items.append(BatchItem(id=str(record.get("id", line_no)), input=record["input"]))
+            else:
+                items.append(BatchItem(id=str(line_no), input=line))
+    return items
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """讀取既有輸出檔中已成功的 id（失敗的會在下次執行時重跑）"""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 上次中斷時寫到一半的最後一行
+            if record.get("error") is None:
+                done.add(record["id"])
+    return done
+
+
+# ============================================================
+# 批次執行
+# ============================================================
+RunFn = Callable[[str, RunHooks], Awaitable[RunResult]]
+
+
+async def run_batch(
+        run: RunFn,
+        items: Iterable[BatchItem],
+        output: Path,
+        concurrency: int = 8,
+        rate_limits: Optional[Dict[str, float]] = None,
+) -> AsyncIterator[Dict]:
+    """
+    以有限並行度執行所有問題，每完成一筆就寫入 output 並 yield 該筆結果
+
+    參數：
+        run: 執行單一問題的函式，接收 (input, hooks)，例如 lambda q, h: Runner.run(agent, q, hooks=h)
+        items: 要處理的問題
+        output: JSONL 輸出檔（同時作為 checkpoint）
+        concurrency: 最多同時執行幾筆
+        rate_limits: 各提供者每分鐘的模型呼叫上限，例如 {"openai": 500, "litellm": 60}
+    """
+    limiters = {name: RateLimiter(rpm) for name, rpm in (rate_limits or {}).items() if rpm}
+    done = completed_ids(output)
+    pending = [item for item in items if item.id not in done]
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def worker(item: BatchItem) -> None:
+        hooks = _RateLimitHooks(limiters)
+        _current_hooks.set(hooks)
+        record: Dict[str, Any] = {"id": item.id, "input": item.input}
+        started = time.perf_counter()
+        try:
+            with before_model_call(hooks.acquire):
+                result = await run(item.input, hooks)
+            record.update(output=str(result.final_output), agent=result.last_agent.name, error=None)
+        except InputGuardrailTripwireTriggered:
+            record.update(output=None, blocked=True, error=None)
+        except Exception as e:
+            record.update(output=None, error=f"{type(e).__name__}: {e}")
+        record.update(llm_calls=hooks.llm_calls, latency_ms=round((time.perf_counter() - started) * 1000, 1))
+        await queue.put(record)
+
+    async def produce() -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(item: BatchItem) -> None:
+            async with semaphore:
+                await worker(item)
+
+        await asyncio.gather(*(bounded(item) for item in pending))
+
+    # 只有寫檔的這個迴圈會動到輸出檔，不需要額外的鎖
+    producer = asyncio.create_task(produce())
+    try:
+        with output.open("a", encoding="utf-8") as f:
+            for _ in range(len(pending)):
+                record = await queue.get()
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                yield record
+        await producer
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def run_batch_to_file(run: RunFn, items: List[BatchItem], output: Path, **kwargs: Any) -> Dict:
+    """執行批次並回傳摘要統計"""
+    started = time.perf_counter()
+    records = [record async for record in run_batch(run, items, output, **kwargs)]
+    elapsed = time.perf_counter() - started
+    latencies = sorted(record["latency_ms"] for record in records)
+    return {
+        "processed": len(records),
+        "skipped": len(items) - len(records),
+        "errors": sum(1 for record in records if record["error"]),
+        "blocked": sum(1 for record in records if record.get("blocked")),
+        "seconds": round(elapsed, 2),
+        "throughput_per_s": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+    }
+
+
+# ============================================================
+# 命令列：以 gm_agent 處理整個檔案
+# ============================================================
+async def _main(args: argparse.Namespace) -> None:
+    import main
+    from fast_router import run_routed
+
+    def run(user_input: str, hooks: RunHooks) -> Awaitable[RunResult]:
+        return run_routed(main.gm_agent, user_input, main.ROUTES, hooks=hooks)
+
+    await main.provider_clients.start()
+    try:
+        summary = await run_batch_to_file(
+            run,
+            read_items(args.input),
+            args.output,
+            concurrency=args.concurrency,
+            rate_limits={"openai": args.openai_rpm, "litellm": args.litellm_rpm},
+        )
+        print(json.dumps(summary, ensure_ascii=False))
+    finally:
+        await main.provider_clients.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many agent queries with bounded concurrency")
+    parser.add_argument("input", type=Path, help="JSONL or plain-text file, one question per line")
+    parser.add_argument("output", type=Path, help="JSONL results; also used as the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "8")))
+    parser.add_argument("--openai-rpm", type=float, default=500)
+    parser.add_argument("--litellm-rpm", type=float, default=60)
+    asyncio.run(_main(parser.parse_args()))
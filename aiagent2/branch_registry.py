@@ -0,0 +1,81 @@
+"""
+分店代理登錄表（branch agent registry）
+
+原本每家分店都在載入時手動建立一個 Agent、一個工具與一個模型封裝，
+分店數增加到數百家時，啟動時間與記憶體都會跟著線性成長。
+
+BranchAgentRegistry 改為依庫存資料延遲建立：
+1. 分店清單直接取自 InventoryStore，啟動時不建立任何 Agent
+2. 第一次用到某家分店時才呼叫 build(branch) 建立 Agent 與工具
+3. 以 LRU 快取保留最近使用的 maxsize 個 Agent，超過時淘汰最久未使用者
+4. 所有分店 Agent 共用同一個模型封裝（與其 OpenAI client / 連線池），由 build 自行決定
+
+用法：
+    registry = BranchAgentRegistry(inventory_store, build_branch_agent, maxsize=64)
+    agent = registry.get("台北店")
+    route = registry.route("inventory")     # 供 fast_router 使用，Agent 同樣延遲建立
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+from agents import Agent
+
+from fast_router import KeywordRoute
+from inventory_store import InventoryStore
+
+
+class BranchAgentRegistry:
+    """依需求建立並以 LRU 快取分店 Agent"""
+
+    def __init__(self, store: InventoryStore, build: Callable[[str], Agent], maxsize: int = 64):
+        """
+        參數：
+            store: 多分店庫存索引，分店清單以此為準
+            build: 建立單一分店 Agent 的函式
+            maxsize: 最多同時保留幾個分店 Agent
+        """
+        self._store = store
+        self._build = build
+        self._maxsize = maxsize
+        self._agents: "OrderedDict[str, Agent]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def branches(self) -> List[str]:
+        return self._store.branches
+
+    def get(self, branch: str) -> Agent:
+        """取得分店 Agent；不存在的分店拋出 KeyError"""
+        agent = self._agents.get(branch)
+        if agent is not None:
+            self.hits += 1
+            self._agents.move_to_end(branch)
+            return agent
+        if branch not in self._store.branches:
+            raise KeyError(f"Unknown branch: {branch}")
+
+        self.misses += 1
+        agent = self._agents[branch] = self._build(branch)
+        while len(self._agents) > self._maxsize:
+            self._agents.popitem(last=False)
+            self.evictions += 1
+        return agent
+
+    def route(self, category: str) -> KeywordRoute:
+        """
+        以分店名稱為關鍵字的路由：比對時才讀取目前的分店清單（庫存資料新增的分店也會被路由），
+        Agent 在路由命中時才建立
+        """
+        return KeywordRoute(category, self.get, lambda: self.branches)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "branches": len(self.branches),
+            "cached": len(self._agents),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,147 @@
+"""
+確定性路由（deterministic routing）
+
+入口 Agent（總經理助手）的第一個回合通常只是決定要交接給哪個專業 Agent，
+但輸入防護已經算出了 category，分店名稱也能直接從輸入比對出來。
+
+run_routed() 依輸入防護的結果與路由表決定去向：
+1. 防護結果的 output_info["category"] 與路由的 category 相同，
+   且輸入含有該路由的任一關鍵字（沒有設定關鍵字則不需比對）；
+   KeywordRoute 在比對時才取得目前的關鍵字清單，每個命中的關鍵字各對應一個專業 Agent（例如每家分店一個）
+2. 恰好只有一個專業 Agent 符合 -> 直接執行該 Agent，省下入口 Agent 的交接回合
+3. 沒有符合或同時符合多個（例如同時提到兩家分店）-> 交給入口 Agent 照原本方式處理
+
+輸入含有某條路由的關鍵字（例如分店名稱）時多半會直接路由，先等防護結果再執行專業 Agent，
+典型的庫存問題因此只需要兩次模型呼叫（防護 + 專業 Agent），而不是三次。
+其餘輸入以 run_guarded() 讓入口 Agent 的第一回合與防護同時進行（工具與交接等判定通過才執行）：
+落到入口 Agent 時不必多等一次防護；防護結果仍命中路由時取消入口 Agent 的回合，
+改執行專業 Agent（多花一次被取消的模型呼叫）。
+觸發 tripwire 時一樣拋出 InputGuardrailTripwireTriggered。
+
+用法：
+    routes = [Route("inventory", inventory_assistant), Route("therapy", therapy_assistant)]
+    routes = [KeywordRoute("inventory", registry.get, lambda: registry.branches), ...]
+    result = await run_routed(gm_assistant, "洋芋片還有多少庫存", routes)
+"""
+
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from agents import Agent, RunHooks, Runner, RunResult
+from agents.guardrail import InputGuardrailResult
+from agents.logger import logger
+from agents.tracing import get_current_trace, trace
+
+from optimistic_guardrail import check_input, run_guarded
+
+
+@dataclass(frozen=True)
+class Route:
+    """一條路由：防護類別 + 關鍵字 -> 專業 Agent（或在命中時才建立 Agent 的函式）"""
+    category: str
+    agent: Union[Agent, Callable[[], Agent]]
+    keywords: Tuple[str, ...] = ()  # 例如 ("台北店",)；空白表示只看類別
+
+
+@dataclass(frozen=True)
+class KeywordRoute:
+    """
+    一組依命中的關鍵字決定專業 Agent 的路由：比對時才呼叫 keywords() 取得目前的關鍵字，
+    命中的關鍵字交給 agent(keyword) 取得 Agent；關鍵字清單變動時不需要重建路由表
+    """
+    category: str
+    agent: Callable[[str], Agent]
+    keywords: Callable[[], Iterable[str]]
+
+
+AnyRoute = Union[Route, KeywordRoute]
+
+
+def _keywords(route: AnyRoute) -> Iterable[str]:
+    return route.keywords() if isinstance(route, KeywordRoute) else route.keywords
+
+
+def _targets(route: AnyRoute, input: str) -> Iterator[Tuple[Any, Union[Agent, Callable[[], Agent]]]]:
+    """路由對這個輸入符合的專業 Agent（以 key 去除重複）"""
+    if isinstance(route, KeywordRoute):
+        for keyword in route.keywords():
+            if keyword in input:
+                yield (id(route), keyword), partial(route.agent, keyword)
+    elif not route.keywords or any(keyword in input for keyword in route.keywords):
+        yield id(route.agent), route.agent
+
+
+def guardrail_category(results: Iterable[InputGuardrailResult]) -> Optional[str]:
+    """取出第一個帶有 category 的防護結果"""
+    for result in results:
+        info = result.output.output_info
+        if isinstance(info, dict) and info.get("category"):
+            return info["category"]
+    return None
+
+
+def match_route(category: Optional[str], input: Any, routes: Sequence[AnyRoute]) -> Optional[Agent]:
+    """只有在恰好一個專業 Agent 符合時才回傳，否則回傳 None（交給入口 Agent）"""
+    if category is None or not isinstance(input, str):
+        return None
+    matched = {
+        key: target
+        for route in routes
+        if route.category == category
+        for key, target in _targets(route, input)
+    }
+    if len(matched) != 1:
+        return None
+    target = next(iter(matched.values()))
+    return target if isinstance(target, Agent) else target()
+
+
+def has_keyword(input: Any, routes: Sequence[AnyRoute]) -> bool:
+    """輸入是否含有任一路由的關鍵字（只看設有關鍵字的路由）"""
+    return isinstance(input, str) and any(keyword in input for route in routes for keyword in _keywords(route))
+
+
+async def run_routed(
+        agent: Agent,
+        input: Any,
+        routes: Sequence[AnyRoute],
+        *,
+        hooks: Optional[RunHooks] = None,
+        **kwargs: Any,
+) -> RunResult:
+    """
+    依輸入防護的結果直接執行專業 Agent，無法確定時交給入口 Agent
+
+    參數：
+        agent: 設有 input_guardrails 與 handoffs 的入口 Agent
+        input: 使用者輸入
+        routes: 路由表
+        hooks, **kwargs: 原樣傳給 Runner.run
+
+    返回：
+        RunResult，其 input_guardrail_results 含有防護結果
+    """
+    # 防護與後續的 Runner.run 放在同一個 trace 中，追蹤紀錄才看得到完整的一次請求
+    if get_current_trace() is None:
+        with trace(f"{agent.name} (routed)"):
+            return await run_routed(agent, input, routes, hooks=hooks, **kwargs)
+
+    def reroute(results: List[InputGuardrailResult]) -> Optional[Agent]:
+        category = guardrail_category(results)
+        target = match_route(category, input, routes)
+        if target is None:
+            logger.debug(f"No unique route for category={category!r}, falling back to {agent.name}")
+        else:
+            logger.debug(f"Routing category={category!r} directly to {target.name}")
+        return target
+
+    if not has_keyword(input, routes):
+        return await run_guarded(agent, input, hooks=hooks, reroute=reroute, **kwargs)
+
+    guardrail_results: List[InputGuardrailResult] = await check_input(agent, input, kwargs.get("context"))
+    # 防護已經執行過，落到入口 Agent 時避免 Runner 再跑一次
+    target = reroute(guardrail_results) or agent.clone(input_guardrails=[])
+    result = await Runner.run(target, input, hooks=hooks, **kwargs)
+    result.input_guardrail_results = guardrail_results + result.input_guardrail_results
+    return result
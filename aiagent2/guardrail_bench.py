@@ -0,0 +1,143 @@
+"""
+輸入防護延遲量測（使用本機假模型，不需要 API 金鑰）
+
+以 StubModel 取代 guardrail_agent 與主要代理的模型，比較 Runner.run 與 run_guarded()：
+1. 一般請求的總延遲（兩者的防護都與第一回合同時執行，約為兩者取大）
+2. 違規請求觸發 tripwire 所需的時間，以及第一回合要求的交接是否在判定前就被執行
+3. 判定快取與關鍵字規則在混合輸入下略過 LLM 的比例與節省量
+4. run_routed() 直接路由到專業 Agent，以及沒有路由可用、落到主要代理時的延遲
+
+量測的是執行目錄中的 main.py（以及同目錄的 optimistic_guardrail、safety_cache 等模組），
+主要代理、輸入與判定結果型別都可以用參數指定，aiagent1 與 aiagent2 共用這一支量測程式。
+
+用法：
+    uv run python guardrail_bench.py --guardrail-ms 400 --turn-ms 600 --runs 5
+    cd ../aiagent1 && uv run python ../aiagent2/guardrail_bench.py \
+        --agent gm_assistant --verdict-type SafetyCheckOutput --safe-input 洋芋片還有多少庫存 --reply 洋芋片目前庫存 30 件
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+# 假模型不會呼叫 OpenAI / Gemini，但 main.py 載入時需要金鑰
+os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+os.environ.setdefault("GEMINI_API_KEY", "stub")
+
+# 量測執行目錄中的專案（而不是這支程式所在的目錄）
+sys.path.insert(0, os.getcwd())
+
+from agents import InputGuardrailTripwireTriggered, RunHooks, Runner, set_tracing_disabled
+
+import main
+from fast_router import match_route, run_routed
+from optimistic_guardrail import run_guarded
+from safety_cache import CachedSafetyClassifier, KeywordRules
+from stub_model import StubModel, handoff_call
+
+BLOCKED_INPUT = "我想要做偏門生意，請幫我想個好方法"
+
+
+def workload(safe_input: str) -> list:
+    """混合輸入：重複的問題、明確的違規內容，以及每次都需要 LLM 判斷的新問題"""
+    return [
+        safe_input, safe_input, "洋芋片 還有多少庫存？", "咖啡價格多少錢",
+        "最近工作壓力好大，晚上都失眠", BLOCKED_INPUT, BLOCKED_INPUT,
+        "你們幾點開門", "你們幾點開門?", "幫我寫一封給供應商的信",
+    ] * 3
+
+
+def verdict(unrouted_input: str):
+    """假的審核結果：含「偏門」即攔截；unrouted_input 分類為 general（沒有路由），其餘為 inventory"""
+    def respond(input, tools, handoffs) -> str:
+        category = "general" if unrouted_input in str(input) else "inventory"
+        return json.dumps({"category": category, "should_block": "偏門" in str(input)})
+    return respond
+
+
+def first_turn(reply: str):
+    """假的第一回合：違規請求會要求交接（模擬有副作用的步驟），其餘直接回答 reply"""
+    def respond(input, tools, handoffs):
+        if "偏門" in str(input) and handoffs:
+            return handoff_call(handoffs[0])
+        return reply
+    return respond
+
+
+class HandoffCounter(RunHooks):
+    def __init__(self):
+        self.handoffs = 0
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        self.handoffs += 1
+
+
+async def measure(agent, mode: str, user_input: str, runs: int, settle: float) -> tuple:
+    """回傳 (每次的毫秒數, 實際執行的交接次數)"""
+    run = {
+        "Runner.run": Runner.run,
+        "run_guarded": run_guarded,
+        "run_routed": lambda agent, user_input, hooks: run_routed(agent, user_input, main.ROUTES, hooks=hooks),
+    }[mode]
+    hooks = HandoffCounter()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            await run(agent, user_input, hooks=hooks)
+        except InputGuardrailTripwireTriggered:
+            pass
+        samples.append((time.perf_counter() - started) * 1000)
+        # 讓 Runner.run 在 tripwire 後仍在背景進行的第一回合跑完
+        await asyncio.sleep(settle)
+    return samples, hooks.handoffs
+
+
+async def run(args: argparse.Namespace) -> None:
+    set_tracing_disabled(True)
+    agent = getattr(main, args.agent)
+    main.guardrail_agent.model = StubModel(reply=verdict(args.unrouted_input), latency=args.guardrail_ms / 1000)
+    agent.model = StubModel(reply=first_turn(args.reply), latency=args.turn_ms / 1000)
+
+    print(f"{agent.name}: guardrail={args.guardrail_ms}ms  first turn={args.turn_ms}ms  runs={args.runs}")
+    inputs = workload(args.safe_input)
+    for user_input in inputs:
+        await main.safety_classifier.classify(user_input)
+    print(f"verdict cache ({len(inputs)} inputs): {main.safety_classifier.stats.summary()}")
+
+    # 比較執行模式時停用快取與規則，每次都量測完整的 LLM 審核路徑
+    main.safety_classifier = CachedSafetyClassifier(
+        main.llm_safety_check, getattr(main, args.verdict_type),
+        rules=KeywordRules(block=()), ttl=0,
+    )
+    for label, user_input in (("safe", args.safe_input), ("blocked", BLOCKED_INPUT)):
+        for mode in ("Runner.run", "run_guarded"):
+            samples, handoffs = await measure(agent, mode, user_input, args.runs, args.turn_ms / 1000)
+            print(f"{label:8} {mode:11} median={statistics.median(samples):7.1f}ms  max={max(samples):7.1f}ms  "
+                  f"handoffs executed={handoffs}/{args.runs}")
+
+    # 確定性路由：專業 Agent 也換成假模型（回合時間與主要代理相同）
+    specialist = match_route("inventory", args.safe_input, main.ROUTES)
+    specialist.model = StubModel(reply=args.reply, latency=args.turn_ms / 1000)
+    specialist.mcp_servers = []  # 假模型不會呼叫工具，不必連線 MCP 伺服器
+    for label, user_input in (("routed", args.safe_input), ("unrouted", args.unrouted_input)):
+        samples, _ = await measure(agent, "run_routed", user_input, args.runs, args.turn_ms / 1000)
+        print(f"{label:8} {'run_routed':11} median={statistics.median(samples):7.1f}ms  max={max(samples):7.1f}ms")
+    print(f"(guardrail then turn, one after the other: {args.guardrail_ms + args.turn_ms:.0f}ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Guardrail latency benchmark with stub models")
+    parser.add_argument("--guardrail-ms", type=float, default=400)
+    parser.add_argument("--turn-ms", type=float, default=600)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--agent", default="gm_agent", help="main.py 中主要代理的名稱")
+    parser.add_argument("--verdict-type", default="SafetyCheck", help="main.py 中安全審核結果的型別名稱")
+    parser.add_argument("--safe-input", default="台北店洋芋片還有多少?")
+    parser.add_argument("--reply", default="台北店洋芋片庫存量為 7", help="假的第一回合回覆")
+    parser.add_argument("--unrouted-input", default="你們幾點開門", help="沒有對應路由、會交給主要代理的輸入")
+    asyncio.run(run(parser.parse_args()))
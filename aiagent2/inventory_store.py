@@ -0,0 +1,72 @@
+"""
+多分店庫存索引
+
+inventory_db 是「分店 -> 商品 -> 數量」的巢狀字典，
+一次只能方便地查一家分店的一項商品；要比較多家分店時，
+原本的做法是對每家分店各跑一次完整的 Agent。
+
+InventoryStore 在 inventory_db 之上建立索引，一次查詢即可取得
+任意商品 × 任意分店的庫存表：
+1. 以 (分店, 商品) 為 key 的扁平索引，查詢時每格只做一次字典查找
+2. 商品 -> 有販售的分店 的反向索引，未指定分店時只列出有販售的分店
+3. version 在資料變動時遞增，供快取判斷資料是否過期
+
+用法：
+    store = InventoryStore(inventory_db)
+    table = store.table(["咖啡", "洋芋片"], ["台北店", "台中店"])
+    store.update("台北店", "咖啡", 10)   # 同步寫回 inventory_db 並遞增 version
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class InventoryStore:
+    """以索引方式查詢多分店、多商品庫存"""
+
+    def __init__(self, data: Dict[str, Dict[str, int]]):
+        self._data = data
+        self.version = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        """依 inventory_db 目前內容重建索引（直接修改 inventory_db 後呼叫）"""
+        self._qty: Dict[Tuple[str, str], int] = {}
+        self._branches_by_product: Dict[str, List[str]] = {}
+        for branch, stock in self._data.items():
+            for product, qty in stock.items():
+                self._qty[(branch, product)] = qty
+                self._branches_by_product.setdefault(product, []).append(branch)
+        self.branches: List[str] = list(self._data)
+        self.version += 1
+
+    def update(self, branch: str, product: str, qty: int) -> None:
+        """更新單一分店的單一商品庫存"""
+        self._data.setdefault(branch, {})[product] = qty
+        self.refresh()
+
+    def get(self, branch: str, product: str) -> int:
+        return self._qty.get((branch, product), 0)
+
+    def table(self, products: Iterable[str], branches: Optional[Iterable[str]] = None) -> Dict:
+        """
+        查詢庫存表
+
+        參數：
+            products: 商品名稱清單
+            branches: 分店名稱清單；None 表示所有有販售這些商品的分店
+
+        返回：
+            {"columns": ["商品", 分店..., "合計"], "rows": [[商品, 數量..., 合計], ...], "version": 版本號}
+        """
+        products = list(dict.fromkeys(products))
+        if branches is None:
+            selling = {branch for product in products for branch in self._branches_by_product.get(product, ())}
+            branches = [branch for branch in self.branches if branch in selling]
+        else:
+            branches = list(dict.fromkeys(branches))
+
+        rows = []
+        for product in products:
+            quantities = [self._qty.get((branch, product), 0) for branch in branches]
+            rows.append([product, *quantities, sum(quantities)])
+        return {"columns": ["商品", *branches, "合計"], "rows": rows, "version": self.version}
@@ -14,14 +14,13 @@ import os          # 用於存取環境變數
 import sys         # 系統相關功能
 import json        # JSON 資料處理
 import asyncio     # 非同步程式設計支援
+import time        # 量測工具與交接的執行時間
 from typing import Literal  # 型別提示，限定特定字面值
 
 # ============================================================
 # 第三方函式庫導入
 # ============================================================
 from pydantic import BaseModel  # 資料驗證與設定管理
-from openai import AsyncOpenAI  # OpenAI 非同步客戶端
-from openai.types.responses import ResponseTextDeltaEvent  # 串流回應事件類型
 
 # 設定環境變數以抑制 asyncio 的 ResourceWarning 警告
 os.environ["PYTHONWARNINGS"] = "ignore::ResourceWarning"
@@ -41,10 +40,20 @@ from agents import (
 # ============================================================
 # OpenAI Agents SDK 擴充功能導入
 # ============================================================
-from agents.extensions.models.litellm_model import LitellmModel  # LiteLLM 模型支援（可使用 Gemini 等）
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX  # 推薦的交接提示詞前綴
 from agents.extensions.visualization import draw_graph  # 代理結構視覺化工具
 from agents.lifecycle import AgentHooks  # 代理生命週期鉤子，用於監控與日誌
+from safety_cache import CachedSafetyClassifier  # 安全審核的判定快取與前置分類器
+from fast_router import Route, run_routed  # 依防護類別與分店名稱直接路由到專業代理
+from inventory_store import InventoryStore  # 多分店庫存索引
+from branch_registry import BranchAgentRegistry  # 依需求建立分店代理的登錄表
+from response_cache import ResponseCache  # 重複問題的回覆快取
+from audit_sink import AuditSink  # 非阻塞的稽核事件輸出
+from profiler import enable_profiling  # 本機延遲分析（不需外部追蹤服務）
+from provider_clients import ProviderClients  # OpenAI / LiteLLM 共用連線池與關閉流程
+from model_scheduler import ModelOption, ModelScheduler  # 模型分級與跨提供者備援
+from stream_gateway import StreamGateway, write_frames  # 串流訊框合併與多訂閱者分送
+from batch_runner import current_hooks  # 批次執行時讓審核的模型呼叫也計入速率限制
 
 # ============================================================
 # 其他函式庫導入與設定
@@ -70,16 +79,26 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise RuntimeError("OPENAI_API_KEY is not set; please export a valid OpenAI API key.")
 
-# 建立非同步 OpenAI 客戶端
-# AsyncOpenAI 支援非同步操作，適合處理多個並發請求
-client = AsyncOpenAI(
-    api_key = openai_api_key,
+# 建立各模型提供者共用的連線池
+# OpenAI：所有代理共用同一個 AsyncOpenAI 與調整過的 httpx 連線池
+# LiteLLM：main() 開始時建立共用的 aiohttp session，並預先連線
+# 連線上限可用 PROVIDER_MAX_CONNECTIONS 調整
+provider_clients = ProviderClients(
+    openai_api_key,
+    max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100")),
+    litellm_warmup_url="https://generativelanguage.googleapis.com/",
 )
+# AsyncOpenAI 支援非同步操作，適合處理多個並發請求
+client = provider_clients.openai
 
 # 設定追蹤功能的 API 金鑰
 # 此功能可用於追蹤和監控代理的執行過程
 set_tracing_export_api_key(openai_api_key)
 
+# 設定 AGENT_PROFILE=<檔名前綴>（例如 profile）啟用本機延遲分析：
+# 改由 LocalProfiler 接收追蹤資料，寫出每次執行的時間軸與火焰圖資料，不再上傳追蹤
+profiler = enable_profiling(os.environ["AGENT_PROFILE"]) if os.getenv("AGENT_PROFILE") else None
+
 # 從環境變數取得 Gemini API 金鑰
 # Gemini 是 Google 的 LLM，透過 LiteLLM 整合使用
 gemini_api_key = os.getenv("GEMINI_API_KEY")
@@ -90,6 +109,34 @@ if not gemini_api_key:
 # LiteLLM 使用格式：提供商/模型名稱
 gemini_model = os.getenv("GEMINI_MODEL", "gemini/gemini-2.5-flash")
 
+# ============================================================
+# 模型分級
+# fast：安全審核、分店查詢等簡單回合；large：總經理助手；therapy：心理支持（Gemini 優先）
+# 每個等級依序嘗試候選模型，逾時、429 或 5xx 時改用另一個提供者
+# 模型名稱可用 FAST_MODEL / LARGE_MODEL 調整，單次呼叫逾時用 MODEL_TIMEOUT（秒）
+# 價格為每百萬 token 的美元價格，僅用於估算各等級的費用
+# ============================================================
+fast_model_name = os.getenv("FAST_MODEL", "gpt-5-mini")
+large_model_name = os.getenv("LARGE_MODEL", "gpt-5")
+fast_option = ModelOption(
+    fast_model_name, OpenAIChatCompletionsModel(model=fast_model_name, openai_client=client), 0.25, 2.0,
+)
+large_option = ModelOption(
+    large_model_name, OpenAIChatCompletionsModel(model=large_model_name, openai_client=client), 1.25, 10.0,
+)
+# 透過 LiteLLM 使用 Gemini 模型，並重用共用的 aiohttp 連線池
+gemini_option = ModelOption(
+    gemini_model, provider_clients.litellm_model(model=gemini_model, api_key=gemini_api_key), 0.30, 2.50,
+)
+model_scheduler = ModelScheduler(
+    {
+        "fast": [fast_option, gemini_option],
+        "large": [large_option, gemini_option],
+        "therapy": [gemini_option, large_option],
+    },
+    timeout=float(os.getenv("MODEL_TIMEOUT", "60")),
+)
+
 # ============================================================
 # 模擬庫存資料庫
 # ============================================================
@@ -105,6 +152,9 @@ inventory_json="""
 # 將 JSON 字串解析為 Python 字典，方便程式存取
 inventory_db=json.loads(inventory_json)
 
+# 在 inventory_db 之上建立 (分店, 商品) 索引，供多分店查詢使用
+inventory_store = InventoryStore(inventory_db)
+
 # ============================================================
 # 動態建立分店專屬的庫存查詢工具
 # ============================================================
@@ -138,9 +188,41 @@ def make_inventory_tool(branch:str):
         return f"{branch}{商品}庫存量為 {qty}"
     return get_inventory
 
-# 建立台北店和台中店的專屬庫存查詢工具
-tool_a = make_inventory_tool("台北店")
-tool_b = make_inventory_tool("台中店")
+# ============================================================
+# 多分店庫存查詢工具
+# ============================================================
+def make_multi_branch_inventory_tool(store: InventoryStore):
+    """
+    建立可一次查詢多項商品 × 多家分店的庫存工具
+
+    參數：
+        store: 多分店庫存索引
+
+    返回：
+        function_tool 裝飾的函數，可供 Agent 使用
+
+    說明：
+        N 家分店的比較只需要一次工具呼叫，不必對每家分店各跑一次 Agent
+    """
+    from agents import function_tool
+
+    @function_tool
+    def get_inventory_table(商品: list[str], 分店: list[str] | None = None) -> str:
+        """
+        查詢多項商品在多家分店的庫存，回傳一張庫存表
+
+        參數：
+            商品: 商品名稱清單（例如：["咖啡", "洋芋片"]）
+            分店: 分店名稱清單（例如：["台北店", "台中店"]）；不指定則列出所有有販售的分店
+
+        返回：
+            JSON 格式的庫存表，columns 為欄位名稱，rows 每列為一項商品
+        """
+        return json.dumps(store.table(商品, 分店), ensure_ascii=False)
+    return get_inventory_table
+
+# 所有分店共用的庫存表工具
+inventory_table_tool = make_multi_branch_inventory_tool(inventory_store)
 
 # ============================================================
 # 代理生命週期監控鉤子（Hooks）
@@ -151,17 +233,45 @@ class AuditHooks(AgentHooks):
     用於追蹤和記錄代理的各種操作行為
 
     主要功能：
-    - 監控工具調用的開始與結束
-    - 記錄代理之間的交接過程
-    - 便於除錯和了解代理執行流程
+    - 監控工具調用的開始與結束，並記錄工具執行時間
+    - 記錄代理之間的交接過程，以及從該回合開始到決定交接的延遲
+    - 事件交給 AuditSink 以非阻塞方式批次寫入 JSONL，不在 hook 中做任何 I/O
     """
+    def __init__(self, sink: AuditSink, preview_chars: int = 200):
+        self._sink = sink
+        self._preview_chars = preview_chars  # 工具結果只保留前幾個字，避免大量輸出
+        self._tool_started: dict = {}
+        # 以 (run context, agent) 為鍵：同一個 hooks 實例被多個並行 run 共用，
+        # 只用 id(agent) 會讓不同 run 的回合起點互相覆寫
+        self._turn_started: dict = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        """記錄每個回合的開始時間，供計算交接延遲"""
+        self._turn_started[(id(context), id(agent))] = time.perf_counter()
+
+    async def on_end(self, context, agent, output):
+        """代理產生最終輸出時清掉該 run 的回合起點，避免批次執行時字典持續累積"""
+        self._turn_started.pop((id(context), id(agent)), None)
+
     async def on_tool_start(self, context, agent, tool):
         """當代理開始使用工具時觸發"""
-        print(f"[Audit] {agent.name} 將使用工具 {tool.name}")
+        key = (getattr(context, "tool_call_id", None), id(agent), tool.name)
+        self._tool_started[key] = time.perf_counter()
+        self._sink.emit("tool_start", agent=agent.name, tool=tool.name)
 
     async def on_tool_end(self, context, agent, tool, result):
         """當工具執行完成時觸發"""
-        print(f"[Audit] {tool.name} 完成，結果：{result}")
+        key = (getattr(context, "tool_call_id", None), id(agent), tool.name)
+        started = self._tool_started.pop(key, None)
+        text = str(result)
+        self._sink.emit(
+            "tool_end",
+            agent=agent.name,
+            tool=tool.name,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2) if started else None,
+            result_chars=len(text),
+            result_preview=text[:self._preview_chars],
+        )
 
     async def on_handoff(
             self,
@@ -170,28 +280,46 @@ class AuditHooks(AgentHooks):
             source
     ):
         """當代理交接發生時觸發"""
-        print(f"[Audit]{source.name}->交接給 {agent.name}")
+        started = self._turn_started.pop((id(context), id(source)), None)
+        self._sink.emit(
+            "handoff",
+            agent=source.name,
+            to_agent=agent.name,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2) if started else None,
+        )
+
+# 稽核事件寫入 AUDIT_LOG（預設 audit.jsonl），所有代理共用同一組 hooks
+audit_sink = AuditSink(os.getenv("AUDIT_LOG", "audit.jsonl"))
+audit_hooks = AuditHooks(audit_sink)
 
 # ============================================================
 # 定義專業代理（Agents）
 # ============================================================
 
-# 台北店助手代理
-# 負責處理台北店的庫存查詢
-branch_a_agent = Agent (
-    name="Branch Taipei assistant",
-    instructions="你是台北店的小助手，只回答台北店產品庫存．",
-    model=OpenAIChatCompletionsModel(model="gpt-5", openai_client=client),
-    tools=[tool_a]  # 配備台北店專屬的庫存查詢工具
-)
+# 所有分店助手共用的模型（只需查一次工具，使用 fast 等級）
+branch_model = model_scheduler.model("fast")
+
+def build_branch_agent(branch: str) -> Agent:
+    """
+    建立分店助手代理，負責處理該分店的庫存查詢
+
+    參數：
+        branch: 分店名稱（例如：「台北店」、「台中店」）
+    """
+    return Agent(
+        name=f"Branch {branch} assistant",
+        instructions=f"你是{branch}的小助手，只回答{branch}產品庫存．",
+        model=branch_model,
+        tools=[make_inventory_tool(branch)],  # 配備分店專屬的庫存查詢工具
+        hooks=audit_hooks,  # 記錄工具執行時間
+    )
 
-# 台中店助手代理
-# 負責處理台中店的庫存查詢
-branch_b_agent = Agent (
-    name="Branch Taichung assistant",
-    instructions="你是台中店的小助手，只回答台中店產品庫存．",
-    model=OpenAIChatCompletionsModel(model="gpt-5", openai_client=client),
-    tools=[tool_b]  # 配備台中店專屬的庫存查詢工具
+# 分店助手登錄表：分店清單取自庫存資料，第一次用到時才建立代理，
+# 並以 LRU 保留最近使用的分店，啟動時間不隨分店數增加
+branch_registry = BranchAgentRegistry(
+    inventory_store,
+    build_branch_agent,
+    maxsize=int(os.getenv("BRANCH_AGENT_CACHE_SIZE", "64")),
 )
 
 # 心理諮商助手代理
@@ -200,10 +328,7 @@ branch_b_agent = Agent (
 therapy_agent = Agent (
     name="Therapy assistant",
     instructions="你是一位具備同理與專業知識的心理諮商助手．",
-    model=LitellmModel(
-        model=gemini_model,      # 使用 Gemini 模型
-        api_key=gemini_api_key   # Gemini API 金鑰
-    ),
+    model=model_scheduler.model("therapy"),  # Gemini 優先，無法服務時改用 OpenAI
 )
 
 # ============================================================
@@ -239,13 +364,26 @@ guardrail_agent=Agent(
         "否則應為 false. 請依下列 JSON 輸出："
         '{"category":<category>, "should_block":<true/false>}'
     ),
-    model=OpenAIChatCompletionsModel(
-        model="gpt-5",
-        openai_client=client
-    ),
+    model=model_scheduler.model("fast"),  # 分類任務使用 fast 等級
     output_type=SafetyCheck  # 指定輸出格式為 SafetyCheck，確保結構化回應
 )
 
+async def llm_safety_check(user_input, context):
+    """呼叫 guardrail_agent 審核，回傳 (審核結果, token 用量)"""
+    # 批次執行時沿用該筆問題的 hooks，審核的模型呼叫也計入速率限制
+    result = await Runner.run(guardrail_agent, user_input, context=context, hooks=current_hooks())
+    return result.final_output_as(SafetyCheck), result.context_wrapper.usage
+
+# 判定快取 + 關鍵字前置分類器：重複的輸入與明確違規的輸入不必再呼叫 LLM
+# 價格為 fast 等級模型每百萬 token 的美元價格，僅用於估算省下的費用
+safety_classifier = CachedSafetyClassifier(
+    llm_safety_check,
+    SafetyCheck,
+    ttl=float(os.getenv("GUARDRAIL_CACHE_TTL", "600")),
+    input_price_per_m=fast_option.input_price_per_m,
+    output_price_per_m=fast_option.output_price_per_m,
+)
+
 # ============================================================
 # 輸入防護函數（Input Guardrail）
 # 在使用者輸入傳遞給主要 Agent 之前，先進行安全檢查
@@ -256,7 +394,7 @@ async def safety_guardrail(ctx, agent, user_input):
     安全防護函數，用於檢查使用者輸入是否安全
 
     工作流程：
-    1. 將使用者輸入傳給 guardrail_agent 進行審核
+    1. 先查判定快取與關鍵字規則（只會攔截），其餘輸入交給 guardrail_agent 審核
     2. 取得審核結果（類別和是否應該攔截）
     3. 如果包含不當內容，觸發 tripwire 機制攔截請求
     4. 將判斷的類別資訊傳遞給後續處理
@@ -270,8 +408,7 @@ async def safety_guardrail(ctx, agent, user_input):
         GuardrailFunctionOutput: 包含類別資訊和是否觸發攔截
     """
     # 執行安全審核
-    result = await Runner.run(guardrail_agent, user_input, context=ctx.context)
-    verdict = result.final_output_as(SafetyCheck)
+    verdict = await safety_classifier.classify(user_input, ctx.context)
 
     # 決定是否觸發 tripwire（熔斷機制）
     tripwire = verdict.should_block
@@ -291,21 +428,59 @@ gm_agent = Agent(
     instructions=(
         f"{RECOMMENDED_PROMPT_PREFIX}\n"  # 使用推薦的交接提示詞前綴
         " 你是一個總經理小助手：\n"
-        " . 如詢問庫存 -> 交接到正確分店 Agent．\n"
+        " . 如詢問庫存 -> 使用 get_inventory_table 查詢（可一次查詢多家分店與多項商品）．\n"
         " . 若尋求心理支持 -> 交接 Therapy assistant．\n"
         " . 其他問題直接回答．"
     ),
-    model=OpenAIChatCompletionsModel(
-        model="gpt-5",
-        openai_client=client
-    ),
-    handoffs=[branch_a_agent, branch_b_agent, therapy_agent],  # 可轉交的專業助手清單
+    model=model_scheduler.model("large"),  # 需要判斷與回答品質，使用 large 等級
+    tools=[inventory_table_tool],  # 多分店庫存表工具
+    handoffs=[therapy_agent],  # 可轉交的專業助手清單（分店助手由 ROUTES 直接路由）
     input_guardrails=[safety_guardrail],  # 套用輸入安全檢查
-    hooks=AuditHooks(),  # 啟用監控鉤子
+    hooks=audit_hooks,  # 啟用監控鉤子
+)
+
+# ============================================================
+# 確定性路由表
+# 防護判斷出的類別 + 輸入中的分店名稱即可決定去向，省下 gm_agent 的交接回合；
+# 未提到分店或同時提到多家分店時，仍交給 gm_agent 判斷
+# ============================================================
+ROUTES = [
+    branch_registry.route("inventory"),  # 依目前的分店清單比對分店名稱，分店助手在命中時才建立
+    Route("therapy", therapy_agent),
+]
+
+# ============================================================
+# 回覆快取
+# 以正規化後的問題 + 庫存資料版本為 key，inventory_store 更新時自動失效；
+# 設定 RESPONSE_CACHE_EMBEDDINGS=1 可另外啟用語意相似度比對（使用 OpenAI embeddings）
+# ============================================================
+async def embed_text(text: str) -> list[float]:
+    """取得文字向量，供回覆快取做語意比對"""
+    response = await client.embeddings.create(model="text-embedding-3-small", input=text)
+    return response.data[0].embedding
+
+def question_entities(text: str) -> tuple:
+    """問題中提到的分店與商品；語意比對只在兩個問題提到的分店與商品完全相同時命中"""
+    branches = frozenset(branch for branch in inventory_db if branch.removesuffix("店") in text)
+    products = frozenset(product for stock in inventory_db.values() for product in stock if product in text)
+    return branches, products
+
+semantic_cache = os.getenv("RESPONSE_CACHE_EMBEDDINGS") == "1"
+response_cache = ResponseCache(
+    version=lambda: inventory_store.version,
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    embed=embed_text if semantic_cache else None,
+    entities=question_entities if semantic_cache else None,
 )
 
+async def ask(user_input: str):
+    """透過回覆快取詢問 gm_agent（含確定性路由），回傳最終回覆"""
+    return await response_cache.run(
+        gm_agent, user_input, lambda question: run_routed(gm_agent, question, ROUTES)
+    )
+
 # ============================================================
-# 輔助函數：平行查詢多個分店的庫存
+# 輔助函數：一次查詢多個分店的庫存
 # ============================================================
 async def parallel_inventory_query(product:str) -> str:
     """
@@ -318,13 +493,15 @@ async def parallel_inventory_query(product:str) -> str:
         合併的查詢結果字串
 
     說明：
-        使用 asyncio.gather 並行執行兩個代理任務，
-        比依序執行更快速有效率
+        直接對庫存索引做一次多分店查詢，
+        不必為每家分店各跑一次完整的代理（N 次 LLM 呼叫）
     """
-    a_task = Runner.run(branch_a_agent,f"{product} 庫存?")
-    b_task = Runner.run(branch_b_agent,f"{product} 庫存?")
-    res_a, res_b = await asyncio.gather(a_task,b_task)
-    return f"{res_a.final_output}:{res_b.final_output}"
+    table = inventory_store.table([product], ["台北店", "台中店"])
+    _, *quantities, _ = table["rows"][0]
+    return ":".join(
+        f"{branch}{product}庫存量為 {qty}"
+        for branch, qty in zip(table["columns"][1:-1], quantities)
+    )
 
 # ============================================================
 # 主程式
@@ -337,15 +514,19 @@ async def main() -> None:
     3. 平行查詢
     4. 代理結構視覺化（目前版本有 Bug）
     """
+    # 建立共用連線池並預先連線，第一個請求不必再等待 TCP / TLS 交握
+    await provider_clients.start()
     try:
         # ====================================================
         # 範例 1：庫存查詢（展示自動交接功能）
         # ====================================================
         # 使用者向總經理助手詢問台北店庫存
-        # gm_agent 會自動判斷並交接給 branch_a_agent 處理
-        result = await Runner.run(gm_agent,input="台北店洋芋片還有多少?")
+        # 安全檢查判定為 inventory 且提到台北店，run_routed 直接交給台北店助手，
+        # 只需兩次模型呼叫；無法確定去向時才由 gm_agent 自動判斷交接
+        # ask() 另外經過回覆快取，相同問題第二次會直接回傳
         print("-" * 40)
-        print("[庫存回覆]", result.final_output)
+        print("[庫存回覆]", await ask("台北店洋芋片還有多少?"))
+        print("[庫存回覆（快取）]", await ask("台北店 洋芋片還有多少？"))
 
         # ====================================================
         # 範例 2：心理諮詢（展示 LiteLLM 整合與串流回應）
@@ -355,18 +536,15 @@ async def main() -> None:
         print("-" * 40)
         stream = Runner.run_streamed(gm_agent, input="我最近很焦慮，該怎麼辦?")
         # 使用串流模式即時顯示回應，提升使用者體驗
-        async for event in stream.stream_events():
-            if (event.type == "raw_response_event"
-                and isinstance(event.data,ResponseTextDeltaEvent)
-            ):
-                print(event.data.delta, end="", flush=True)
+        # delta 先合併成訊框（最多 50ms 或 256 字）再寫出，同一個 gateway 也可再 subscribe() 給 SSE / WebSocket
+        await write_frames(StreamGateway(stream).subscribe())
         print()
 
         # ====================================================
-        # 範例 3：平行查詢（展示非同步並發處理）
+        # 範例 3：平行查詢（多分店庫存索引）
         # ====================================================
         # 同時查詢台北店和台中店的咖啡庫存
-        # 比依序查詢快一倍
+        # 一次索引查詢取代兩次完整的代理執行
         print("-" * 40)
         combined = await parallel_inventory_query("咖啡")
         print("平行查詢", combined)
@@ -407,33 +585,26 @@ async def main() -> None:
             print(f"      錯誤訊息：{exc}")
             print(f"      詳情請參閱程式碼註解（main.py:389-397 行）")
     finally:
+        # 安全審核略過 LLM 的比例與估算節省量
+        print(f"[Guardrail] {safety_classifier.stats.summary()}")
+
+        # 延遲分析報表（AGENT_PROFILE 啟用時）
+        if profiler is not None:
+            profiler.force_flush()
+            print(profiler.report())
+
+        # 寫出剩餘的稽核事件，並列出各階段延遲
+        await audit_sink.close()
+        print(f"[Audit] {audit_sink.summary()}")
+
+        # 各模型等級的呼叫數、備援次數、延遲與估算費用
+        print(f"[Models] {model_scheduler.stats()}")
+
         # ====================================================
-        # 資源清理：確保所有連線正確關閉
+        # 資源清理：依序關閉 OpenAI 與 LiteLLM 的連線池並等待完成
         # ====================================================
-        # 1. 關閉 OpenAI 客戶端
-        # 避免警告：Unclosed client session
-        await client.close()
-
-        # 2. 強制關閉 LiteLLM 的全域 aiohttp session
-        # LiteLLM 內部會維護一個預設的 session，需要手動關閉
-        # 避免警告：Unclosed connector
-        try:
-            import litellm
-            # 關閉主要的 aiohttp session
-            if hasattr(litellm, "aiohttp_session") and litellm.aiohttp_session:
-                await litellm.aiohttp_session.close()
-
-            # 關閉 LiteLLM 內部的所有 session
-            # 這是關鍵：需要呼叫 litellm 的清理函數
-            if hasattr(litellm, "module_level_aclient") and litellm.module_level_aclient is not None:
-                await litellm.module_level_aclient.close()
-
-        except Exception as e:
-            print(f"Warning during litellm cleanup: {e}")
-
-        # 3. 確保所有待處理的協程都完成
-        # 給予系統較長時間完成清理工作（從 0.25 增加到 0.5 秒）
-        await asyncio.sleep(0.5)
+        print(f"[Connections] {provider_clients.metrics()}")
+        await provider_clients.aclose()
 
 # ============================================================
 # 程式進入點
@@ -0,0 +1,229 @@
+"""
+模型分級與備援排程（model scheduler）
+
+原本所有 OpenAI 代理（包含安全審核與分店查詢）都使用 gpt-5，
+只需要分類或查一次工具的簡單回合也要付出大模型的延遲與費用；
+任何一個提供者逾時或回傳 429，整個請求就失敗。
+
+ModelScheduler 以「等級（tier）」管理模型：
+1. 每個等級是一串依優先順序排列的候選模型（可跨提供者，例如 OpenAI → Gemini）
+2. 代理的 model 改用 scheduler.model("fast") 之類的 ScheduledModel，每次模型呼叫時
+   依序嘗試候選模型；逾時、429、連線錯誤或 5xx 時改用下一個候選模型
+3. 需要較高品質的單一請求可用 scheduler.override(fast="large") 暫時改用其他等級
+   （以 contextvars 實作，只影響目前的請求）
+4. stats() 回報每個等級、每個候選模型的呼叫數、備援次數、延遲與依 token 估算的費用
+5. before_model_call(callback) 在呼叫每個候選模型之前執行 callback(model)，
+   例如批次執行器依實際呼叫的提供者限速（備援到另一個提供者時也計入正確的額度）
+
+用法：
+    scheduler = ModelScheduler({
+        "fast": [ModelOption("gpt-5-mini", mini_model, 0.25, 2.0), ModelOption("gemini-flash", gemini, 0.30, 2.50)],
+        "large": [ModelOption("gpt-5", gpt5_model, 1.25, 10.0)],
+    }, timeout=30)
+    agent = Agent(..., model=scheduler.model("fast"))
+    with scheduler.override(fast="large"):
+        await Runner.run(agent, "...")
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+import openai
+from agents.logger import logger
+from agents.models.interface import Model
+
+# 這些狀態碼代表提供者暫時無法服務，換另一個候選模型通常就能成功
+_FALLBACK_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def should_fallback(error: BaseException) -> bool:
+    """是否改用下一個候選模型（LiteLLM 的例外也繼承自 openai 的例外類別）"""
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in _FALLBACK_STATUS
+
+
+# 呼叫每個候選模型之前執行的 callback（以 contextvars 實作，只影響目前的請求）
+_before_call: contextvars.ContextVar[Optional[Callable[[Model], Awaitable[None]]]] = contextvars.ContextVar(
+    "before_model_call", default=None,
+)
+
+
+@contextmanager
+def before_model_call(callback: Callable[[Model], Awaitable[None]]) -> Iterator[None]:
+    """在此範圍內（目前的請求），每次呼叫候選模型之前先 await callback(候選模型)"""
+    token = _before_call.set(callback)
+    try:
+        yield
+    finally:
+        _before_call.reset(token)
+
+
+async def _wait_before_call(model: Model) -> None:
+    callback = _before_call.get()
+    if callback is not None:
+        await callback(model)
+
+
+@dataclass
+class ModelOption:
+    """一個候選模型與它每百萬 token 的美元價格"""
+    name: str
+    model: Model
+    input_price_per_m: float = 0.0
+    output_price_per_m: float = 0.0
+
+
+@dataclass
+class _OptionStats:
+    calls: int = 0
+    failures: int = 0
+    latencies: List[float] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else 0.0,
+            "p95_ms": round(ordered[int(len(ordered) * 0.95)], 1) if ordered else 0.0,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+class ModelScheduler:
+    """依等級挑選模型，失敗時改用同等級的下一個候選模型，並記錄各模型的延遲與費用"""
+
+    def __init__(self, tiers: Mapping[str, Sequence[ModelOption]], timeout: Optional[float] = 60.0):
+        """
+        參數：
+            tiers: 等級名稱 -> 依優先順序排列的候選模型
+            timeout: 單次模型呼叫的逾時秒數（超過就改用下一個候選模型），None 表示不限
+        """
+        for name, options in tiers.items():
+            if not options:
+                raise ValueError(f"Model tier {name!r} has no options")
+        self._tiers = {name: list(options) for name, options in tiers.items()}
+        self._timeout = timeout
+        self._overrides: contextvars.ContextVar[Mapping[str, str]] = contextvars.ContextVar(
+            "model_tier_overrides", default={},
+        )
+        self._stats: Dict[str, Dict[str, _OptionStats]] = {
+            name: {option.name: _OptionStats() for option in options} for name, options in self._tiers.items()
+        }
+
+    def model(self, tier: str) -> "ScheduledModel":
+        """回傳給 Agent(model=...) 使用的模型，實際呼叫時才依等級挑選"""
+        if tier not in self._tiers:
+            raise KeyError(f"Unknown model tier: {tier}")
+        return ScheduledModel(self, tier)
+
+    @contextmanager
+    def override(self, **tiers: str) -> Iterator[None]:
+        """在此範圍內（目前的請求）把等級換成另一個等級，例如 override(fast="large")"""
+        unknown = set(tiers.values()) - set(self._tiers)
+        if unknown:
+            raise KeyError(f"Unknown model tier: {', '.join(sorted(unknown))}")
+        token = self._overrides.set({**self._overrides.get(), **tiers})
+        try:
+            yield
+        finally:
+            self._overrides.reset(token)
+
+    def resolve(self, tier: str) -> str:
+        return self._overrides.get().get(tier, tier)
+
+    def options(self, tier: str) -> List[ModelOption]:
+        return self._tiers[self.resolve(tier)]
+
+    def _record(self, tier: str, option: ModelOption, started: float, usage: Any = None, failed: bool = False) -> None:
+        stats = self._stats[tier][option.name]
+        stats.calls += 1
+        stats.latencies.append((time.perf_counter() - started) * 1000)
+        if failed:
+            stats.failures += 1
+            return
+        if usage is not None:
+            stats.input_tokens += usage.input_tokens
+            stats.output_tokens += usage.output_tokens
+            stats.cost += (
+                usage.input_tokens * option.input_price_per_m + usage.output_tokens * option.output_price_per_m
+            ) / 1_000_000
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """各等級、各候選模型的呼叫數、失敗（備援）次數、延遲與估算費用"""
+        return {
+            tier: {name: stats.as_dict() for name, stats in options.items() if stats.calls}
+            for tier, options in self._stats.items()
+        }
+
+
+class ScheduledModel(Model):
+    """依 ModelScheduler 的等級設定呼叫候選模型的 Model 實作"""
+
+    def __init__(self, scheduler: ModelScheduler, tier: str):
+        self._scheduler = scheduler
+        self.tier = tier
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        tier = self._scheduler.resolve(self.tier)
+        options = self._scheduler.options(self.tier)
+        for index, option in enumerate(options):
+            await _wait_before_call(option.model)
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    option.model.get_response(*args, **kwargs), self._scheduler._timeout,
+                )
+            except Exception as e:
+                if not should_fallback(e):
+                    raise
+                self._scheduler._record(tier, option, started, failed=True)
+                if index == len(options) - 1:
+                    raise
+                logger.warning(f"Model {option.name} failed ({type(e).__name__}), falling back to {options[index + 1].name}")
+                continue
+            self._scheduler._record(tier, option, started, response.usage)
+            return response
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        tier = self._scheduler.resolve(self.tier)
+        options = self._scheduler.options(self.tier)
+        for index, option in enumerate(options):
+            await _wait_before_call(option.model)
+            started = time.perf_counter()
+            stream = option.model.stream_response(*args, **kwargs)
+            received = False
+            usage = None
+            try:
+                # 只在收到第一個事件之前等待逾時並備援；已經開始輸出後就不能再換模型
+                event = await asyncio.wait_for(stream.__anext__(), self._scheduler._timeout)
+                received = True
+                while True:
+                    if event.type == "response.completed" and event.response.usage is not None:
+                        usage = event.response.usage
+                    yield event
+                    event = await stream.__anext__()
+            except StopAsyncIteration:
+                pass
+            except Exception as e:
+                if received or not should_fallback(e):
+                    raise
+                self._scheduler._record(tier, option, started, failed=True)
+                if index == len(options) - 1:
+                    raise
+                logger.warning(f"Model {option.name} failed ({type(e).__name__}), falling back to {options[index + 1].name}")
+                continue
+            finally:
+                await stream.aclose()
+            self._scheduler._record(tier, option, started, usage)
+            return
@@ -0,0 +1,200 @@
+"""
+代理執行延遲分析（本機 profiler）
+
+一次 Runner.run(gm_agent, ...) 的時間分散在安全檢查的 LLM、gm_agent 回合、交接、
+專業代理回合與工具執行之間，從外部只看得到總時間。
+
+LocalProfiler 是一個 agents 的 TracingProcessor，直接接收 SDK 本來就會產生的 span
+（agent、generation、function、handoff、guardrail 等），不需要任何外部追蹤服務：
+1. 每次執行（trace）結束時，把時間軸寫入 <prefix>.timeline.jsonl，
+   每個 span 記錄開始偏移、耗時、巢狀深度、模型名稱與 token 數
+2. 同時累積 folded stacks（<prefix>.folded），可用 flamegraph.pl 或 speedscope 產生火焰圖
+3. report() 依 span 類別（例如 generation:gpt-5、function:get_inventory）輸出百分位數表
+
+用法：
+    profiler = enable_profiling("profile")   # 取代預設的 OpenAI 追蹤匯出
+    await Runner.run(gm_agent, "...")
+    print(profiler.report())
+"""
+
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agents import set_trace_processors
+from agents.tracing import Span, Trace, TracingProcessor
+
+
+def _label(span: Span[Any]) -> str:
+    data = span.span_data
+    kind = data.type
+    if kind == "generation":
+        return f"generation:{data.model or '?'}"
+    if kind == "response":
+        model = getattr(data.response, "model", None) if data.response else None
+        return f"response:{model or '?'}"
+    if kind == "handoff":
+        return f"handoff:{data.from_agent}->{data.to_agent}"
+    name = getattr(data, "name", None)
+    return f"{kind}:{name}" if name else kind
+
+
+def _tokens(span: Span[Any]) -> Dict[str, int]:
+    data = span.span_data
+    usage = None
+    if data.type == "generation":
+        usage = data.usage
+    elif data.type == "response" and data.response is not None and data.response.usage is not None:
+        usage = data.response.usage.model_dump()
+    if not usage:
+        return {}
+    return {
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+    }
+
+
+def _ms(start: Optional[str], end: Optional[str]) -> float:
+    if not start or not end:
+        return 0.0
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() * 1000
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class LocalProfiler(TracingProcessor):
+    """把 agents 的 trace / span 轉成本機時間軸、火焰圖資料與百分位數報表"""
+
+    def __init__(self, prefix: str = "profile"):
+        self._timeline_path = Path(f"{prefix}.timeline.jsonl")
+        self._folded_path = Path(f"{prefix}.folded")
+        self._lock = threading.Lock()
+        self._traces: Dict[str, Dict[str, Any]] = {}
+        self._spans: Dict[str, List[Span[Any]]] = defaultdict(list)
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._token_totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"input_tokens": 0, "output_tokens": 0})
+        self._folded: Dict[str, float] = defaultdict(float)
+
+    # ========================================================
+    # TracingProcessor 介面
+    # ========================================================
+    def on_trace_start(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = {"name": trace.name}
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with self._lock:
+            info = self._traces.pop(trace.trace_id, {"name": trace.name})
+            spans = self._spans.pop(trace.trace_id, [])
+        if spans:
+            self._record(trace.trace_id, info, spans)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        pass
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        with self._lock:
+            self._spans[span.trace_id].append(span)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+
+    def force_flush(self) -> None:
+        with self._lock:
+            folded = "".join(f"{stack} {round(ms * 1000)}\n" for stack, ms in self._folded.items())
+        # folded stacks 以微秒為單位，避免短 span 四捨五入成 0
+        self._folded_path.write_text(folded, encoding="utf-8")
+
+    # ========================================================
+    # 彙整
+    # ========================================================
+    def _record(self, trace_id: str, info: Dict[str, Any], spans: List[Span[Any]]) -> None:
+        by_id = {span.span_id: span for span in spans}
+        origin = min(span.started_at for span in spans if span.started_at)
+
+        def path(span: Span[Any]) -> List[str]:
+            labels = []
+            while span is not None:
+                labels.append(_label(span))
+                span = by_id.get(span.parent_id)
+            return [info["name"], *reversed(labels)]
+
+        children_ms: Dict[str, float] = defaultdict(float)
+        for span in spans:
+            if span.parent_id in by_id:
+                children_ms[span.parent_id] += _ms(span.started_at, span.ended_at)
+
+        # 模型呼叫的模型名稱與 token 數也掛到所屬的 agent span 上
+        agent_models: Dict[str, set] = defaultdict(set)
+        agent_tokens: Dict[str, Dict[str, int]] = defaultdict(lambda: {"input_tokens": 0, "output_tokens": 0})
+        for span in spans:
+            if span.span_data.type not in ("generation", "response"):
+                continue
+            owner = by_id.get(span.parent_id)
+            while owner is not None and owner.span_data.type != "agent":
+                owner = by_id.get(owner.parent_id)
+            if owner is not None:
+                agent_models[owner.span_id].add(_label(span).split(":", 1)[1])
+                for key, value in _tokens(span).items():
+                    agent_tokens[owner.span_id][key] += value
+
+        timeline = []
+        with self._lock:
+            for span in sorted(spans, key=lambda s: s.started_at or ""):
+                label = _label(span)
+                duration = _ms(span.started_at, span.ended_at)
+                tokens = _tokens(span) or (agent_tokens[span.span_id] if span.span_id in agent_models else {})
+                models = sorted(agent_models.get(span.span_id, ()))
+                stack = path(span)
+                self._durations[label].append(duration)
+                for key, value in tokens.items():
+                    self._token_totals[label][key] += value
+                # 自身時間 = 總時間 - 子 span 時間（平行的子 span 可能超過，取 0）
+                self._folded[";".join(stack)] += max(0.0, duration - children_ms[span.span_id])
+                timeline.append({
+                    "span": label,
+                    "depth": len(stack) - 2,
+                    "start_ms": round(_ms(origin, span.started_at), 2),
+                    "duration_ms": round(duration, 2),
+                    **({"model": ",".join(models)} if models else {}),
+                    **tokens,
+                    **({"error": span.error["message"]} if span.error else {}),
+                })
+
+        ends = [span.ended_at for span in spans if span.ended_at]
+        record = {
+            "trace_id": trace_id,
+            "name": info["name"],
+            "duration_ms": round(_ms(origin, max(ends)), 2) if ends else 0.0,
+            "spans": timeline,
+        }
+        with self._timeline_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def report(self) -> str:
+        """各類 span 的次數、p50 / p95 / max 延遲與 token 總數"""
+        with self._lock:
+            rows = sorted(self._durations.items(), key=lambda item: -sum(item[1]))
+            header = f"{'span':<48} {'count':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'in tok':>8} {'out tok':>8}"
+            lines = [header, "-" * len(header)]
+            for label, values in rows:
+                tokens = self._token_totals.get(label, {})
+                lines.append(
+                    f"{label[:48]:<48} {len(values):>5} {_percentile(values, 0.5):>9.1f} "
+                    f"{_percentile(values, 0.95):>9.1f} {max(values):>9.1f} "
+                    f"{tokens.get('input_tokens', 0):>8} {tokens.get('output_tokens', 0):>8}"
+                )
+        return "\n".join(lines)
+
+
+def enable_profiling(prefix: str = "profile") -> LocalProfiler:
+    """以 LocalProfiler 取代預設的追蹤處理器（不再上傳到 OpenAI 追蹤服務）"""
+    profiler = LocalProfiler(prefix)
+    set_trace_processors([profiler])
+    return profiler
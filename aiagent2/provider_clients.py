@@ -0,0 +1,238 @@
+"""
+模型提供者的 HTTP 連線管理
+
+原本 OpenAI 與 LiteLLM（Gemini）各自建立連線：
+AsyncOpenAI 使用預設的 httpx 連線池，LiteLLM 則在第一次呼叫時自行建立 aiohttp session；
+結束時再以手寫的 finally 逐一關閉，最後 sleep(0.5) 等待連線收尾。
+
+ProviderClients 統一管理兩邊的連線：
+1. OpenAI：以調整過上限與 keep-alive 的 httpx 連線池建立唯一的 AsyncOpenAI client，所有代理共用
+2. LiteLLM：建立一個共用的 aiohttp ClientSession，由 litellm_model() 建立的模型在每次呼叫時
+   以 shared_session 參數交給 LiteLLM，重用同一個連線池
+   （不放在 ModelSettings.extra_args：SDK 會為了追蹤 deepcopy 模型設定，session 無法複製）；
+   這需要覆寫 LitellmModel 的私有方法 _fetch_response，因此 pyproject.toml 把 openai-agents 釘在確定的版本，
+   匯入時也會檢查它的參數，升級後簽章改變就立刻報錯，而不是默默不再共用連線
+3. start() 時預先連線（warmup），第一個請求不必再付 TCP / TLS 交握的時間
+4. aclose() 依序關閉所有連線並等待完成，不需要 sleep
+5. metrics() 回報各提供者的請求數、新建 / 重用的連線數與平均延遲
+
+用法：
+    clients = ProviderClients(api_key, litellm_warmup_url="https://generativelanguage.googleapis.com/")
+    model = OpenAIChatCompletionsModel(model="gpt-5", openai_client=clients.openai)
+    agent = Agent(..., model=clients.litellm_model(model="gemini/...", api_key=...))
+    await clients.start()
+    ...
+    await clients.aclose()
+"""
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+import httpx
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.logger import logger
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+
+@dataclass
+class _PoolMetrics:
+    requests: int = 0
+    errors: int = 0
+    new_connections: int = 0
+    total_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": max(0, self.requests - self.new_connections),
+            "avg_latency_ms": round(self.total_seconds * 1000 / self.requests, 1) if self.requests else 0.0,
+        }
+
+
+class ProviderClients:
+    """OpenAI 與 LiteLLM 共用的連線池、預熱與關閉"""
+
+    def __init__(
+            self,
+            openai_api_key: str,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry: float = 60.0,
+            connect_timeout: float = 5.0,
+            read_timeout: float = 120.0,
+            litellm_warmup_url: Optional[str] = None,
+    ):
+        """
+        參數：
+            openai_api_key: OpenAI API 金鑰
+            max_connections: 每個提供者最多同時開啟的連線數
+            max_keepalive_connections: 閒置時保留的連線數
+            keepalive_expiry: 閒置連線保留多久（秒）
+            connect_timeout / read_timeout: 連線與讀取逾時（秒）
+            litellm_warmup_url: LiteLLM 模型的 API 位址，start() 時預先連線
+        """
+        self._max_connections = max_connections
+        self._keepalive_expiry = keepalive_expiry
+        self._litellm_warmup_url = litellm_warmup_url
+        self._openai_metrics = _PoolMetrics()
+        self._litellm_metrics = _PoolMetrics()
+
+        self._openai_http = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            event_hooks={"request": [self._on_openai_request], "response": [self._on_openai_response]},
+        )
+        self.openai = AsyncOpenAI(api_key=openai_api_key, http_client=self._openai_http)
+
+        # aiohttp session 需要在 event loop 中建立，start() 時才建立
+        self._litellm_session = None
+
+    def litellm_model(self, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None) -> LitellmModel:
+        """建立使用共用 aiohttp session 的 LitellmModel"""
+        return _SharedSessionLitellmModel(self, model=model, base_url=base_url, api_key=api_key)
+
+    # ========================================================
+    # 指標
+    # ========================================================
+    async def _on_openai_request(self, request: httpx.Request) -> None:
+        self._openai_metrics.requests += 1
+        request.extensions["started"] = time.perf_counter()
+
+        # httpcore 在建立新連線時會呼叫 trace，藉此區分新建與重用的連線
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self._openai_metrics.new_connections += 1
+        request.extensions["trace"] = trace
+
+    async def _on_openai_response(self, response: httpx.Response) -> None:
+        started = response.request.extensions.get("started")
+        if started is not None:
+            self._openai_metrics.total_seconds += time.perf_counter() - started
+        if response.status_code >= 400:
+            self._openai_metrics.errors += 1
+
+    def _litellm_trace_config(self):
+        import aiohttp
+
+        async def on_request_start(session, context, params):
+            self._litellm_metrics.requests += 1
+            context.started = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            self._litellm_metrics.total_seconds += time.perf_counter() - context.started
+            if params.response.status >= 400:
+                self._litellm_metrics.errors += 1
+
+        async def on_request_exception(session, context, params):
+            self._litellm_metrics.errors += 1
+
+        async def on_connection_create_end(session, context, params):
+            self._litellm_metrics.new_connections += 1
+
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        config.on_connection_create_end.append(on_connection_create_end)
+        return config
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {"openai": self._openai_metrics.as_dict(), "litellm": self._litellm_metrics.as_dict()}
+
+    # ========================================================
+    # 生命週期
+    # ========================================================
+    async def start(self, warmup: bool = True) -> None:
+        """建立 LiteLLM 共用的 aiohttp session，並預先連線到各提供者"""
+        import aiohttp
+
+        if self._litellm_session is None or self._litellm_session.closed:
+            self._litellm_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._max_connections,
+                    keepalive_timeout=self._keepalive_expiry,
+                    ttl_dns_cache=300,
+                ),
+                trace_configs=[self._litellm_trace_config()],
+            )
+
+        if warmup:
+            await asyncio.gather(self._warmup_openai(), self._warmup_litellm())
+
+    async def _warmup_openai(self) -> None:
+        # 任何回應（包含 401 / 404）都代表 TCP + TLS 連線已建立並留在連線池中
+        try:
+            await self._openai_http.head(str(self.openai.base_url))
+        except httpx.HTTPError as e:
+            logger.warning(f"OpenAI warmup failed: {e}")
+
+    async def _warmup_litellm(self) -> None:
+        if not self._litellm_warmup_url:
+            return
+        try:
+            async with self._litellm_session.head(self._litellm_warmup_url) as response:
+                await response.read()
+        except Exception as e:
+            logger.warning(f"LiteLLM warmup failed: {e}")
+
+    async def aclose(self) -> None:
+        """關閉所有連線池；每一步都等待完成，不需要額外 sleep"""
+        import litellm
+        from litellm.llms.custom_httpx.async_client_cleanup import close_litellm_async_clients
+
+        await self.openai.close()
+
+        if self._litellm_session is not None:
+            await self._litellm_session.close()
+            self._litellm_session = None
+        # LiteLLM 內部快取的其他 client（未透過共用 session 建立者）
+        await close_litellm_async_clients()
+        if getattr(litellm, "aiohttp_session", None) is not None:
+            await litellm.aiohttp_session.close()
+        if getattr(litellm, "module_level_aclient", None) is not None:
+            await litellm.module_level_aclient.close()
+
+
+# _SharedSessionLitellmModel 依賴的私有方法簽章（openai-agents 0.6.4）
+_FETCH_RESPONSE_PARAMS = ["self", "system_instructions", "input", "model_settings"]
+
+
+def _check_fetch_response_signature() -> None:
+    """確認 LitellmModel._fetch_response 仍以第三個參數接收 model_settings，否則無法帶入共用 session"""
+    fetch = getattr(LitellmModel, "_fetch_response", None)
+    params = list(inspect.signature(fetch).parameters)[:len(_FETCH_RESPONSE_PARAMS)] if fetch else []
+    if params != _FETCH_RESPONSE_PARAMS:
+        raise RuntimeError(
+            f"LitellmModel._fetch_response{inspect.signature(fetch) if fetch else ' is missing'}: "
+            f"expected parameters starting with {_FETCH_RESPONSE_PARAMS}; "
+            "openai-agents changed a private API that provider_clients.py overrides, "
+            "update _SharedSessionLitellmModel before upgrading openai-agents"
+        )
+
+
+_check_fetch_response_signature()
+
+
+class _SharedSessionLitellmModel(LitellmModel):
+    """在每次呼叫 LiteLLM 時帶入 ProviderClients 的共用 aiohttp session"""
+
+    def __init__(self, clients: ProviderClients, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._clients = clients
+
+    async def _fetch_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        session = self._clients._litellm_session
+        if session is not None and not session.closed:
+            model_settings = replace(
+                model_settings, extra_args={**(model_settings.extra_args or {}), "shared_session": session},
+            )
+        return await super()._fetch_response(system_instructions, input, model_settings, *args, **kwargs)
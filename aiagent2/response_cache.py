@@ -0,0 +1,160 @@
+"""
+回覆快取（response cache）
+
+使用者反覆詢問相同的庫存或常見問題（例如「台北店洋芋片還有多少?」），
+每次都會重新跑一遍安全檢查、交接與工具呼叫。
+
+ResponseCache 以「正規化後的輸入 + 工具資料版本」為 key 快取最終回覆：
+1. 完全相同（正規化後）的問題直接回傳快取，不呼叫任何模型
+2. 可選的語意比對：提供 embed 與 entities 函式時，與既有問題的向量相似度超過 threshold，
+   且兩個問題提到的實體（例如分店與商品）完全相同才視為命中——「台北店咖啡還有多少」與
+   「台中店咖啡還有多少」的向量幾乎一樣，只看相似度會回傳另一家分店的庫存；
+   由於輸入不完全相同，命中前仍會先對新的輸入執行一次完整的輸入防護
+3. 資料版本（例如 InventoryStore.version）改變時清空所有項目，避免回傳過期的庫存數字
+4. 只快取 cacheable_categories 類別的回覆（預設庫存與一般問題，不快取心理諮詢），被攔截的請求不會進入快取
+
+用法：
+    cache = ResponseCache(version=lambda: inventory_store.version)
+    output = await cache.run(gm_agent, "台北店洋芋片還有多少?", lambda q: run_routed(gm_agent, q, ROUTES))
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Collection, Hashable, List, Optional, Tuple
+
+from agents import Agent, RunResult
+
+from fast_router import guardrail_category
+from optimistic_guardrail import check_input
+from safety_cache import normalize
+
+
+@dataclass
+class _Entry:
+    output: Any
+    expires: float
+    vector: Optional[List[float]] = None
+    entities: Hashable = None
+
+
+class ResponseCache:
+    """以正規化輸入與資料版本為 key 的最終回覆快取，可選擇加上語意相似度比對"""
+
+    def __init__(
+            self,
+            version: Callable[[], Any],
+            ttl: float = 3600.0,
+            maxsize: int = 1000,
+            embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+            entities: Optional[Callable[[str], Hashable]] = None,
+            threshold: float = 0.92,
+            cacheable_categories: Collection[str] = ("inventory", "general"),
+    ):
+        """
+        參數：
+            version: 回傳目前工具資料版本的函式，版本改變時清空快取
+            ttl: 每筆回覆的有效秒數
+            maxsize: 最多保留幾筆（超過時淘汰最久未使用者）
+            embed: 可選的文字向量函式，與 entities 一起提供時啟用語意比對
+            entities: 取出問題中實體的函式（例如 (分店, 商品) 集合），語意命中時必須完全相同
+            threshold: 語意比對的 cosine 相似度門檻
+            cacheable_categories: 允許快取的防護類別
+        """
+        if embed is not None and entities is None:
+            raise ValueError("semantic matching needs an entities() extractor to tell similar questions apart")
+        self._version = version
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._embed = embed
+        self._entities = entities
+        self._threshold = threshold
+        self._categories = set(cacheable_categories)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._seen_version = version()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _check_version(self) -> None:
+        current = self._version()
+        if current != self._seen_version:
+            self._entries.clear()
+            self._seen_version = current
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, vector: List[float], entities: Hashable) -> Optional[_Entry]:
+        now = time.monotonic()
+        best: Tuple[float, Optional[_Entry]] = (self._threshold, None)
+        for entry in self._entries.values():
+            if entry.vector is None or entry.expires < now or entry.entities != entities:
+                continue
+            score = _cosine(vector, entry.vector)
+            if score >= best[0]:
+                best = (score, entry)
+        return best[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def run(self, agent: Agent, input: str, run: Callable[[str], Awaitable[RunResult]]) -> Any:
+        """
+        回傳快取的 final_output；未命中時呼叫 run(input) 並依類別決定是否存入
+
+        參數：
+            agent: 入口 Agent（語意命中時用它的 input_guardrails 檢查新輸入）
+            input: 使用者輸入
+            run: 實際執行的函式，例如 lambda q: run_routed(gm_agent, q, ROUTES)
+        """
+        self._check_version()
+        key = normalize(input)
+
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry.output
+
+        vector = await self._embed(input) if self._embed else None
+        entities = self._entities(input) if self._entities else None
+        if vector is not None:
+            entry = self._nearest(vector, entities)
+            if entry is not None:
+                await check_input(agent, input)  # 不同的輸入仍需通過輸入防護
+                self.semantic_hits += 1
+                return entry.output
+
+        self.misses += 1
+        version = self._version()
+        result = await run(input)
+        # 執行期間資料版本已改變時不存入，避免把舊資料算出的回覆掛在新版本底下
+        if guardrail_category(result.input_guardrail_results) in self._categories and version == self._version():
+            self._check_version()
+            self._entries[key] = _Entry(result.final_output, time.monotonic() + self._ttl, vector, entities)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return result.final_output
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
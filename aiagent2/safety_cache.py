@@ -0,0 +1,200 @@
+"""
+安全審核的判定快取與前置分類器
+
+每個使用者輸入原本都會送到 guardrail_agent 做一次 LLM 判定，即使是重複的問題也一樣。
+
+CachedSafetyClassifier 依序經過三個階段，前一階段能決定就不往下走：
+1. 判定快取：以正規化後的輸入為 key，TTL 內直接沿用先前的判定
+2. 關鍵字規則：含明確違規字詞的輸入直接攔截（規則只能攔截，不能放行）
+3. LLM 判定：其餘輸入都交給 guardrail_agent
+
+放行的判定只會來自 LLM（或快取中先前的 LLM 判定）：「怎麼偷走店裡的庫存」這類輸入
+同時含有庫存字詞與違規意圖，關鍵字無法可靠地判斷它是否無害。
+
+並統計略過 LLM 的比例，以及依實際 LLM 延遲與 token 用量估算省下的時間與費用。
+
+用法：
+    classifier = CachedSafetyClassifier(llm_safety_check, SafetyCheck)
+    verdict = await classifier.classify(user_input, ctx.context)
+    print(classifier.stats.summary())
+"""
+
+import asyncio
+import json
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from agents import Usage
+
+# ============================================================
+# 預設關鍵字規則
+# ============================================================
+# 出現任一字詞即直接攔截（對應 guardrail_agent 指示中的暴力、違法、色情、自殘等禁忌）
+BLOCK_KEYWORDS = (
+    "暴力", "殺人", "炸彈", "槍枝", "違法", "偏門", "詐騙", "洗錢", "毒品", "販毒",
+    "色情", "自殘", "自殺", "傷害自己",
+)
+
+_PUNCTUATION = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize(user_input: Any) -> str:
+    """正規化輸入：全半形統一、轉小寫、去除空白與標點；非字串輸入以 JSON 表示"""
+    if not isinstance(user_input, str):
+        return json.dumps(user_input, ensure_ascii=False, sort_keys=True, default=str)
+    text = unicodedata.normalize("NFKC", user_input).lower()
+    return _PUNCTUATION.sub("", text)
+
+
+@dataclass
+class KeywordRules:
+    """便宜的前置分類器：含違規字詞時回傳攔截的 (category, should_block)，否則回傳 None 交給 LLM"""
+    block: Iterable[str] = BLOCK_KEYWORDS
+
+    def classify(self, text: str) -> Optional[Tuple[str, bool]]:
+        if any(word in text for word in self.block):
+            return "general", True
+        return None
+
+
+# ============================================================
+# 統計
+# ============================================================
+@dataclass
+class GuardrailStats:
+    """各階段命中次數與 LLM 的實際延遲 / 費用，用來估算節省量"""
+    input_price_per_m: float   # 每百萬 input token 的美元價格
+    output_price_per_m: float  # 每百萬 output token 的美元價格
+    requests: int = 0
+    cache_hits: int = 0
+    rule_hits: int = 0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    llm_cost: float = 0.0
+
+    def record_llm(self, seconds: float, usage: Optional[Usage]) -> None:
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        if usage is not None:
+            self.llm_cost += (
+                usage.input_tokens * self.input_price_per_m
+                + usage.output_tokens * self.output_price_per_m
+            ) / 1_000_000
+
+    def summary(self) -> Dict[str, float]:
+        skipped = self.cache_hits + self.rule_hits
+        avg_latency = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        avg_cost = self.llm_cost / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "rule_hits": self.rule_hits,
+            "llm_calls": self.llm_calls,
+            "skip_ratio": round(skipped / self.requests, 3) if self.requests else 0.0,
+            "avg_llm_latency_ms": round(avg_latency * 1000, 1),
+            # 以 LLM 呼叫的平均延遲與費用，估算每個請求平均省下的量
+            "saved_latency_ms_per_request": round(skipped * avg_latency * 1000 / self.requests, 1) if self.requests else 0.0,
+            "saved_cost_usd_per_request": round(skipped * avg_cost / self.requests, 6) if self.requests else 0.0,
+        }
+
+
+# ============================================================
+# 判定快取 + 前置分類器
+# ============================================================
+class CachedSafetyClassifier:
+    """在 LLM 安全審核前加上判定快取與關鍵字規則"""
+
+    def __init__(
+            self,
+            llm_check: Callable[[Any, Any], Awaitable[Tuple[Any, Optional[Usage]]]],
+            verdict_type: type,
+            rules: Optional[KeywordRules] = None,
+            ttl: float = 600.0,
+            maxsize: int = 10_000,
+            input_price_per_m: float = 2.0,
+            output_price_per_m: float = 8.0,
+    ):
+        """
+        參數：
+            llm_check: 呼叫 guardrail_agent 的函式，回傳 (判定結果, token 用量)
+            verdict_type: 判定結果的 Pydantic 模型（SafetyCheck / SafetyCheckOutput）
+            rules: 關鍵字規則，傳入 None 使用預設規則
+            ttl: 判定快取的有效秒數
+            maxsize: 判定快取的最大筆數（超過時淘汰最久未使用者）
+            input_price_per_m / output_price_per_m: guardrail 模型的 token 價格，用於估算費用
+        """
+        self._llm_check = llm_check
+        self._verdict_type = verdict_type
+        self._rules = rules or KeywordRules()
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = GuardrailStats(input_price_per_m, output_price_per_m)
+
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, verdict = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return verdict
+
+    def _put(self, key: str, verdict: Any) -> None:
+        self._cache[key] = (time.monotonic() + self._ttl, verdict)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def classify(self, user_input: Any, context: Any = None) -> Any:
+        """回傳 verdict_type 的判定結果"""
+        self.stats.requests += 1
+        key = normalize(user_input)
+
+        # 1. 判定快取
+        cached = self._get(key)
+        if cached is not None:
+            self.stats.cache_hits += 1
+            return cached
+
+        # 2. 關鍵字規則（只處理文字輸入，只會攔截）
+        if isinstance(user_input, str):
+            decided = self._rules.classify(key)
+            if decided is not None:
+                self.stats.rule_hits += 1
+                category, should_block = decided
+                verdict = self._verdict_type(category=category, should_block=should_block)
+                self._put(key, verdict)
+                return verdict
+
+        # 3. LLM 判定；相同輸入同時進來時只呼叫一次
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats.cache_hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            started = time.perf_counter()
+            verdict, usage = await self._llm_check(user_input, context)
+            self.stats.record_llm(time.perf_counter() - started, usage)
+            self._put(key, verdict)
+            future.set_result(verdict)
+            return verdict
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 避免沒有其他等待者時出現 "exception was never retrieved"
+            raise
+        finally:
+            del self._inflight[key]
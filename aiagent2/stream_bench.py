@@ -0,0 +1,115 @@
+"""
+串流輸出閘道量測（使用本機假事件串流，不需要 API 金鑰）
+
+以固定間隔產生 ResponseTextDeltaEvent，模擬模型逐 token 輸出，比較：
+1. 逐 delta print(flush=True) 與合併成訊框後寫出的寫入次數
+2. 一個串流分送給多個訂閱者時，慢速訂閱者被中斷，其他訂閱者的完成時間不受影響
+3. 代理串流中途失敗時，每個訂閱者都會收到原本的例外
+
+用法：
+    uv run python stream_bench.py --tokens 2000 --token-ms 1 --subscribers 50
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+from agents import RawResponsesStreamEvent
+from openai.types.responses import ResponseTextDeltaEvent
+
+from stream_gateway import StreamGateway, write_frames
+
+
+class _CountingWriter(io.StringIO):
+    """計算 flush 次數（每次 flush 代表一次寫到終端機的系統呼叫）"""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+async def fake_stream(tokens: int, token_ms: float):
+    for i in range(tokens):
+        await asyncio.sleep(token_ms / 1000)
+        yield RawResponsesStreamEvent(data=ResponseTextDeltaEvent(
+            type="response.output_text.delta", delta="字", item_id="msg", output_index=0,
+            content_index=0, sequence_number=i, logprobs=[],
+        ))
+
+
+async def run(args: argparse.Namespace) -> None:
+    # 1. 逐 delta 寫出 vs 合併訊框
+    out = _CountingWriter()
+    started = time.perf_counter()
+    async for event in fake_stream(args.tokens, args.token_ms):
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            print(event.data.delta, end="", file=out, flush=True)
+    per_delta = (out.flushes, time.perf_counter() - started)
+
+    out = _CountingWriter()
+    started = time.perf_counter()
+    gateway = StreamGateway(fake_stream(args.tokens, args.token_ms), max_delay=args.max_delay_ms / 1000)
+    text = await write_frames(gateway.subscribe(), out)
+    coalesced = (out.flushes, time.perf_counter() - started)
+    assert len(text) == args.tokens
+
+    print(f"tokens={args.tokens}  token interval={args.token_ms}ms  max_delay={args.max_delay_ms}ms")
+    print(f"per-delta print : writes={per_delta[0]:<6} seconds={per_delta[1]:.2f}")
+    print(f"coalesced frames: writes={coalesced[0]:<6} seconds={coalesced[1]:.2f}")
+
+    # 2. 分送給多個訂閱者，其中一個每個訊框要處理 slow_ms
+    gateway = StreamGateway(
+        fake_stream(args.tokens, args.token_ms),
+        max_delay=args.max_delay_ms / 1000, queue_size=8,
+    )
+
+    async def consume(slow: bool) -> tuple:
+        frames = 0
+        async for frame in gateway.subscribe():
+            frames += 1
+            if slow:
+                await asyncio.sleep(args.slow_ms / 1000)
+            if frame["type"] in ("done", "error"):
+                return frame["type"], frames, time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(consume(False) for _ in range(args.subscribers)), consume(True))
+    fast = results[:-1]
+    print(
+        f"fan-out to {args.subscribers} subscribers: frames={gateway.frames} "
+        f"all done={all(r[0] == 'done' for r in fast)} max seconds={max(r[2] for r in fast):.2f}"
+    )
+    print(f"slow subscriber: ended with {results[-1][0]!r} after {results[-1][1]} frames, "
+          f"dropped subscribers={gateway.dropped_subscribers}")
+
+    # 3. 代理串流在一半時失敗
+    async def failing_stream():
+        async for event in fake_stream(args.tokens // 2, args.token_ms):
+            yield event
+        raise RuntimeError("model API error")
+
+    gateway = StreamGateway(failing_stream(), max_delay=args.max_delay_ms / 1000)
+
+    async def consume_failing() -> str:
+        try:
+            await write_frames(gateway.subscribe(), io.StringIO())
+        except RuntimeError as e:
+            return str(e)
+        return "no error"
+
+    errors = await asyncio.gather(*(consume_failing() for _ in range(args.subscribers)))
+    print(f"failing stream: {errors.count('model API error')}/{args.subscribers} subscribers raised the source error")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming gateway benchmark with a fake token stream")
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-ms", type=float, default=1)
+    parser.add_argument("--max-delay-ms", type=float, default=50)
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument("--slow-ms", type=float, default=500)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,274 @@
+"""
+串流輸出閘道（streaming gateway）
+
+原本的範例對 run_streamed 的每個 ResponseTextDeltaEvent 都 print(..., flush=True)，
+一個 token 就是一次系統呼叫；同一個回覆要送給多個網頁客戶端時，也得各自重跑一次代理。
+
+StreamGateway 讀取一個代理串流，轉成「訊框（frame）」後分送給多個訂閱者：
+1. 合併（coalesce）：文字 delta 累積到 max_chars 個字，或距離第一個未送出的 delta
+   已過 max_delay 秒，才組成一個 text 訊框；交接時另外送出 agent 訊框
+2. 分送（fan-out）：一個代理串流可同時有多個訂閱者（SSE、WebSocket、終端機），
+   每個訂閱者有自己的有限佇列；replay=True 的訂閱者會先收到最近 history_size 個已送出的訊框，
+   更早的訊框已被丟棄時，回放前先收到一個 truncated 訊框（串流結束後才訂閱也一樣）
+3. 背壓（backpressure）：分送不會等待任何訂閱者；某個訂閱者的佇列滿了就立刻中斷它並送出 error 訊框，
+   不會無限制累積記憶體，也不會拖慢其他訂閱者或暫停讀取代理串流
+4. 錯誤：代理串流的例外（API 錯誤、InputGuardrailTripwireTriggered 等）在送出已累積的文字後，
+   由每個訂閱者的 async for 原樣拋出，呼叫端可以像直接讀取 stream_events() 一樣處理
+
+訊框格式（dict，可直接轉成 JSON）：
+    {"type": "text", "text": "..."} / {"type": "agent", "name": "..."} /
+    {"type": "done"} / {"type": "error", "message": "..."}（慢速訂閱者被中斷；SSE / WebSocket 拋出例外前也會送出）/
+    {"type": "truncated", "dropped": n}（只出現在回放開頭：前 n 個訊框已不在歷史中）
+
+用法：
+    gateway = StreamGateway(Runner.run_streamed(agent, input="..."))
+    await write_frames(gateway.subscribe())            # 終端機：每個訊框一次寫入
+    return sse_response(gateway.subscribe(replay=True))  # Starlette SSE
+    await send_websocket(websocket, gateway.subscribe())  # Starlette WebSocket
+"""
+
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO
+
+from agents.logger import logger
+from openai.types.responses import ResponseTextDeltaEvent
+
+Frame = Dict[str, Any]
+
+_DONE = object()
+
+
+async def coalesce(source: Any, max_chars: int = 256, max_delay: float = 0.05) -> AsyncIterator[Frame]:
+    """
+    把代理串流事件合併成訊框
+
+    參數：
+        source: Runner.run_streamed 的結果，或任何 StreamEvent 的 async iterable
+        max_chars: 文字訊框最多累積幾個字就送出
+        max_delay: 第一個未送出的 delta 最多等待幾秒就送出
+
+    來源串流的例外會在送出已累積的文字後原樣拋出
+    """
+    events = source.stream_events() if hasattr(source, "stream_events") else source
+    # 由獨立的 task 讀取事件：等待逾時時只取消 queue.get，不會中斷代理串流本身
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(_DONE)
+
+    reader = asyncio.create_task(pump())
+    buffer: List[str] = []
+    size = 0
+    deadline: Optional[float] = None
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                event = None
+
+            if event is None or event is _DONE or isinstance(event, Exception):
+                if buffer:
+                    yield {"type": "text", "text": "".join(buffer)}
+                    buffer, size, deadline = [], 0, None
+            if event is None:
+                continue
+            if event is _DONE:
+                yield {"type": "done"}
+                return
+            if isinstance(event, Exception):
+                raise event
+
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                buffer.append(event.data.delta)
+                size += len(event.data.delta)
+                deadline = deadline or time.monotonic() + max_delay
+                if size >= max_chars:
+                    yield {"type": "text", "text": "".join(buffer)}
+                    buffer, size, deadline = [], 0, None
+            elif event.type == "agent_updated_stream_event":
+                if buffer:
+                    yield {"type": "text", "text": "".join(buffer)}
+                    buffer, size, deadline = [], 0, None
+                yield {"type": "agent", "name": event.new_agent.name}
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+
+def error_frame(error: BaseException) -> Frame:
+    return {"type": "error", "message": f"{type(error).__name__}: {error}"}
+
+
+class _Subscriber:
+    def __init__(self):
+        # 由閘道檢查 queue_size，佇列本身不設上限，結束訊號永遠放得進去
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.error: Optional[Frame] = None
+
+
+class StreamGateway:
+    """把一個代理串流合併成訊框，並以有限佇列分送給多個訂閱者"""
+
+    def __init__(
+            self,
+            source: Any,
+            max_chars: int = 256,
+            max_delay: float = 0.05,
+            queue_size: int = 64,
+            history_size: int = 256,
+    ):
+        """
+        參數：
+            source: Runner.run_streamed 的結果，或任何 StreamEvent 的 async iterable
+            max_chars / max_delay: 文字訊框的大小與時間上限
+            queue_size: 每個訂閱者最多暫存幾個訊框，超過就中斷該訂閱者
+            history_size: 最多保留幾個已送出的訊框供 replay 回放（0 表示不保留），避免長串流無限制累積
+        """
+        self._source = source
+        self._max_chars = max_chars
+        self._max_delay = max_delay
+        self._queue_size = queue_size
+        self._subscribers: List[_Subscriber] = []
+        self._history: deque = deque(maxlen=history_size)
+        self._task: Optional[asyncio.Task] = None
+        self.frames = 0
+        self.dropped_subscribers = 0
+        # 代理串流的例外（訂閱者讀完已送出的訊框後拋出）
+        self.exception: Optional[Exception] = None
+
+    def start(self) -> None:
+        """開始讀取代理串流（第一個訂閱者開始讀取時也會自動呼叫）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async for frame in coalesce(self._source, self._max_chars, self._max_delay):
+                self.frames += 1
+                self._history.append(frame)
+                for sub in list(self._subscribers):
+                    self._deliver(sub, frame)
+        except Exception as e:
+            self.exception = e
+        for sub in list(self._subscribers):
+            self._close(sub)
+
+    def _deliver(self, sub: _Subscriber, frame: Frame) -> None:
+        if sub.queue.qsize() >= self._queue_size:
+            logger.warning("Dropping slow stream subscriber")
+            self.dropped_subscribers += 1
+            self._close(sub, {"type": "error", "message": "slow consumer"})
+        else:
+            sub.queue.put_nowait(frame)
+
+    def _close(self, sub: _Subscriber, error: Optional[Frame] = None) -> None:
+        sub.closed = True
+        sub.error = error
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+        sub.queue.put_nowait(None)
+
+    def subscribe(self, replay: bool = False) -> AsyncIterator[Frame]:
+        """
+        訂閱訊框，直到 done / error 為止（呼叫時就完成登記，之後的訊框都不會漏掉）；
+        代理串流失敗時，讀完已送出的訊框後拋出原本的例外
+
+        參數：
+            replay: 是否先收到訂閱前已送出的最近 history_size 個訊框（例如網頁重新連線）；
+                更早的訊框已被丟棄時，回放前先收到 {"type": "truncated", "dropped": n}
+        """
+        sub = _Subscriber()
+        backlog = list(self._history) if replay else []
+        if replay and self.frames > len(backlog):
+            backlog.insert(0, {"type": "truncated", "dropped": self.frames - len(backlog)})
+        finished = self._task is not None and self._task.done()
+        if not finished:
+            self._subscribers.append(sub)
+        return self._iterate(sub, backlog, finished)
+
+    async def _iterate(self, sub: _Subscriber, backlog: List[Frame], finished: bool) -> AsyncIterator[Frame]:
+        self.start()
+        try:
+            for frame in backlog:
+                yield frame
+            if not finished:
+                while True:
+                    frame = await sub.queue.get()
+                    if frame is None:
+                        break
+                    yield frame
+            if sub.error is not None:
+                yield sub.error
+            elif self.exception is not None:
+                raise self.exception
+        finally:
+            # 訂閱者中途離開（例如網頁關閉）時不再分送給它
+            if not sub.closed:
+                self._close(sub)
+
+
+# ============================================================
+# 輸出端：終端機、SSE、WebSocket
+# ============================================================
+async def write_frames(frames: AsyncIterator[Frame], out: TextIO = sys.stdout) -> str:
+    """把文字訊框寫到終端機（每個訊框一次 write + flush），回傳完整文字；被中斷時拋出 RuntimeError"""
+    parts = []
+    async for frame in frames:
+        if frame["type"] == "text":
+            parts.append(frame["text"])
+            out.write(frame["text"])
+            out.flush()
+        elif frame["type"] == "error":
+            raise RuntimeError(f"stream subscriber dropped: {frame['message']}")
+    return "".join(parts)
+
+
+def encode_sse(frame: Frame) -> str:
+    """把訊框編成一個 Server-Sent Events 事件"""
+    return f"event: {frame['type']}\ndata: {json.dumps(frame, ensure_ascii=False)}\n\n"
+
+
+def sse_response(frames: AsyncIterator[Frame]):
+    """Starlette 的 SSE 回應（需要安裝 starlette）"""
+    from starlette.responses import StreamingResponse
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            async for frame in frames:
+                yield encode_sse(frame)
+        except Exception as e:
+            # 先讓客戶端知道串流失敗，例外仍交給伺服器處理
+            yield encode_sse(error_frame(e))
+            raise
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def send_websocket(websocket: Any, frames: AsyncIterator[Frame]) -> None:
+    """把訊框以 JSON 送到已接受的 Starlette WebSocket；客戶端斷線時停止訂閱，串流失敗時送出 error 訊框後拋出"""
+    from starlette.websockets import WebSocketDisconnect
+
+    try:
+        async for frame in frames:
+            await websocket.send_json(frame)
+    except WebSocketDisconnect:
+        await frames.aclose()
+    except Exception as e:
+        await websocket.send_json(error_frame(e))
+        raise
@@ -0,0 +1,146 @@
+"""
+本機假模型（stub model）
+
+不呼叫任何外部 API，以固定延遲回覆預先設定的內容，
+用來在本機量測 Agent 工作流的延遲，或在沒有 API 金鑰的環境下測試流程。
+
+用法：
+    model = StubModel(reply="洋芋片庫存 7", latency=0.3)
+    agent = agent.clone(model=model)
+
+    # 依輸入動態決定回覆；回傳 handoff_call(...) 可模擬交接
+    StubModel(reply=lambda input, tools, handoffs: handoff_call(handoffs[0]))
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, AsyncIterator, Callable, List, Union
+
+from agents import Model, ModelResponse, Usage
+from agents.handoffs import Handoff
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItem,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+Reply = Union[str, List[ResponseOutputItem]]
+
+_ids = itertools.count(1)
+
+
+def text_message(text: str) -> ResponseOutputMessage:
+    """建立一則助手文字訊息"""
+    return ResponseOutputMessage(
+        id=f"msg_stub_{next(_ids)}",
+        type="message",
+        role="assistant",
+        status="completed",
+        content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+    )
+
+
+def handoff_call(handoff: Handoff) -> List[ResponseOutputItem]:
+    """建立一個呼叫交接工具的 function call，讓 Runner 執行 handoff"""
+    call_id = f"call_stub_{next(_ids)}"
+    return [ResponseFunctionToolCall(
+        id=call_id, call_id=call_id, type="function_call",
+        name=handoff.tool_name, arguments="{}",
+    )]
+
+
+class StubModel(Model):
+    """以固定延遲回覆固定內容的假模型，並記錄呼叫次數"""
+
+    def __init__(
+            self,
+            reply: Union[Reply, Callable[[Any, list, list], Reply]] = "ok",
+            latency: float = 0.0,
+            name: str = "stub-model",
+            chunk_size: int = 4,
+    ):
+        self.reply = reply
+        self.latency = latency
+        self.name = name
+        self.chunk_size = chunk_size  # 串流時每個 delta 的字數
+        self.calls = 0
+
+    def _output(self, input, tools, handoffs) -> List[ResponseOutputItem]:
+        reply = self.reply(input, tools, handoffs) if callable(self.reply) else self.reply
+        return [text_message(reply)] if isinstance(reply, str) else reply
+
+    @staticmethod
+    def _usage(input, output: List[ResponseOutputItem]) -> Usage:
+        # 以字元數粗估 token 數，足以觀察相對差異
+        input_tokens = max(1, len(str(input)) // 4)
+        output_tokens = max(1, sum(len(item.model_dump_json()) for item in output) // 4)
+        return Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    async def get_response(
+            self, system_instructions, input, model_settings, tools, output_schema,
+            handoffs, tracing, *, previous_response_id=None, conversation_id=None, prompt=None,
+    ) -> ModelResponse:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        output = self._output(input, tools, handoffs)
+        return ModelResponse(output=output, usage=self._usage(input, output), response_id=None)
+
+    async def stream_response(
+            self, system_instructions, input, model_settings, tools, output_schema,
+            handoffs, tracing, *, previous_response_id=None, conversation_id=None, prompt=None,
+    ) -> AsyncIterator[Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        output = self._output(input, tools, handoffs)
+        sequence = itertools.count()
+
+        # 文字訊息拆成多個 delta 事件
+        for output_index, item in enumerate(output):
+            if not isinstance(item, ResponseOutputMessage):
+                continue
+            text = item.content[0].text
+            for start in range(0, len(text), self.chunk_size):
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta",
+                    item_id=item.id,
+                    output_index=output_index,
+                    content_index=0,
+                    delta=text[start:start + self.chunk_size],
+                    logprobs=[],
+                    sequence_number=next(sequence),
+                )
+
+        usage = self._usage(input, output)
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=next(sequence),
+            response=Response(
+                id=f"resp_stub_{next(_ids)}",
+                created_at=time.time(),
+                model=self.name,
+                object="response",
+                output=output,
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+                usage=ResponseUsage(
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                    total_tokens=usage.total_tokens,
+                    input_tokens_details=InputTokensDetails(cached_tokens=0),
+                    output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+                ),
+            ),
+        )
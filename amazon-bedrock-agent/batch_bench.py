@@ -0,0 +1,47 @@
+"""
+批次調用吞吐量量測（使用本機假 bedrock-agent-runtime client，不需要 AWS 帳號）
+
+FakeAgentRuntimeClient 以固定延遲回應，並在同時進行中的請求超過 capacity 時回傳 ThrottlingException，
+以不同的 concurrency 跑同一批問題，比較吞吐量、延遲與限流重試次數。
+最後以同一個輸出檔重跑一次，確認已完成的問題會被略過（checkpoint / resume）。
+
+用法：
+    uv run python batch_bench.py --queries 200 --latency-ms 200 --capacity 16 --concurrency 1 8 32
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from batch_invoke import BatchItem, run_batch_to_file
+from fake_bedrock import FakeAgentRuntimeClient
+
+
+def run(args: argparse.Namespace) -> None:
+    items = [BatchItem(id=str(i), input=f"Question #{i}: How are you?") for i in range(args.queries)]
+    print(f"queries={len(items)}  latency={args.latency_ms}ms  server capacity={args.capacity} in flight")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            client = FakeAgentRuntimeClient(latency=args.latency_ms / 1000, capacity=args.capacity)
+            output = Path(tmp) / f"results-{concurrency}.jsonl"
+            summary = run_batch_to_file(
+                client, items, output, agent_id="AGENT", alias_id="ALIAS", concurrency=concurrency,
+            )
+            summary.update(throttled=client.throttled, max_in_flight=client.max_in_flight)
+            print(f"concurrency={concurrency:<4} {json.dumps(summary)}")
+
+        resumed = run_batch_to_file(
+            FakeAgentRuntimeClient(latency=0), items, output, agent_id="AGENT", alias_id="ALIAS",
+        )
+        print(f"resume (same output file): processed={resumed['processed']} skipped={resumed['skipped']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock batch invocation benchmark with a fake runtime client")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    run(parser.parse_args())
@@ -0,0 +1,308 @@
+"""
+Bedrock Agent 批次調用
+
+評估 Agent 時要一次送出數千個問題，逐一同步呼叫 invoke_agent 太慢。
+run_batch() 改為：
+1. 以 ThreadPoolExecutor 平行執行，每個問題使用自己的 Session ID；
+   boto3 client 的 max_pool_connections 設成與並行數相同，避免執行緒搶同一個連線池
+2. botocore 的 adaptive retry 模式先在 client 端重試並降低送出速率；
+   重試用完仍被限流（或串流途中收到 throttlingException，botocore 不會重試）時，
+   由 AdaptiveConcurrency 把所有執行緒共用的並行上限減半，成功時再逐步調回（AIMD），
+   該問題則以指數退避（full jitter）重試；串流已經收到事件後才被限流時，Agent 可能已呼叫過
+   action group（Lambda 的副作用不屬於 Session，換新的 Session 重送一樣會再執行一次），
+   因此不自動重試，只記錄錯誤並標記 mid_stream
+3. 每完成一筆就以 JSONL 追加寫入輸出檔，同一個檔案也是 checkpoint：
+   重新執行時略過已成功的 id；失敗的（包含 mid_stream）會重送，
+   重跑前可先依 mid_stream 欄位確認這些問題觸發的動作是否可以重複執行
+
+輸入檔每行一筆，可以是 JSON（{"id": ..., "input": ..., "session_id": ...}）或純文字（以行號為 id）。
+
+用法：
+    uv run python batch_invoke.py questions.jsonl results.jsonl --agent-id XXX --alias-id YYY --concurrency 16
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from botocore.exceptions import ClientError, EventStreamError
+
+from clients import ClientFactory
+from response_stream import iter_chunks
+from trace_sink import TraceSink
+
+# 代表暫時被限流、可以稍後重試的錯誤碼（串流中的例外事件以小寫開頭）
+THROTTLING_CODES = {
+    "ThrottlingException", "throttlingException",
+    "ServiceQuotaExceededException", "serviceQuotaExceededException",
+    "TooManyRequestsException",
+}
+
+
+def make_client(factory: ClientFactory, max_pool_connections: int = 10, max_attempts: int = 5):
+    """取得適合平行呼叫的 bedrock-agent-runtime client（連線池大小與並行數一致、adaptive retry）"""
+    return factory.runtime(
+        max_pool_connections=max_pool_connections,
+        retries={"mode": "adaptive", "max_attempts": max_attempts},
+        read_timeout=300,
+    )
+
+
+def is_throttling(error: Exception) -> bool:
+    return isinstance(error, (ClientError, EventStreamError)) and error.response.get("Error", {}).get("Code") in THROTTLING_CODES
+
+
+def _count_events(events: Iterable[Dict[str, Any]], seen: List[int]) -> Iterator[Dict[str, Any]]:
+    """逐一轉交串流事件，並把收到的事件數記在 seen[0]"""
+    for event in events:
+        seen[0] += 1
+        yield event
+
+
+# ============================================================
+# 限流時的自適應並行度
+# ============================================================
+class AdaptiveConcurrency:
+    """
+    所有執行緒共用的並行上限（AIMD）：
+    被限流時上限減半，每次成功則緩慢增加（每個上限週期 +1），最多回到 maximum
+    """
+
+    def __init__(self, maximum: int):
+        self._maximum = maximum
+        self._limit = float(maximum)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.throttled = 0
+        self.min_limit = maximum
+
+    def __enter__(self) -> "AdaptiveConcurrency":
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.throttled += 1
+            self._limit = max(1.0, self._limit / 2)
+            self.min_limit = min(self.min_limit, int(self._limit))
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._limit = min(float(self._maximum), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+
+# ============================================================
+# 輸入 / checkpoint
+# ============================================================
+@dataclass
+class BatchItem:
+    id: str
+    input: str
+    session_id: Optional[str] = None
+
+
+def read_items(path: Path) -> List[BatchItem]:
+    items = []
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                items.append(BatchItem(
+                    id=str(record.get("id", line_no)),
+                    input=record["input"],
+                    session_id=record.get("session_id"),
+                ))
+            else:
+                items.append(BatchItem(id=str(line_no), input=line))
+    return items
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """讀取既有輸出檔中已成功的 id（失敗的會在下次執行時重跑）"""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 上次中斷時寫到一半的最後一行
+            if record.get("error") is None:
+                done.add(record["id"])
+    return done
+
+
+# ============================================================
+# 批次執行
+# ============================================================
+def invoke_one(
+        client: Any,
+        item: BatchItem,
+        agent_id: str,
+        alias_id: str,
+        limiter: AdaptiveConcurrency,
+        max_attempts: int = 5,
+        trace_sink: Optional[TraceSink] = None,
+) -> Dict[str, Any]:
+    """執行一個問題（限流時退避重試），回傳要寫入輸出檔的紀錄"""
+    session_id = item.session_id or str(uuid.uuid4())
+    if trace_sink is not None and not trace_sink.sampled(session_id):
+        trace_sink = None
+    record: Dict[str, Any] = {"id": item.id, "input": item.input, "session_id": session_id}
+    started = time.perf_counter()
+    first_chunk = None
+
+    for attempt in range(1, max_attempts + 1):
+        seen = [0]
+        try:
+            with limiter:
+                response = client.invoke_agent(
+                    inputText=item.input,
+                    agentId=agent_id,
+                    agentAliasId=alias_id,
+                    sessionId=session_id,
+                    enableTrace=trace_sink is not None,
+                    streamingConfigurations={"streamFinalResponse": True},
+                )
+                response["completion"] = _count_events(response["completion"], seen)
+                parts = []
+                for text in iter_chunks(response, trace_sink=trace_sink):
+                    first_chunk = first_chunk or time.perf_counter() - started
+                    parts.append(text)
+            limiter.on_success()
+            record.update(output="".join(parts), error=None)
+            break
+        except Exception as e:
+            # 串流途中失敗時，Agent 可能已呼叫過 action group，不論是否換 Session 都不能自動重送
+            mid_stream = seen[0] > 0
+            if is_throttling(e):
+                limiter.on_throttle()
+                if attempt < max_attempts and not mid_stream:
+                    time.sleep(random.uniform(0, 0.1 * 2 ** attempt))  # 指數退避（full jitter）
+                    continue
+            record.update(output=None, error=f"{type(e).__name__}: {e}", mid_stream=mid_stream)
+            break
+
+    record.update(
+        attempts=attempt,
+        first_chunk_ms=round(first_chunk * 1000, 1) if first_chunk else None,
+        latency_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+    return record
+
+
+def run_batch(
+        client: Any,
+        items: Iterable[BatchItem],
+        output: Path,
+        agent_id: str,
+        alias_id: str,
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        trace_sink: Optional[TraceSink] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    以有限並行度執行所有問題，每完成一筆就寫入 output 並產出該筆結果
+
+    參數：
+        client: bedrock-agent-runtime client（建議用 make_client(max_pool_connections=concurrency)）
+        items: 要處理的問題
+        output: JSONL 輸出檔（同時作為 checkpoint）
+        agent_id / alias_id: Bedrock Agent 的 ID 與別名 ID
+        concurrency: 最多同時執行幾筆
+        max_attempts: 被限流時每個問題最多嘗試幾次
+        trace_sink: 擷取取樣到的問題的 trace（可選）
+    """
+    done = completed_ids(output)
+    pending = [item for item in items if item.id not in done]
+    limiter = AdaptiveConcurrency(concurrency)
+
+    # 只有主執行緒會寫檔，不需要額外的鎖
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, output.open("a", encoding="utf-8") as f:
+        futures = [
+            pool.submit(invoke_one, client, item, agent_id, alias_id, limiter, max_attempts, trace_sink)
+            for item in pending
+        ]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                yield record
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def run_batch_to_file(client: Any, items: List[BatchItem], output: Path, **kwargs: Any) -> Dict[str, Any]:
+    """執行批次並回傳摘要統計"""
+    started = time.perf_counter()
+    records = list(run_batch(client, items, output, **kwargs))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(record["latency_ms"] for record in records)
+    return {
+        "processed": len(records),
+        "skipped": len(items) - len(records),
+        "errors": sum(1 for record in records if record["error"]),
+        "mid_stream_errors": sum(1 for record in records if record.get("mid_stream")),
+        "retries": sum(record["attempts"] - 1 for record in records),
+        "seconds": round(elapsed, 2),
+        "throughput_per_s": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Invoke a Bedrock agent for many queries in parallel")
+    parser.add_argument("input", type=Path, help="JSONL or plain-text file, one query per line")
+    parser.add_argument("output", type=Path, help="JSONL results; also used as the resume checkpoint")
+    parser.add_argument("--agent-id", required=True)
+    parser.add_argument("--alias-id", required=True)
+    parser.add_argument("--region", default=None, help="defaults to AWS_REGION or ap-southeast-2")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--trace-file", type=Path, default=None, help="capture traces as JSON lines")
+    parser.add_argument("--trace-sample", type=float, default=0.1, help="fraction of queries to trace")
+    args = parser.parse_args()
+
+    trace_sink = TraceSink(args.trace_file, sample_rate=args.trace_sample) if args.trace_file else None
+    summary = run_batch_to_file(
+        make_client(ClientFactory(args.region), max_pool_connections=args.concurrency),
+        read_items(args.input),
+        args.output,
+        agent_id=args.agent_id,
+        alias_id=args.alias_id,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        trace_sink=trace_sink,
+    )
+    if trace_sink is not None:
+        trace_sink.close()
+        summary["traces"] = trace_sink.written
+    print(json.dumps(summary, ensure_ascii=False))
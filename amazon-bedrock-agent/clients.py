@@ -0,0 +1,85 @@
+"""
+AWS client 工廠（延遲建立、快取共用）
+
+原本 main.py 一被 import 就建立 STS client、bedrock-agent-runtime client 與 Session，
+並透過網路呼叫 get_caller_identity()；每次 import 或測試都要付出這些成本，沒有網路時甚至無法載入。
+
+ClientFactory 改為：
+1. 第一次用到時才 import boto3、建立 Session（boto3 本身的載入也延後）
+2. 相同服務與設定的 client 只建立一次並快取（botocore client 可在多執行緒間共用）
+3. account_id() 真正需要帳號資訊時才呼叫 STS，結果快取
+
+用法：
+    clients = ClientFactory("ap-southeast-2")
+    runtime = clients.client("bedrock-agent-runtime", max_pool_connections=16)
+    clients.account_id()   # 需要時才呼叫 STS
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_REGION = "ap-southeast-2"
+
+
+class ClientFactory:
+    """延遲建立並快取 boto3 Session 與各服務的 client"""
+
+    def __init__(self, region: Optional[str] = None, profile: Optional[str] = None):
+        """
+        參數：
+            region: AWS 區域（未指定時使用 AWS_REGION 環境變數，預設 ap-southeast-2）
+            profile: ~/.aws/credentials 中的設定檔名稱（可選）
+        """
+        self.region = region or os.getenv("AWS_REGION", DEFAULT_REGION)
+        self._profile = profile
+        self._session = None
+        self._clients: Dict[Tuple[str, Tuple], Any] = {}
+        self._account_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """boto3 Session（第一次使用時才建立）"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import boto3
+
+                    self._session = boto3.session.Session(region_name=self.region, profile_name=self._profile)
+        return self._session
+
+    def client(self, service: str, **config: Any):
+        """
+        取得服務的 client，相同服務與設定只建立一次
+
+        參數：
+            service: 服務名稱，例如 "bedrock-agent-runtime"
+            config: botocore Config 的參數，例如 max_pool_connections=16、retries={"mode": "adaptive"}
+        """
+        key = (service, tuple(sorted((name, repr(value)) for name, value in config.items())))
+        client = self._clients.get(key)
+        if client is None:
+            session = self.session
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    from botocore.config import Config
+
+                    client = session.client(service, config=Config(**config) if config else None)
+                    self._clients[key] = client
+        return client
+
+    def runtime(self, **config: Any):
+        """bedrock-agent-runtime client（調用 Agent 的主要 client）"""
+        return self.client("bedrock-agent-runtime", **config)
+
+    def account_id(self) -> str:
+        """目前憑證所屬的 AWS 帳號 ID（第一次呼叫時才透過網路查詢 STS）"""
+        if self._account_id is None:
+            self._account_id = self.client("sts").get_caller_identity()["Account"]
+        return self._account_id
+
+
+# 預設的共用工廠
+default_factory = ClientFactory()
@@ -0,0 +1,143 @@
+"""
+本機假 Bedrock Agent 回應（不需要 AWS 帳號）
+
+FakeEventStream 模擬 invoke_agent 回應中的 resp["completion"]（botocore EventStream）：
+依序產出 trace / chunk 事件，每個事件之前可等待固定延遲，模擬模型逐步輸出。
+FakeAgentRuntimeClient 模擬 bedrock-agent-runtime client 的 invoke_agent（含參數驗證與限流）。
+
+用法：
+    events = make_events("Have you ever been to Taiwan? I'm fine.", traces=5)
+    resp = {"completion": FakeEventStream(events, delay=0.01)}
+    for text in iter_chunks(resp):
+        ...
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+import botocore.session
+from botocore.exceptions import ClientError
+from botocore.validate import validate_parameters
+
+
+class FakeEventStream:
+    """可迭代的假 EventStream，與 botocore 的 EventStream 一樣只能讀一次"""
+
+    def __init__(self, events: List[Dict[str, Any]], delay: float = 0.0):
+        self._events = events
+        self._delay = delay
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for event in self._events:
+            if self._delay:
+                time.sleep(self._delay)
+            yield event
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def trace_event(step: int, code_interpreter: bool = False, padding: int = 2000) -> Dict[str, Any]:
+    """一個結構與 Bedrock 相同的 orchestration trace 事件（含 datetime 與較長的模型輸入）"""
+    invocation: Dict[str, Any] = {"invocationType": "KNOWLEDGE_BASE", "traceId": f"trace-{step}"}
+    if code_interpreter:
+        invocation = {
+            "invocationType": "ACTION_GROUP_CODE_INTERPRETER",
+            "traceId": f"trace-{step}",
+            "codeInterpreterInvocationInput": {"code": "print(1 + 1)", "files": []},
+        }
+    return {
+        "trace": {
+            "agentId": "AGENT",
+            "agentAliasId": "ALIAS",
+            "sessionId": "session",
+            "eventTime": datetime.now(timezone.utc),
+            "trace": {
+                "orchestrationTrace": {
+                    "modelInvocationInput": {"text": "x" * padding, "traceId": f"trace-{step}", "type": "ORCHESTRATION"},
+                    "invocationInput": invocation,
+                },
+            },
+        },
+    }
+
+
+def make_events(answer: str, traces: int = 0, chunk_size: int = 8, code_interpreter: bool = False) -> List[Dict[str, Any]]:
+    """先產生 traces 個 trace 事件，再把答案（UTF-8）切成多個 chunk 事件"""
+    events = [trace_event(i, code_interpreter and i == 0) for i in range(traces)]
+    data = answer.encode("utf-8")
+    # 以位元組切割，中文字可能被切在兩個 chunk 之間
+    events += [{"chunk": {"bytes": data[i:i + chunk_size]}} for i in range(0, len(data), chunk_size)]
+    return events
+
+
+class FakeAgentRuntimeClient:
+    """
+    假的 bedrock-agent-runtime client
+
+    invoke_agent 的參數以 botocore 的服務模型驗證（與真正的 client 相同），
+    同時進行中的請求超過 capacity 時，模擬服務端限流並拋出 ThrottlingException。
+    與 Bedrock 一樣依 sessionId 保存 sessionAttributes；第一次看到某個 sessionId 時
+    額外等待 session_setup 秒，模擬建立新 Session 上下文的成本，endSession=True 則結束該 Session。
+    """
+
+    def __init__(
+            self,
+            answer: str = "Have you ever been to Taiwan? I'm doing great!",
+            latency: float = 0.2,
+            chunk_delay: float = 0.0,
+            capacity: int = 1_000_000,
+            traces: int = 0,
+            session_setup: float = 0.0,
+    ):
+        model = botocore.session.get_session().get_service_model("bedrock-agent-runtime")
+        self._input_shape = model.operation_model("InvokeAgent").input_shape
+        self._answer = answer
+        self._latency = latency
+        self._chunk_delay = chunk_delay
+        self._capacity = capacity
+        self._traces = traces
+        self._session_setup = session_setup
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.max_in_flight = 0
+        self.requests: List[Dict[str, Any]] = []
+        self.sessions: Dict[str, Dict[str, str]] = {}
+        self.ended_sessions = 0
+
+    def invoke_agent(self, **params: Any) -> Dict[str, Any]:
+        validate_parameters(params, self._input_shape)
+        with self._lock:
+            self.calls += 1
+            self.requests.append(params)
+            if params.get("endSession"):
+                self.sessions.pop(params["sessionId"], None)
+                self.ended_sessions += 1
+                return {"completion": FakeEventStream([]), "contentType": "application/json", "sessionId": params["sessionId"]}
+            if self._in_flight >= self._capacity:
+                self.throttled += 1
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeAgent",
+                )
+            new_session = params["sessionId"] not in self.sessions
+            attributes = self.sessions.setdefault(params["sessionId"], {})
+            attributes.update(params.get("sessionState", {}).get("sessionAttributes", {}))
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self._latency + (self._session_setup if new_session else 0.0))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        events = make_events(self._answer, traces=self._traces)
+        return {
+            "completion": FakeEventStream(events, self._chunk_delay),
+            "contentType": "application/json",
+            "sessionId": params["sessionId"],
+            "memoryId": params.get("memoryId"),
+        }
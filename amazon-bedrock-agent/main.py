@@ -14,57 +14,50 @@ Amazon Bedrock Agent Python 範例
 # ============================================================
 # 📦 匯入必要的套件
 # ============================================================
-import boto3    # AWS SDK for Python，用於調用 AWS 服務（如 Bedrock、S3、DynamoDB 等）
-import uuid     # 生成全域唯一識別碼（UUID），用於建立不重複的 Session ID
-import pprint   # 美化列印 Python 資料結構，方便除錯和查看複雜的資料
+import os       # 讀取環境變數（AWS 區域、是否顯示帳號資訊）
 import logging  # Python 標準日誌模組，用於記錄程式執行過程中的資訊、警告和錯誤
+from clients import ClientFactory  # 延遲建立並快取 boto3 Session 與 client
+from response_stream import iter_chunks  # 逐一產出串流回應的文字片段
+from sessions import SessionManager  # 依使用者重用 Session、快取 Session 狀態
+from trace_sink import TraceSink  # 以 JSON Lines 擷取 trace（可取樣）
 
 # ============================================================
 # 🔧 設定日誌系統
 # ============================================================
-# 配置日誌的輸出格式和記錄等級
-logging.basicConfig(
-    # 日誌格式：[時間] 處理序ID {檔名: 行號} 等級 - 訊息
-    format="[%(asctime)s] p%(process)s {%(filename)s: %(lineno)d} %(levelname)s - %(message)s",
-    # 設定最低記錄等級為 INFO（會記錄 INFO、WARNING、ERROR、CRITICAL）
-    level=logging.INFO,
-)
 # 建立一個專屬於當前模組的 logger 實例
+# 日誌格式與等級在 main() 中設定，import 本模組不會改變呼叫端的日誌設定
 logger = logging.getLogger(__name__)
 
 # ============================================================
 # 🌍 設定 AWS 區域和客戶端
 # ============================================================
-# 設定 AWS 區域（必須與你建立 Bedrock Agent 的區域一致）
+# 設定 AWS 區域（必須與你建立 Bedrock Agent 的區域一致），可用 AWS_REGION 環境變數覆寫
 # 常見區域：
 #   - "us-east-1"      (美國東部 - 維吉尼亞)
 #   - "us-west-2"      (美國西部 - 俄勒岡)
 #   - "ap-southeast-2" (亞太 - 雪梨)
 #   - "ap-northeast-1" (亞太 - 東京)
-region = "ap-southeast-2"  # 澳洲雪梨區域
+region = os.getenv("AWS_REGION", "ap-southeast-2")  # 預設澳洲雪梨區域
 
-# 建立 STS (Security Token Service) 客戶端
-# 用途：取得 AWS 帳號資訊，驗證身份
-sts_client = boto3.client("sts", region_name=region)
+# 建立 client 工廠
+# 注意：這裡不會建立任何 client，也不會連線到 AWS；
+#       boto3 Session 與 client 在第一次調用 Agent 時才建立並快取，
+#       STS（取得帳號 ID）只在真正需要時才呼叫，因此 import 本模組很快，離線也能載入
+clients = ClientFactory(region)
 
-# 建立 Bedrock Agent Runtime 客戶端
-# 用途：這是調用 Bedrock Agent 的主要客戶端
-#       bedrock-agent-runtime 是專門用於執行（invoke）Agent 的服務
-bedrock_agent_runtime_client = boto3.client("bedrock-agent-runtime", region_name=region)
 
-# 建立 boto3 Session（包含 AWS 配置資訊）
-session = boto3.session.Session(region_name=region)
-
-# 取得當前 AWS 帳號 ID（用於確認身份和除錯）
-account_id = sts_client.get_caller_identity()["Account"]
+def get_runtime_client():
+    """
+    取得 Bedrock Agent Runtime 客戶端（第一次呼叫時建立，之後重用）
 
-# 顯示當前設定的區域和帳號（方便確認）
-region, account_id
+    bedrock-agent-runtime 是專門用於執行（invoke）Agent 的服務
+    """
+    return clients.runtime()
 
 # ============================================================
 # 🤖 Agent 調用函數
 # ============================================================
-def invoke_agent_helper(
+def invoke_agent_stream(
         query,                   # 使用者的查詢內容（字串）
         session_id,              # Session ID，用於追蹤對話（同一 Session ID 視為同一對話）
         agent_id,                # Bedrock Agent 的唯一識別碼（從 AWS Console 取得）
@@ -74,12 +67,14 @@ def invoke_agent_helper(
         session_state=None,      # Session 狀態（儲存上下文資訊，可選）
         end_session=False,       # 是否結束 Session（True 表示結束對話）
         show_code_use=False,     # 是否顯示程式碼解釋器的使用情況
+        trace_sink=None,         # TraceSink：以 JSON Lines 擷取 trace（可選，依 Session 取樣）
 ):
     """
-    調用 Bedrock Agent 的核心函數
+    調用 Bedrock Agent，並以 generator 逐一產出回應文字
 
     此函數封裝了調用 AWS Bedrock Agent API 的所有邏輯，
-    包括參數準備、API 調用和回應處理。
+    要求 Bedrock 串流最終答案（streamFinalResponse），收到 chunk 就立刻交給呼叫者，
+    第一段文字不必等整個回應完成。
 
     參數說明：
         query (str): 使用者輸入的查詢文字
@@ -91,9 +86,10 @@ def invoke_agent_helper(
         session_state (dict, optional): Session 狀態資料
         end_session (bool): 是否結束當前 Session
         show_code_use (bool): 是否顯示程式碼解釋器使用
+        trace_sink (TraceSink, optional): trace 擷取的輸出目的地
 
-    返回：
-        str: Agent 的回應文字
+    產出：
+        str: Agent 回應的文字片段
     """
 
     # --------------------------------------------------------
@@ -103,6 +99,10 @@ def invoke_agent_helper(
     if not session_state:
         session_state = {}
 
+    # 沒有被取樣到的 Session 不擷取 trace（也不要求 Bedrock 產生 trace）
+    if trace_sink is not None and not trace_sink.sampled(session_id):
+        trace_sink = None
+
     # --------------------------------------------------------
     # 🔨 建立 API 呼叫參數
     # --------------------------------------------------------
@@ -113,9 +113,10 @@ def invoke_agent_helper(
         "agentId": agent_id,                                   # Agent 的唯一識別碼
         "agentAliasId": alias_id,                              # Agent 別名 ID（用於版本控制）
         "sessionId": session_id,                               # Session ID（追蹤對話）
-        "enableTrace": enable_trace | show_code_use,           # 啟用追蹤或程式碼顯示（使用位元運算 OR）
+        "enableTrace": enable_trace or show_code_use or trace_sink is not None,  # 啟用追蹤、程式碼顯示或 trace 擷取
         "endSession": end_session,                             # 是否結束當前 Session
         "sessionState": session_state,                         # Session 狀態資料
+        "streamingConfigurations": {"streamFinalResponse": True},  # 最終答案拆成多個 chunk 陸續送出
     }
 
     # --------------------------------------------------------
@@ -130,192 +131,151 @@ def invoke_agent_helper(
     # 📡 調用 Agent API
     # --------------------------------------------------------
     # 使用 **invoke_params 展開參數字典，調用 Bedrock Agent
-    agent_response = bedrock_agent_runtime_client.invoke_agent(**invoke_params)
+    agent_response = get_runtime_client().invoke_agent(**invoke_params)
 
     # --------------------------------------------------------
     # 🔄 處理回應
     # --------------------------------------------------------
-    # 將 Agent 的回應傳給 process_response 函數處理
-    # 並返回處理後的最終結果
-    return process_response(
-        agent_response, enable_trace=enable_trace, show_code_use=show_code_use
+    # 逐一產出事件串流中的文字片段
+    yield from iter_chunks(
+        agent_response, enable_trace=enable_trace, show_code_use=show_code_use, trace_sink=trace_sink,
     )
 
+
+def invoke_agent_helper(query, session_id, agent_id, alias_id, **kwargs):
+    """
+    調用 Bedrock Agent 並回傳完整的回應文字
+
+    參數與 invoke_agent_stream 相同。
+
+    返回：
+        str: Agent 的回應文字（所有 chunk 串接而成）
+    """
+    return "".join(invoke_agent_stream(query, session_id, agent_id, alias_id, **kwargs))
+
 # ============================================================
 # 🔄 處理 Agent 回應函數
 # ============================================================
-def process_response(resp, enable_trace:bool=False, show_code_use:bool=False):
+def process_response(resp, enable_trace:bool=False, show_code_use:bool=False, trace_sink=None):
     """
     處理 Bedrock Agent 的串流回應
 
-    此函數處理 Agent 返回的事件串流（EventStream），
-    從中提取 Agent 的最終答案和執行追蹤資訊。
+    此函數讀完 Agent 返回的事件串流（EventStream），
+    串接所有 chunk 事件的文字（不會只取第一個 chunk）。
+    需要逐段顯示時請直接使用 iter_chunks()。
 
     參數說明：
         resp (dict): Agent API 返回的回應物件
         enable_trace (bool): 是否啟用追蹤顯示
         show_code_use (bool): 是否顯示程式碼解釋器使用
+        trace_sink (TraceSink, optional): trace 擷取的輸出目的地
 
     返回：
         str: Agent 的最終回答文字
     """
+    return "".join(iter_chunks(resp, enable_trace=enable_trace, show_code_use=show_code_use, trace_sink=trace_sink))
 
-    # --------------------------------------------------------
-    # 📊 顯示原始回應（除錯用）
-    # --------------------------------------------------------
-    # 如果啟用追蹤，顯示完整的原始回應物件
-    if enable_trace:
-        logger.info(pprint.pprint(resp))
+# ============================================================
+# 🚀 主程式執行
+# ============================================================
+def main():
+    """執行範例查詢（只有直接執行本檔案時才會呼叫）"""
+    # 配置日誌的輸出格式和記錄等級
+    logging.basicConfig(
+        # 日誌格式：[時間] 處理序ID {檔名: 行號} 等級 - 訊息
+        format="[%(asctime)s] p%(process)s {%(filename)s: %(lineno)d} %(levelname)s - %(message)s",
+        # 設定最低記錄等級為 INFO（會記錄 INFO、WARNING、ERROR、CRITICAL）
+        level=logging.INFO,
+    )
+    # 範例會以 enable_trace=True 在終端顯示排版後的 trace（DEBUG 等級），只對回應處理模組開啟
+    logging.getLogger("response_stream").setLevel(logging.DEBUG)
 
-    # --------------------------------------------------------
-    # 🔁 取得事件串流
-    # --------------------------------------------------------
-    # Agent 的回應是串流形式，需要逐個處理事件
-    event_stream = resp["completion"]
+    # 設定 BEDROCK_TRACE_FILE 時，另外把 trace 以 JSON Lines 寫入檔案（BEDROCK_TRACE_SAMPLE 控制取樣比例）
+    # 事後以 `uv run python trace_viewer.py <檔案>` 檢視
+    trace_sink = TraceSink.from_env()
 
-    # --------------------------------------------------------
-    # 🔄 處理事件串流
-    # --------------------------------------------------------
-    try:
-        # 遍歷所有事件
-        for event in event_stream:
-
-            # ------------------------------------------------
-            # 📦 處理回應內容塊（chunk）
-            # ------------------------------------------------
-            # "chunk" 事件包含 Agent 的實際回應文字
-            if "chunk" in event:
-                # 取得位元組資料
-                data = event["chunk"]["bytes"]
-
-                # 如果啟用追蹤，記錄最終答案
-                if enable_trace:
-                    logger.info(f"Final answer -> \n{data.decode('utf8')}")
-
-                # 將位元組資料解碼為 UTF-8 字串
-                agent_answer = data.decode("utf8")
-
-                # 返回 Agent 的最終答案
-                # 注意：收到 chunk 事件表示請求成功完成
-                return agent_answer
-
-            # ------------------------------------------------
-            # 🔍 處理追蹤事件（trace）
-            # ------------------------------------------------
-            # "trace" 事件包含 Agent 執行過程的詳細資訊
-            elif "trace" in event:
-                # 使用 str() 而不是 json.dumps() 來避免 datetime 序列化問題
-                # 原因：trace 事件中可能包含 datetime 物件，無法直接序列化為 JSON
-                trace_str = str(event["trace"])
-
-                # 檢查是否使用了程式碼解釋器
-                if "codeInterpreterInvocationInput" in trace_str:
-                    if show_code_use:
-                        print("Invoked code interpreter")
-
-                # 如果啟用追蹤，顯示詳細的執行過程
-                if enable_trace:
-                    logger.info("Trace event:")
-                    # 使用 pprint.pformat 格式化輸出，避免 JSON 序列化問題
-                    logger.info(pprint.pformat(event["trace"], indent=2))
-
-            # ------------------------------------------------
-            # ❌ 處理未預期的事件
-            # ------------------------------------------------
-            else:
-                # 如果遇到未知的事件類型，拋出異常
-                raise Exception("unexpected event.", event)
+    # 設定 SHOW_AWS_ACCOUNT=1 時才呼叫 STS 顯示帳號（用於確認身份和除錯）
+    if os.getenv("SHOW_AWS_ACCOUNT") == "1":
+        print(f"AWS 區域: {clients.region}  帳號: {clients.account_id()}")
 
     # --------------------------------------------------------
-    # 🛡️ 錯誤處理
+    # 📝 準備查詢
     # --------------------------------------------------------
-    except TypeError as e:
-        # 捕獲 JSON 序列化錯誤（因為 trace 可能包含 datetime 物件）
-        # 這個錯誤不會中斷程式執行，只記錄警告
-        if enable_trace:
-            logger.warning(f"JSON serialization error (ignored): {e}")
-
-    except Exception as e:
-        # 其他異常會重新拋出，讓調用者處理
-        raise Exception("unexpected event.", e)
-
-# ============================================================
-# 🚀 主程式執行
-# ============================================================
-
-# --------------------------------------------------------
-# 📝 準備查詢
-# --------------------------------------------------------
-# 定義要發送給 Agent 的查詢內容
-query = "How are you?"
-
-# 使用 uuid.uuid1() 生成唯一的 Session ID
-# Session ID 用於追蹤對話，相同 ID 的請求會被視為同一個對話
-session_id = str(uuid.uuid1())
-
-# --------------------------------------------------------
-# 📤 顯示請求資訊
-# --------------------------------------------------------
-# 顯示分隔線，讓終端輸出更清晰
-print("=" * 60)
-print(f"📤 發送查詢到 Bedrock Agent")
-print(f"   查詢內容: {query}")
-print(f"   Session ID: {session_id}")
-print("=" * 60)
-
-# --------------------------------------------------------
-# 🔄 調用 Agent 並處理回應
-# --------------------------------------------------------
-try:
-    # 調用 invoke_agent_helper 函數
-    response = invoke_agent_helper(
-        query=query,                      # 查詢內容
-        session_id=session_id,            # Session ID
-
-        # ⚠️ 重要：請替換為你的實際 Agent ID 和 Alias ID
-        # 可以從 AWS Console 的 Bedrock Agent 頁面取得
+    # 定義要發送給 Agent 的多輪查詢內容（同一位使用者的連續對話）
+    user_id = "demo-user"
+    queries = ["How are you?", "What did I just ask you?"]
+
+    # SessionManager 依使用者重用同一個 Session ID，並只送出有變動的 sessionAttributes
+    # ⚠️ 重要：請替換為你的實際 Agent ID 和 Alias ID
+    # 可以從 AWS Console 的 Bedrock Agent 頁面取得
+    sessions = SessionManager(
         agent_id="Z1BBRMGWOW",           # Agent ID（需要替換）
         alias_id="7EAWVVVJ0X",           # Alias ID（需要替換）
-
-        # 啟用追蹤，顯示 Agent 執行的詳細過程（方便除錯和學習）
-        enable_trace=True,
-
+        factory=clients,                 # 使用同一個 client 工廠
         # 不使用記憶功能（多輪對話記憶）
-        # 如果需要 Agent 記住之前的對話，可以提供 memory_id
-        memory_id=None,
-
-        # 不使用 Session 狀態
-        # session_state 可以用來傳遞額外的上下文資訊
-        session_state=None,
+        # 如果需要 Agent 跨 Session 記住之前的對話，設為 True（Agent 需啟用記憶）
+        use_memory=False,
+        trace_sink=trace_sink,
+    )
 
-        # 不結束 Session（保持 Session 開啟，可以繼續對話）
-        end_session=False,
+    # Session 狀態：傳遞額外的上下文資訊，只在第一輪（或變動時）送出
+    sessions.set_attributes(user_id, language="zh-TW")
 
-        # 不顯示程式碼解釋器使用情況
-        show_code_use=False,
-    )
+    # --------------------------------------------------------
+    # 🔄 調用 Agent 並處理回應
+    # --------------------------------------------------------
+    try:
+        for query in queries:
+            # --------------------------------------------------------
+            # 📤 顯示請求資訊
+            # --------------------------------------------------------
+            # 顯示分隔線，讓終端輸出更清晰
+            print("=" * 60)
+            print(f"📤 發送查詢到 Bedrock Agent")
+            print(f"   查詢內容: {query}")
+            print(f"   Session ID: {sessions.session(user_id).session_id}")
+            print("=" * 60)
+
+            print("\n" + "=" * 60)
+            print("📥 收到 Agent 回應:")
+            print("=" * 60)
+
+            # 收到一段文字就立刻顯示
+            for text in sessions.invoke_stream(
+                user_id,
+                query,
+                # 啟用追蹤，顯示 Agent 執行的詳細過程（方便除錯和學習）
+                enable_trace=True,
+                # 不顯示程式碼解釋器使用情況
+                show_code_use=False,
+            ):
+                print(text, end="", flush=True)
+
+            print()
+            print("=" * 60)
 
     # --------------------------------------------------------
-    # 📥 顯示回應結果
+    # ❌ 錯誤處理
     # --------------------------------------------------------
-    print("\n" + "=" * 60)
-    print("📥 收到 Agent 回應:")
-    print("=" * 60)
-    print(response)
-    print("=" * 60)
-
-# --------------------------------------------------------
-# ❌ 錯誤處理
-# --------------------------------------------------------
-except Exception as e:
-    # 捕獲並顯示所有異常
-    print("\n" + "=" * 60)
-    print("❌ 發生錯誤:")
-    print("=" * 60)
-    print(f"錯誤類型: {type(e).__name__}")
-    print(f"錯誤訊息: {str(e)}")
-    print("=" * 60)
-
-    # 顯示完整的堆疊追蹤（方便除錯和定位問題）
-    import traceback
-    traceback.print_exc()
+    except Exception as e:
+        # 捕獲並顯示所有異常
+        print("\n" + "=" * 60)
+        print("❌ 發生錯誤:")
+        print("=" * 60)
+        print(f"錯誤類型: {type(e).__name__}")
+        print(f"錯誤訊息: {str(e)}")
+        print("=" * 60)
+
+        # 顯示完整的堆疊追蹤（方便除錯和定位問題）
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        # 在背景結束 Session（endSession=True），並等候完成後再離開
+        sessions.close()
+        if trace_sink is not None:
+            trace_sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Bedrock Agent 串流回應處理
+
+原本的 process_response 收到第一個 chunk 事件就 return，之後的 chunk 全部被丟掉；
+每個 trace 事件也都先 str(event["trace"]) 轉成一大段字串，只為了搜尋 codeInterpreterInvocationInput。
+
+iter_chunks() 改為：
+1. 以 generator 逐一產出 chunk 文字，收到就交給呼叫者，不必等整個回應結束（first token 最快）
+2. 以增量 UTF-8 解碼器處理 chunk，多位元組字元被切在兩個 chunk 之間也不會出錯
+3. 直接依結構化欄位（trace.trace.<xxx>Trace.invocationInput）判斷是否呼叫程式碼解釋器，不建立字串
+4. 呼叫 invoke_agent 時帶 streamingConfigurations.streamFinalResponse=True，
+   Bedrock 才會把最終答案拆成多個 chunk 陸續送出
+5. enable_trace 的排版輸出改為 DEBUG 等級並延遲排版；需要持續擷取時改用 trace_sink（TraceSink）寫入原始 JSON
+
+用法：
+    response = client.invoke_agent(**params, streamingConfigurations={"streamFinalResponse": True})
+    for text in iter_chunks(response):
+        print(text, end="", flush=True)
+"""
+
+import codecs
+import logging
+import pprint
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Mapping, Optional
+
+if TYPE_CHECKING:
+    from trace_sink import TraceSink
+
+logger = logging.getLogger(__name__)
+
+# 不含回答文字、可以略過的事件
+_IGNORED_EVENTS = ("files", "returnControl")
+
+
+def uses_code_interpreter(trace_event: Mapping[str, Any]) -> bool:
+    """trace 事件是否為程式碼解釋器的呼叫（依結構化欄位判斷）"""
+    for part in trace_event.get("trace", {}).values():
+        if isinstance(part, Mapping) and "codeInterpreterInvocationInput" in part.get("invocationInput", {}):
+            return True
+    return False
+
+
+class _Pretty:
+    """延遲排版：只有日誌真的要輸出時才呼叫 pprint.pformat"""
+
+    def __init__(self, value: Any):
+        self._value = value
+
+    def __str__(self) -> str:
+        return pprint.pformat(self._value, indent=2)
+
+
+def iter_chunks(
+        resp: Dict[str, Any],
+        enable_trace: bool = False,
+        show_code_use: bool = False,
+        trace_sink: Optional["TraceSink"] = None,
+) -> Iterator[str]:
+    """
+    依序產出 Agent 回應的文字片段
+
+    參數：
+        resp: invoke_agent 的回應（resp["completion"] 為 EventStream）
+        enable_trace: 是否記錄 trace 事件與最終答案（DEBUG 等級，排版後輸出）
+        show_code_use: 呼叫程式碼解釋器時是否顯示提示
+        trace_sink: 以 JSON Lines 擷取 trace 事件（不排版，適合正式環境）
+    """
+    session_id = resp.get("sessionId", "")
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    answer_parts = []
+
+    for event in resp["completion"]:
+        if "chunk" in event:
+            text = decoder.decode(event["chunk"]["bytes"])
+            if text:
+                answer_parts.append(text)
+                yield text
+
+        elif "trace" in event:
+            if show_code_use and uses_code_interpreter(event["trace"]):
+                print("Invoked code interpreter")
+            if trace_sink is not None:
+                trace_sink.write(session_id, event["trace"])
+            if enable_trace:
+                logger.debug("Trace event:\n%s", _Pretty(event["trace"]))
+
+        elif any(key in event for key in _IGNORED_EVENTS):
+            logger.debug(f"Ignored event: {list(event)}")
+
+        else:
+            raise Exception("unexpected event.", event)
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        answer_parts.append(tail)
+        yield tail
+
+    if enable_trace:
+        logger.debug("Final answer -> \n%s", "".join(answer_parts))
@@ -0,0 +1,132 @@
+"""
+多輪對話 Session 重用量測（使用本機假 bedrock-agent-runtime client，不需要 AWS 帳號）
+
+比較原本的作法（每一輪都用新的 Session ID、每次送出完整的 sessionState）與 SessionManager：
+1. 每輪請求的大小（JSON 位元組數）
+2. 每輪的延遲（假 client 第一次看到某個 Session 時額外等待 session_setup，模擬建立上下文；
+   延遲的差異完全來自這個假設的 session_setup，不代表 Bedrock 實際的成本，輸出結果時會一併印出）
+3. 建立與結束的 Session 數量、end() 是否立即返回
+4. 閒置逾時後換新 Session 時，屬性會完整重送，Bedrock 端的狀態與本機一致
+
+用法：
+    uv run python session_bench.py --users 20 --turns 5 --latency-ms 100 --setup-ms 150
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_bedrock import FakeAgentRuntimeClient
+from response_stream import iter_chunks
+from sessions import SessionManager
+
+
+def profile(user: int, attributes: int) -> dict:
+    """每位使用者的 sessionAttributes（例如會員資料、偏好設定）"""
+    return {f"attr_{i}": f"user-{user}-value-{i}-" + "x" * 40 for i in range(attributes)}
+
+
+def request_bytes(params: dict) -> int:
+    return len(json.dumps(params, ensure_ascii=False).encode("utf-8"))
+
+
+def legacy_conversation(client, user: int, args: argparse.Namespace) -> list:
+    """原本的作法：每一輪都產生新的 Session ID，並送出完整的 sessionState"""
+    latencies = []
+    for turn in range(args.turns):
+        started = time.perf_counter()
+        response = client.invoke_agent(
+            inputText=f"turn {turn}", agentId="AGENT", agentAliasId="ALIAS", sessionId=str(uuid.uuid1()),
+            sessionState={"sessionAttributes": profile(user, args.attributes)},
+            streamingConfigurations={"streamFinalResponse": True},
+        )
+        "".join(iter_chunks(response))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def managed_conversation(sessions: SessionManager, user: int, args: argparse.Namespace) -> list:
+    latencies = []
+    user_id = f"user-{user}"
+    sessions.set_attributes(user_id, **profile(user, args.attributes))
+    for turn in range(args.turns):
+        if turn == args.turns // 2:
+            sessions.set_attributes(user_id, attr_0="changed")  # 對話途中只有一個屬性變動
+        started = time.perf_counter()
+        sessions.invoke(user_id, f"turn {turn}")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(name: str, client: FakeAgentRuntimeClient, latencies: list) -> None:
+    requests = [request for request in client.requests if not request.get("endSession")]
+    first = [request_bytes(request) for request in requests if request["inputText"] == "turn 0"]
+    follow = [request_bytes(request) for request in requests if request["inputText"] != "turn 0"]
+    first_latency = [user[0] for user in latencies]
+    follow_latency = [value for user in latencies for value in user[1:]]
+    print(f"{name:<8} sessions={len({request['sessionId'] for request in requests}):<4} "
+          f"request bytes first={statistics.mean(first):.0f} follow-up={statistics.mean(follow):.0f}  "
+          f"latency first={statistics.mean(first_latency) * 1000:.0f}ms "
+          f"follow-up={statistics.mean(follow_latency) * 1000:.0f}ms")
+
+
+def run(args: argparse.Namespace) -> None:
+    print(f"users={args.users} turns={args.turns} attributes={args.attributes} "
+          f"latency={args.latency_ms}ms session setup={args.setup_ms}ms (simulated)")
+    fake = dict(latency=args.latency_ms / 1000, session_setup=args.setup_ms / 1000)
+
+    # 每位使用者的對話在自己的執行緒中依序進行
+    client = FakeAgentRuntimeClient(**fake)
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        latencies = list(pool.map(lambda user: legacy_conversation(client, user, args), range(args.users)))
+    summarize("legacy", client, latencies)
+
+    client = FakeAgentRuntimeClient(**fake)
+    sessions = SessionManager("AGENT", "ALIAS", client=client)
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        latencies = list(pool.map(lambda user: managed_conversation(sessions, user, args), range(args.users)))
+    summarize("managed", client, latencies)
+    print(f"  (latency difference = simulated session_setup of {args.setup_ms:.0f}ms per new session in "
+          f"fake_bedrock.py, not a measured Bedrock cost; with --setup-ms 0 only request bytes differ)")
+
+    # Bedrock 端保存的屬性應與本機快取一致
+    for user in range(args.users):
+        expected = dict(profile(user, args.attributes), attr_0="changed")
+        assert client.sessions[sessions.session(f"user-{user}").session_id] == expected
+
+    started = time.perf_counter()
+    for user in range(args.users):
+        sessions.end(f"user-{user}")
+    end_ms = (time.perf_counter() - started) * 1000
+    sessions.close()
+    print(f"end() for {args.users} sessions returned in {end_ms:.1f}ms; "
+          f"ended in background={client.ended_sessions}  stats={sessions.stats()}")
+
+    # 閒置逾時：換新 Session 並重送全部屬性
+    now = [0.0]
+    client = FakeAgentRuntimeClient(latency=0)
+    sessions = SessionManager("AGENT", "ALIAS", client=client, idle_ttl=60, clock=lambda: now[0])
+    sessions.set_attributes("alice", plan="pro", locale="zh-TW")
+    sessions.invoke("alice", "hi")
+    first_id = sessions.session("alice").session_id
+    now[0] += 61
+    sessions.invoke("alice", "still there?")
+    second_id = sessions.session("alice").session_id
+    resent = dict(client.sessions[second_id])
+    sessions.close(end_sessions=False)
+    assert first_id != second_id and resent == {"plan": "pro", "locale": "zh-TW"}
+    print(f"idle expiry: new session after 61s idle, attributes resent={resent}, "
+          f"old session ended={client.ended_sessions}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock session reuse benchmark with a fake runtime client")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--attributes", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--setup-ms", type=float, default=150)
+    run(parser.parse_args())
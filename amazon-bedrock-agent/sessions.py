@@ -0,0 +1,295 @@
+"""
+Bedrock Agent Session 管理（多輪對話重用 Session 與狀態）
+
+原本的範例每次執行都以 uuid1 產生新的 Session ID，並送出空的 sessionState；
+同一位使用者的下一輪對話只能開新的 Session，Agent 每次都要重新建立對話上下文。
+
+SessionManager 改為：
+1. 每位使用者保留一個進行中的 Session，後續對話重用同一個 sessionId；
+   閒置超過 idle_ttl（應略短於 Agent 設定的 idleSessionTTLInSeconds）或達到 max_turns 才換新的
+2. sessionAttributes 在 Session 期間由 Bedrock 保存，本機只快取已送出的值，
+   後續對話只送出有變動的屬性（promptSessionAttributes 只對單次呼叫有效，每輪照送）
+3. memoryId（長期記憶）由 agent_id 與 user_id 推導出固定的值，重新啟動或多個 worker 之間都相同，
+   記憶保存多久由 Agent 的記憶設定（storageDays）決定
+4. 結束 Session（endSession=True）交給背景執行緒，不佔用使用者請求的時間
+5. 同一個 Session 的請求依序執行（Bedrock 不接受同一個 Session 同時有多個請求）
+
+用法：
+    with SessionManager(agent_id, alias_id) as sessions:
+        sessions.set_attributes("alice", plan="pro")
+        for text in sessions.invoke_stream("alice", "How are you?"):
+            print(text, end="", flush=True)
+        print(sessions.invoke("alice", "What did I just ask?"))
+        sessions.end("alice")   # 背景結束 Session
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from clients import ClientFactory, default_factory
+from response_stream import iter_chunks
+from trace_sink import TraceSink
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentSession:
+    """一位使用者進行中的 Session 與本機快取的狀態"""
+
+    user_id: str
+    session_id: str
+    memory_id: Optional[str]
+    created_at: float
+    last_used: float
+    turns: int = 0
+    # 希望 Bedrock 端持有的 sessionAttributes（set_attributes 更新）
+    attributes: Dict[str, str] = field(default_factory=dict)
+    # 已成功送到 Bedrock 的 sessionAttributes
+    sent_attributes: Dict[str, str] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def pending_attributes(self) -> Dict[str, str]:
+        """尚未送出或已變動的 sessionAttributes"""
+        return {key: value for key, value in self.attributes.items() if self.sent_attributes.get(key) != value}
+
+
+class SessionManager:
+    """依使用者重用 Bedrock Agent 的 Session、快取 Session 狀態與 memoryId"""
+
+    def __init__(
+            self,
+            agent_id: str,
+            alias_id: str,
+            client: Any = None,
+            factory: ClientFactory = default_factory,
+            idle_ttl: float = 300.0,
+            max_turns: Optional[int] = None,
+            use_memory: bool = False,
+            end_workers: int = 2,
+            trace_sink: Optional[TraceSink] = None,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        參數：
+            agent_id / alias_id: Bedrock Agent 的 ID 與別名 ID
+            client: bedrock-agent-runtime client（未指定時第一次呼叫才由 factory 建立）
+            factory: 建立 client 用的 ClientFactory
+            idle_ttl: Session 閒置多少秒後換新的（應略短於 Agent 的 idleSessionTTLInSeconds）
+            max_turns: 一個 Session 最多幾輪對話（None 表示不限制）
+            use_memory: 是否送出 memoryId（Agent 需要啟用記憶功能）
+            end_workers: 背景結束 Session 的執行緒數
+            trace_sink: 擷取 trace 的 TraceSink（只對取樣到的 Session 要求 Bedrock 產生 trace）
+            clock: 取得目前時間的函數（量測時可替換）
+        """
+        self.agent_id = agent_id
+        self.alias_id = alias_id
+        self._client = client
+        self._factory = factory
+        self._idle_ttl = idle_ttl
+        self._max_turns = max_turns
+        self._use_memory = use_memory
+        self._trace_sink = trace_sink
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, AgentSession] = {}
+        self._executor = ThreadPoolExecutor(max_workers=end_workers, thread_name_prefix="bedrock-end-session")
+        self._stats = {"created": 0, "reused": 0, "expired": 0, "ended": 0, "end_errors": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._factory.runtime()
+        return self._client
+
+    # ============================================================
+    # Session 取得 / 過期
+    # ============================================================
+    def _expired(self, session: AgentSession, now: float) -> bool:
+        if now - session.last_used > self._idle_ttl:
+            return True
+        return self._max_turns is not None and session.turns >= self._max_turns
+
+    def _memory_id(self, user_id: str) -> Optional[str]:
+        if not self._use_memory:
+            return None
+        # 固定由 agent_id 與 user_id 推導（符合 memoryId 的 [0-9a-zA-Z._:-]+），不必保存對照表
+        return uuid.uuid5(uuid.NAMESPACE_URL, f"bedrock-agent-memory:{self.agent_id}:{user_id}").hex
+
+    def _new_session(self, user_id: str, now: float, attributes: Dict[str, str]) -> AgentSession:
+        # 呼叫端需持有 self._lock
+        session = AgentSession(
+            user_id=user_id,
+            session_id=str(uuid.uuid4()),
+            memory_id=self._memory_id(user_id),
+            created_at=now,
+            last_used=now,
+            # 新的 Session 在 Bedrock 端沒有任何屬性，沿用舊 Session 的屬性並全部重送
+            attributes=dict(attributes),
+        )
+        self._sessions[user_id] = session
+        self._stats["created"] += 1
+        return session
+
+    def session(self, user_id: str) -> AgentSession:
+        """取得使用者進行中的 Session，沒有或已過期時建立新的（過期的在背景結束）"""
+        now = self._clock()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None and not self._expired(session, now):
+                return session
+            if session is not None:
+                self._stats["expired"] += 1
+                self._end_in_background(session)
+            return self._new_session(user_id, now, session.attributes if session is not None else {})
+
+    def set_attributes(self, user_id: str, **attributes: str) -> None:
+        """更新使用者的 sessionAttributes（下一次呼叫時只送出有變動的部分）"""
+        session = self.session(user_id)
+        with session.lock:
+            session.attributes.update(attributes)
+
+    def reap(self) -> int:
+        """結束所有已過期的 Session，回傳結束的數量（可由排程定期呼叫）"""
+        now = self._clock()
+        with self._lock:
+            expired = [session for session in self._sessions.values() if self._expired(session, now)]
+            for session in expired:
+                del self._sessions[session.user_id]
+                self._stats["expired"] += 1
+                self._end_in_background(session)
+        return len(expired)
+
+    # ============================================================
+    # 調用
+    # ============================================================
+    def invoke_stream(
+            self,
+            user_id: str,
+            query: str,
+            prompt_attributes: Optional[Dict[str, str]] = None,
+            enable_trace: bool = False,
+            show_code_use: bool = False,
+    ) -> Iterator[str]:
+        """
+        以使用者的 Session 調用 Agent，逐一產出回應文字
+
+        參數：
+            user_id: 使用者識別碼
+            query: 使用者輸入的查詢文字
+            prompt_attributes: 只用於這一輪的 promptSessionAttributes
+            enable_trace / show_code_use: 與 iter_chunks 相同
+        """
+        session = self.session(user_id)
+        with session.lock:
+            if session.turns:
+                # 只有送到已經跑過一輪的 Session 才算重用（set_attributes 等不算）
+                with self._lock:
+                    self._stats["reused"] += 1
+            pending = session.pending_attributes()
+            session_state: Dict[str, Any] = {}
+            if pending:
+                session_state["sessionAttributes"] = pending
+            if prompt_attributes:
+                session_state["promptSessionAttributes"] = prompt_attributes
+
+            trace_sink = self._trace_sink
+            if trace_sink is not None and not trace_sink.sampled(session.session_id):
+                trace_sink = None
+            params: Dict[str, Any] = {
+                "inputText": query,
+                "agentId": self.agent_id,
+                "agentAliasId": self.alias_id,
+                "sessionId": session.session_id,
+                "enableTrace": enable_trace or show_code_use or trace_sink is not None,
+                "streamingConfigurations": {"streamFinalResponse": True},
+            }
+            if session_state:
+                params["sessionState"] = session_state
+            if session.memory_id is not None:
+                params["memoryId"] = session.memory_id
+
+            try:
+                response = self.client.invoke_agent(**params)
+                yield from iter_chunks(
+                    response, enable_trace=enable_trace, show_code_use=show_code_use, trace_sink=trace_sink,
+                )
+            except Exception:
+                # 無法確定 Bedrock 端的 Session 狀態，下一輪改用新的 Session 並重送全部屬性
+                self._discard(session)
+                raise
+            session.sent_attributes.update(pending)
+            session.turns += 1
+            session.last_used = self._clock()
+
+    def invoke(self, user_id: str, query: str, **kwargs: Any) -> str:
+        """以使用者的 Session 調用 Agent 並回傳完整的回應文字"""
+        return "".join(self.invoke_stream(user_id, query, **kwargs))
+
+    def _discard(self, session: AgentSession) -> None:
+        """換成新的 Session（保留使用者的屬性，全部重送），舊的在背景結束"""
+        with self._lock:
+            if self._sessions.get(session.user_id) is session:
+                self._new_session(session.user_id, self._clock(), session.attributes)
+            self._end_in_background(session)
+
+    # ============================================================
+    # 結束 Session
+    # ============================================================
+    def end(self, user_id: str) -> Optional[Future]:
+        """結束使用者的 Session（在背景執行，立即返回）"""
+        with self._lock:
+            session = self._sessions.pop(user_id, None)
+            return self._end_in_background(session) if session is not None else None
+
+    def _end_in_background(self, session: AgentSession) -> Future:
+        # 呼叫端需持有 self._lock
+        return self._executor.submit(self._end_session, session)
+
+    def _end_session(self, session: AgentSession) -> None:
+        # 等候該 Session 進行中的請求結束
+        with session.lock:
+            params: Dict[str, Any] = {
+                "inputText": "",
+                "agentId": self.agent_id,
+                "agentAliasId": self.alias_id,
+                "sessionId": session.session_id,
+                "endSession": True,
+            }
+            if session.memory_id is not None:
+                params["memoryId"] = session.memory_id
+            try:
+                response = self.client.invoke_agent(**params)
+                for _ in response["completion"]:
+                    pass
+            except Exception as e:
+                logger.warning("Failed to end session %s: %s", session.session_id, e)
+                with self._lock:
+                    self._stats["end_errors"] += 1
+                return
+        with self._lock:
+            self._stats["ended"] += 1
+
+    def close(self, end_sessions: bool = True) -> None:
+        """結束所有進行中的 Session（可選）並等候背景工作完成"""
+        if end_sessions:
+            with self._lock:
+                for session in self._sessions.values():
+                    self._end_in_background(session)
+                self._sessions.clear()
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, active=len(self._sessions))
+
+    def __enter__(self) -> "SessionManager":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
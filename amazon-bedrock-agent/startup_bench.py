@@ -0,0 +1,58 @@
+"""
+啟動時間量測（不需要 AWS 帳號或網路）
+
+在全新的 Python 行程中 import main，量測：
+1. import main 的時間（不應載入 boto3，也不應呼叫 STS）
+2. 第一次取得 bedrock-agent-runtime client 的時間（建立 Session 與 client）
+3. 之後再取得 client 的時間（快取）
+
+用法：
+    uv run python startup_bench.py --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+boto3_loaded = "boto3" in sys.modules
+client = main.get_runtime_client()
+created = time.perf_counter()
+assert main.get_runtime_client() is client
+cached = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_client_ms": (created - imported) * 1000,
+    "cached_client_us": (cached - created) * 1e6,
+    "boto3_loaded_on_import": boto3_loaded,
+}))
+"""
+
+
+def run(args: argparse.Namespace) -> None:
+    samples = []
+    for _ in range(args.runs):
+        # 清除憑證相關環境變數，確認離線也能載入
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+            env={"PATH": "", "AWS_REGION": "ap-southeast-2", "AWS_EC2_METADATA_DISABLED": "true"},
+        ).stdout
+        samples.append(json.loads(output))
+
+    for key in ("import_ms", "first_client_ms", "cached_client_us"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:<18} median={statistics.median(values):8.1f}  max={max(values):8.1f}")
+    print(f"boto3 loaded on import: {any(sample['boto3_loaded_on_import'] for sample in samples)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure main.py import and client creation time offline")
+    parser.add_argument("--runs", type=int, default=5)
+    run(parser.parse_args())
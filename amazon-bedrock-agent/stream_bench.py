@@ -0,0 +1,76 @@
+"""
+串流回應處理量測（使用本機假 EventStream，不需要 AWS 帳號）
+
+比較原本的處理方式（收到第一個 chunk 就 return、每個 trace 都 str() 後搜尋字串）
+與 response_stream.iter_chunks()：
+1. 回答是否完整（原本會丟掉第一個 chunk 之後的內容）
+2. 第一段文字出現的時間（time to first token）與完整回答的時間
+3. 判斷程式碼解釋器呼叫時，str() 搜尋與結構化欄位判斷的 CPU 時間
+
+用法：
+    uv run python stream_bench.py --traces 20 --delay-ms 20
+"""
+
+import argparse
+import time
+
+from fake_bedrock import FakeEventStream, make_events, trace_event
+from response_stream import iter_chunks, uses_code_interpreter
+
+ANSWER = "Have you ever been to Taiwan? 我很好，謝謝你的關心！今天有什麼可以幫忙的嗎？" * 3
+
+
+def legacy_process_response(resp):
+    """原本 process_response 的行為（只保留與量測有關的部分）"""
+    for event in resp["completion"]:
+        if "chunk" in event:
+            return event["chunk"]["bytes"].decode("utf8")
+        elif "trace" in event:
+            "codeInterpreterInvocationInput" in str(event["trace"])
+
+
+def run(args: argparse.Namespace) -> None:
+    events = make_events(ANSWER, traces=args.traces, chunk_size=args.chunk_bytes, code_interpreter=True)
+    chunk_count = sum(1 for event in events if "chunk" in event)
+    print(f"answer={len(ANSWER)} chars in {chunk_count} chunks, traces={args.traces}, delay={args.delay_ms}ms/event")
+
+    # 1 + 2. 完整性與延遲
+    started = time.perf_counter()
+    legacy = legacy_process_response({"completion": FakeEventStream(events, args.delay_ms / 1000)})
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    first = None
+    parts = []
+    for text in iter_chunks({"completion": FakeEventStream(events, args.delay_ms / 1000)}):
+        first = first or time.perf_counter() - started
+        parts.append(text)
+    total = time.perf_counter() - started
+
+    print(f"legacy      : returned {len(legacy)}/{len(ANSWER)} chars after {legacy_seconds * 1000:.0f}ms")
+    print(f"iter_chunks : returned {len(''.join(parts))}/{len(ANSWER)} chars, "
+          f"first text after {first * 1000:.0f}ms, complete after {total * 1000:.0f}ms")
+    assert "".join(parts) == ANSWER
+
+    # 3. trace 判斷的 CPU 時間
+    traces = [trace_event(i, code_interpreter=i % 10 == 0, padding=args.trace_bytes)["trace"] for i in range(args.iterations)]
+    started = time.perf_counter()
+    by_string = sum("codeInterpreterInvocationInput" in str(trace) for trace in traces)
+    string_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    by_key = sum(uses_code_interpreter(trace) for trace in traces)
+    key_seconds = time.perf_counter() - started
+    assert by_string == by_key
+    print(f"trace check ({args.iterations} traces, {args.trace_bytes} bytes each): "
+          f"str() {string_seconds * 1e6 / args.iterations:.1f}us/trace, "
+          f"structured {key_seconds * 1e6 / args.iterations:.2f}us/trace")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock response streaming benchmark with a fake EventStream")
+    parser.add_argument("--traces", type=int, default=20)
+    parser.add_argument("--chunk-bytes", type=int, default=16)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--trace-bytes", type=int, default=20000)
+    run(parser.parse_args())
@@ -0,0 +1,94 @@
+"""
+trace 擷取成本量測（使用本機假 EventStream，不需要 AWS 帳號）
+
+以相同的回應（每個回應含多個 trace 事件）比較每個 trace 事件的 CPU 成本：
+1. 原本的作法：pprint.pformat 排版後以 INFO 等級寫入日誌檔
+2. TraceSink：原始 JSON Lines 寫入有緩衝的檔案（全部擷取）
+3. TraceSink 取樣 10%：沒有取樣到的 Session 不擷取（實際上 Bedrock 也不會送出 trace）
+最後以 trace_viewer 讀回輸出檔，確認事件數量正確。
+
+用法：
+    uv run python trace_bench.py --sessions 200 --traces 20 --trace-bytes 4000
+"""
+
+import argparse
+import logging
+import pprint
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from fake_bedrock import FakeEventStream, make_events
+from response_stream import iter_chunks
+from trace_sink import TraceSink
+from trace_viewer import read_records
+
+ANSWER = "Have you ever been to Taiwan? 我很好，謝謝你的關心！"
+
+
+def responses(args: argparse.Namespace) -> list:
+    events = make_events(ANSWER, traces=args.traces)
+    for event in events[:args.traces]:
+        body = event["trace"]["trace"]["orchestrationTrace"]["modelInvocationInput"]
+        body["text"] = "x" * args.trace_bytes
+    return [{"sessionId": str(uuid.uuid4()), "completion": events} for _ in range(args.sessions)]
+
+
+def run_legacy(batch: list, log_path: Path) -> float:
+    """原本 enable_trace=True 的行為：每個 trace 事件排版後以 INFO 記錄"""
+    logger = logging.getLogger("trace_bench.legacy")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(log_path, encoding="utf-8")
+    logger.addHandler(handler)
+    started = time.perf_counter()
+    for resp in batch:
+        for event in FakeEventStream(resp["completion"]):
+            if "trace" in event:
+                logger.info("Trace event:")
+                logger.info(pprint.pformat(event["trace"], indent=2))
+    elapsed = time.perf_counter() - started
+    logger.removeHandler(handler)
+    handler.close()
+    return elapsed
+
+
+def run_sink(batch: list, sink: TraceSink) -> float:
+    started = time.perf_counter()
+    for resp in batch:
+        stream = {"sessionId": resp["sessionId"], "completion": FakeEventStream(resp["completion"])}
+        "".join(iter_chunks(stream, trace_sink=sink if sink.sampled(resp["sessionId"]) else None))
+    sink.close()
+    return time.perf_counter() - started
+
+
+def run(args: argparse.Namespace) -> None:
+    batch = responses(args)
+    total = args.sessions * args.traces
+    print(f"sessions={args.sessions} traces/response={args.traces} trace size≈{args.trace_bytes} bytes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        legacy = run_legacy(batch, tmp / "legacy.log")
+        print(f"pformat + INFO log : {legacy * 1e6 / total:8.1f}us/trace  "
+              f"file={(tmp / 'legacy.log').stat().st_size / 1e6:.1f}MB")
+
+        for rate in (1.0, args.sample):
+            sink = TraceSink(tmp / f"traces-{rate}.jsonl", sample_rate=rate)
+            elapsed = run_sink(batch, sink)
+            captured = list(read_records(sink.path)) if sink.path.exists() else []
+            assert len(captured) == sink.written
+            sessions = len({record["session_id"] for record in captured})
+            size = sink.path.stat().st_size / 1e6 if sink.path.exists() else 0.0
+            print(f"TraceSink rate={rate:<4}: {elapsed * 1e6 / total:8.1f}us/trace  "
+                  f"captured {sink.written} events from {sessions} sessions, file={size:.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock trace capture cost benchmark")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--traces", type=int, default=20)
+    parser.add_argument("--trace-bytes", type=int, default=4000)
+    parser.add_argument("--sample", type=float, default=0.1)
+    run(parser.parse_args())
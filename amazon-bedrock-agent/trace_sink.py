@@ -0,0 +1,102 @@
+"""
+Bedrock Agent trace 擷取（低成本，可在正式環境持續開啟）
+
+原本 enable_trace=True 時，每個 trace 事件都以 pprint.pformat 排版後用 INFO 等級記錄；
+Agent 執行步驟一多，排版本身就佔掉大部分的 CPU 時間，也無法只保留一部分的請求。
+
+TraceSink 改為：
+1. 每個 trace 事件以 json.dumps 寫成一行原始 JSON（datetime 轉成 ISO 字串），不做排版
+2. 寫入有緩衝的檔案（buffer_size），檔案在第一次寫入時才開啟，多執行緒共用時以鎖保護
+3. 依 sessionId 取樣（sample_rate）：同一個 Session 的每一輪不是全部保留就是全部略過；
+   呼叫端只對取樣到的 Session 送出 enableTrace=True，沒取樣到的請求 Bedrock 也不會產生 trace
+4. 事後以 trace_viewer.py 檢視（摘要、單一 Session 的完整內容）
+
+環境變數：
+    BEDROCK_TRACE_FILE    trace 輸出檔（未設定時不擷取）
+    BEDROCK_TRACE_SAMPLE  取樣比例，0~1（預設 1）
+
+用法：
+    with TraceSink("traces.jsonl", sample_rate=0.1) as sink:
+        for text in iter_chunks(response, trace_sink=sink):
+            ...
+"""
+
+import datetime
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Mapping, Optional, Union
+
+
+def _default(value: Any) -> Any:
+    # trace 事件中只有 eventTime 等 datetime 無法直接序列化
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+class TraceSink:
+    """把 trace 事件以 JSON Lines 寫入有緩衝的檔案（依 Session 取樣）"""
+
+    def __init__(self, path: Union[str, Path], sample_rate: float = 1.0, buffer_size: int = 1 << 16):
+        """
+        參數：
+            path: 輸出檔（JSON Lines，追加寫入）
+            sample_rate: 取樣比例，0~1，以 sessionId 決定是否取樣
+            buffer_size: 檔案寫入緩衝的大小（位元組）
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self._threshold = int(sample_rate * 0xFFFFFFFF)
+        self._buffer_size = buffer_size
+        self._file = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TraceSink"]:
+        """依 BEDROCK_TRACE_FILE / BEDROCK_TRACE_SAMPLE 建立，未設定輸出檔時回傳 None"""
+        path = os.getenv("BEDROCK_TRACE_FILE")
+        if not path:
+            return None
+        return cls(path, sample_rate=float(os.getenv("BEDROCK_TRACE_SAMPLE", "1")))
+
+    def sampled(self, session_id: str) -> bool:
+        """這個 Session 是否要擷取 trace（同一個 sessionId 結果固定）"""
+        if self.sample_rate >= 1.0:
+            return True
+        return zlib.crc32(session_id.encode("utf-8")) < self._threshold
+
+    def write(self, session_id: str, trace: Mapping[str, Any]) -> None:
+        """寫入一個 trace 事件（event["trace"]）"""
+        line = json.dumps({"t": time.time(), "session_id": session_id, "trace": trace}, default=_default, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("a", encoding="utf-8", buffering=self._buffer_size)
+            self._file.write(line + "\n")
+            self.written += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "TraceSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,97 @@
+"""
+檢視 TraceSink 擷取的 trace 檔（JSON Lines）
+
+排版只在事後檢視時才做，不佔用 Agent 執行時的 CPU 時間。
+
+用法：
+    uv run python trace_viewer.py traces.jsonl                       # 每個 Session 的摘要
+    uv run python trace_viewer.py traces.jsonl --session <ID>        # 單一 Session 的每個步驟
+    uv run python trace_viewer.py traces.jsonl --session <ID> --full # 加上完整的 trace 內容
+    uv run python trace_viewer.py traces.jsonl --type orchestrationTrace
+"""
+
+import argparse
+import json
+import pprint
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from response_stream import uses_code_interpreter
+
+
+def read_records(path: Path, session_id: Optional[str] = None, trace_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 寫到一半的最後一行
+            if session_id and record["session_id"] != session_id:
+                continue
+            if trace_type and trace_type not in record["trace"].get("trace", {}):
+                continue
+            yield record
+
+
+def describe(trace: Dict[str, Any]) -> str:
+    """一個 trace 事件的一行摘要：類型、包含的步驟與重點欄位"""
+    parts = []
+    for kind, body in trace.get("trace", {}).items():
+        if not isinstance(body, dict):
+            parts.append(kind)
+            continue
+        details = []
+        if "invocationInput" in body:
+            details.append(body["invocationInput"].get("invocationType", "invocation"))
+        if "rationale" in body:
+            details.append(f"rationale={body['rationale'].get('text', '')[:60]!r}")
+        if "observation" in body:
+            details.append(f"observation={body['observation'].get('type', '')}")
+        if "modelInvocationOutput" in body:
+            usage = body["modelInvocationOutput"].get("metadata", {}).get("usage", {})
+            details.append(f"tokens={usage.get('inputTokens', '?')}/{usage.get('outputTokens', '?')}")
+        if not details:
+            details = [key for key in body if key != "traceId"]
+        parts.append(f"{kind}[{' '.join(details)}]")
+    return " ".join(parts)
+
+
+def summarize(records: List[Dict[str, Any]]) -> None:
+    sessions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        sessions[record["session_id"]].append(record)
+    print(f"{len(records)} trace events in {len(sessions)} sessions")
+    print(f"{'session':<38} {'events':>6} {'seconds':>8} {'code':>5}  types")
+    for session_id, events in sessions.items():
+        types = Counter(kind for event in events for kind in event["trace"].get("trace", {}))
+        span = events[-1]["t"] - events[0]["t"]
+        code = sum(uses_code_interpreter(event["trace"]) for event in events)
+        print(f"{session_id:<38} {len(events):>6} {span:>8.2f} {code:>5}  "
+              + ", ".join(f"{kind}={count}" for kind, count in types.most_common()))
+
+
+def show(records: List[Dict[str, Any]], full: bool) -> None:
+    if not records:
+        print("no matching trace events")
+        return
+    started = records[0]["t"]
+    for record in records:
+        print(f"+{record['t'] - started:7.3f}s  {describe(record['trace'])}")
+        if full:
+            print(pprint.pformat(record["trace"], indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="View Bedrock agent traces captured by TraceSink")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--session", help="show the steps of one session")
+    parser.add_argument("--type", help="only events of this trace type, e.g. orchestrationTrace")
+    parser.add_argument("--full", action="store_true", help="pretty-print every event")
+    args = parser.parse_args()
+
+    matched = list(read_records(args.path, args.session, args.type))
+    if args.session or args.full:
+        show(matched, args.full)
+    else:
+        summarize(matched)
@@ -0,0 +1,129 @@
+"""
+MCP 工具與資源清單（manifest）快取
+
+FastMCP 預設在每次 tools/list、resources/list 請求時，
+都會從已註冊的函式重新組出 Tool / Resource 物件（包含 JSON Schema）。
+每個 MCP client 連線時都會呼叫 tools/list，連線數一多就會重複做同樣的事。
+
+CachedManifest 在啟動時（或第一次被列出時）把清單一次組好：
+1. tools/list、resources/list、resources/templates/list 直接回傳預先建立好的結果
+2. 另外序列化成一份 JSON bytes，附帶以內容雜湊計算的版本號（類似 HTTP ETag）
+3. 結果的 _meta.manifestVersion 帶有同一個版本號，client 可據此判斷是否需要重新抓取
+4. resources/list 依 page_size 預先切好分頁，資源數量上千時也不必每次重新組清單；
+   nextCursor 內含版本號，清單變動後舊的 cursor 會被拒絕
+
+用法：
+    manifest = CachedManifest(mcp)
+    manifest.install()          # 取代 FastMCP 內建的清單處理函式
+    await manifest.build()      # 可選：在啟動時預先建立，否則第一次列出時建立
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from mcp import types
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.exceptions import McpError
+
+
+class CachedManifest:
+    """預先計算並快取 FastMCP 伺服器的工具與資源清單"""
+
+    def __init__(self, mcp: FastMCP, page_size: int = 100):
+        self._mcp = mcp
+        self._page_size = page_size
+        self._lock = asyncio.Lock()
+        self._tools: Optional[types.ListToolsResult] = None
+        self._resource_pages: List[types.ListResourcesResult] = []
+        self._templates: List[types.ResourceTemplate] = []
+        self.version: Optional[str] = None  # 清單內容的雜湊版本號
+        self.body: bytes = b""               # 序列化後的完整清單
+
+    @property
+    def etag(self) -> str:
+        """HTTP ETag 格式的版本號（含雙引號）"""
+        return f'"{self.version}"'
+
+    async def build(self) -> None:
+        """從 FastMCP 取得目前的工具與資源，組成快取的清單與 bytes"""
+        async with self._lock:
+            tools = await self._mcp.list_tools()
+            resources = await self._mcp.list_resources()
+            templates = await self._mcp.list_resource_templates()
+
+            content = {
+                "tools": [_dump(tool) for tool in tools],
+                "resources": [_dump(resource) for resource in resources],
+                "resourceTemplates": [_dump(template) for template in templates],
+            }
+            version = hashlib.sha256(_encode(content)).hexdigest()[:16]
+            meta = {"manifestVersion": version}
+
+            self._tools = types.ListToolsResult(tools=tools, _meta=meta)
+            self._resource_pages = [
+                types.ListResourcesResult(
+                    resources=resources[start:start + self._page_size],
+                    nextCursor=(
+                        f"{version}:{start + self._page_size}"
+                        if start + self._page_size < len(resources) else None
+                    ),
+                    _meta=meta,
+                )
+                for start in range(0, max(len(resources), 1), self._page_size)
+            ]
+            self._templates = templates
+            self.body = _encode({"version": version, **content})
+            self.version = version
+
+    def invalidate(self) -> None:
+        """在執行期間新增或移除工具 / 資源後呼叫，下一次列出時會重新建立"""
+        self.version = None
+
+    async def _ensure_built(self) -> None:
+        if self.version is None:
+            await self.build()
+
+    async def list_tools(self, request: types.ListToolsRequest) -> types.ListToolsResult:
+        await self._ensure_built()
+        return self._tools
+
+    async def list_resources(self, request: types.ListResourcesRequest) -> types.ListResourcesResult:
+        await self._ensure_built()
+        cursor = request.params.cursor if request.params else None
+        if cursor is None:
+            return self._resource_pages[0]
+        version, _, offset = cursor.partition(":")
+        page, remainder = divmod(int(offset), self._page_size) if offset.isdigit() else (-1, 0)
+        if version != self.version or remainder or not 0 < page < len(self._resource_pages):
+            raise McpError(types.ErrorData(code=types.INVALID_PARAMS, message=f"Invalid or expired cursor: {cursor}"))
+        return self._resource_pages[page]
+
+    async def list_resource_templates(self) -> List[types.ResourceTemplate]:
+        await self._ensure_built()
+        return self._templates
+
+    def install(self) -> None:
+        """將清單請求的處理函式換成快取版本（需在所有工具 / 資源註冊完成後呼叫）"""
+        server = self._mcp._mcp_server
+        server.list_tools()(self.list_tools)
+        server.list_resources()(self.list_resources)
+        server.list_resource_templates()(self.list_resource_templates)
+
+    async def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """判斷 client 帶來的 If-None-Match 是否與目前版本相同"""
+        await self._ensure_built()
+        if not if_none_match:
+            return False
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return self.etag in candidates or "*" in candidates
+
+
+def _dump(model: Any) -> Dict:
+    return model.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+def _encode(payload: Dict) -> bytes:
+    # sort_keys 讓相同內容永遠得到相同的 bytes 與版本號
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
@@ -1,15 +1,42 @@
+import hashlib
+from functools import lru_cache
 from mcp.server.fastmcp import FastMCP
+from manifest import CachedManifest
 
 # Create an instance of FastMCP
 mcp = FastMCP("My MCP Server", "1.0.0")
+# Render each greeting once; the tool and the resource templates share the cache
+@lru_cache(maxsize=4096)
+def render_greeting(name: str) -> tuple[str, str] :
+    """ Render a greeting and return (text, sha256 of text) """
+    text = f"Hello, {name}!"
+    return text, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 # Add a simple tool
 @mcp.tool()
 def greet(name: str) -> str : 
     """ Greet a user """
-    return f"Hello, {name}!"
+    return render_greeting(name)[0]
 
 # Add a simple resource
 @mcp.resource("hello://message")
 def get_hello() -> str :
     """ Get a hello message """
-    return "Hello, MCP Server!"
\ No newline at end of file
+    return "Hello, MCP Server!"
+
+# Add parameterized resources, e.g. hello://Alice
+@mcp.resource("hello://{name}")
+def get_greeting(name: str) -> str :
+    """ Get a greeting for a user """
+    return render_greeting(name)[0]
+
+# Clients can compare this hash to skip re-reading hello://{name}
+@mcp.resource("hello://{name}/hash")
+def get_greeting_hash(name: str) -> str :
+    """ Get the SHA-256 hash of a user's greeting """
+    return render_greeting(name)[1]
+
+# Cache the tool and resource manifests (built once, on first listing);
+# resources/list is served in pages of 100
+manifest = CachedManifest(mcp, page_size=100)
+manifest.install()
@@ -0,0 +1,156 @@
+"""
+stdio MCP 伺服器啟動時間量測
+
+量測兩件事：
+1. 從啟動子程序到 client 真正可以使用伺服器的時間：
+   initialize 回應、以及第一個 tools/list 回應（client 連線後一定會先列出工具）
+2. 以 `python -X importtime` 列出伺服器模組的直接 import 中最花時間者，
+   找出可以延遲載入的套件（例如 weatherb.py 只在呼叫工具時才載入 httpx）
+
+只使用標準函式庫，可以量測任何以 FastMCP 撰寫的 stdio 伺服器，例如：
+    uv run python startup_bench.py mcpserverlab.py
+    uv run python ../mcpserver1/startup_bench.py weatherb.py --runs 20 --budget-ms 1000
+
+加上 --budget-ms 時，第一個 tools/list 回應時間的中位數超過預算會以非 0 結束碼離開。
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-bench", "version": "0.1.0"},
+    },
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+LIST_TOOLS = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+
+
+# ============================================================
+# 量測
+# ============================================================
+def server_command(server: Path, attr: str) -> List[str]:
+    """直接 import 伺服器模組並以 stdio 執行（與 Claude Desktop 的啟動方式相同）"""
+    code = (
+        "import sys, importlib;"
+        f"sys.path.insert(0, {str(server.parent)!r});"
+        f"importlib.import_module({server.stem!r}).{attr}.run(transport='stdio')"
+    )
+    return [sys.executable, "-c", code]
+
+
+def read_result(proc: subprocess.Popen, request_id: int) -> Dict:
+    """讀取指定 id 的回應（略過伺服器送出的通知）"""
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before answering request {request_id}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            if "result" not in message:
+                raise RuntimeError(f"request {request_id} failed: {message!r}")
+            return message["result"]
+
+
+def time_to_first_list(command: List[str], cwd: Path) -> Tuple[float, float, int]:
+    """啟動子程序、完成 initialize 並列出工具，回傳 (initialize 毫秒, tools/list 毫秒, 工具數)"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        command, cwd=cwd,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        proc.stdin.write(json.dumps(INITIALIZE).encode("utf-8") + b"\n")
+        proc.stdin.flush()
+        read_result(proc, INITIALIZE["id"])
+        initialized = (time.perf_counter() - started) * 1000
+
+        proc.stdin.write(json.dumps(INITIALIZED).encode("utf-8") + b"\n")
+        proc.stdin.write(json.dumps(LIST_TOOLS).encode("utf-8") + b"\n")
+        proc.stdin.flush()
+        tools = read_result(proc, LIST_TOOLS["id"])["tools"]
+        listed = (time.perf_counter() - started) * 1000
+        return initialized, listed, len(tools)
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "min_ms": round(ordered[0], 1),
+        "median_ms": round(statistics.median(ordered), 1),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+def import_breakdown(server: Path, top: int) -> List[Tuple[str, float]]:
+    """以 -X importtime 載入伺服器模組，回傳其直接 import 中累積耗時最高者（毫秒）"""
+    code = f"import sys; sys.path.insert(0, {str(server.parent)!r}); import {server.stem}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=server.parent, capture_output=True, text=True,
+    )
+    # importtime 先印子模組再印父模組，縮排每層兩個空白
+    children: List[Tuple[str, float]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif level == 0:
+            if name.strip() == server.stem:
+                return sorted(children, key=lambda row: row[1], reverse=True)[:top]
+            children = []
+    return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure stdio MCP server startup time")
+    parser.add_argument("server", help="伺服器檔案路徑")
+    parser.add_argument("--attr", default="mcp", help="模組中 FastMCP 物件的名稱")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="列出前幾名最慢的 import")
+    parser.add_argument("--budget-ms", type=float, help="第一個 tools/list 回應時間中位數的上限")
+    args = parser.parse_args(argv)
+
+    server = Path(args.server).resolve()
+    cwd = server.parent
+
+    print(f"== import time: {server.name}")
+    for name, ms in import_breakdown(server, args.top):
+        print(f"{ms:10.1f} ms  {name}")
+
+    command = server_command(server, args.attr)
+    samples = [time_to_first_list(command, cwd) for _ in range(args.runs)]
+    initialize = summarize([sample[0] for sample in samples])
+    first_list = summarize([sample[1] for sample in samples])
+    print(f"== time to initialize:       {json.dumps(initialize)}")
+    print(f"== time to first tools/list: {json.dumps(first_list)}  tools={samples[0][2]}")
+
+    if args.budget_ms is not None and first_list["median_ms"] > args.budget_ms:
+        print(f"[FAIL] first tools/list median {first_list['median_ms']}ms > {args.budget_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+KOKO 便利商店 MCP Server 負載測試工具
+
+本程式會在本機啟動 main.py 的 FastAPI app（或連到既有的伺服器），
+同時開啟 N 個 MCP client session，分別經由 /mcp（Streamable HTTP）
+與 /sse（Server-Sent Events）兩種傳輸方式，混合呼叫 search / fetch 工具。
+
+回報指標：
+1. RPS（每秒完成的工具呼叫數）
+2. 延遲百分位數（p50 / p90 / p95 / p99）
+3. 每個 session 佔用的伺服器記憶體（RSS 增量 / session 數）
+4. 錯誤率
+
+搭配 --min-rps / --max-p95-ms / --max-error-rate 可作為容量的回歸檢查，
+未達標時程式以非 0 結束碼離開，方便放進 CI。
+
+用法：
+    uv run python loadtest.py --sessions 50 --duration 20
+    uv run python loadtest.py --url http://127.0.0.1:8000 --transports mcp
+"""
+
+# ============================================================
+# 匯入必要的套件
+# ============================================================
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+# 與 main.py 的庫存資料一致，用來產生查詢關鍵字與 fetch 的 ID
+PRODUCTS = ["咖啡", "茶葉蛋", "洋芋片", "牛奶"]
+
+# 兩種傳輸方式在 main.py 中的掛載路徑
+TRANSPORT_PATHS = {
+    "mcp": "/mcp/",
+    "sse": "/sse/",
+}
+
+# ============================================================
+# 統計資料結構
+# ============================================================
+@dataclass
+class TransportStats:
+    """單一傳輸方式的測試結果"""
+    transport: str
+    sessions: int
+    duration: float = 0.0
+    latencies: List[float] = field(default_factory=list)  # 每次成功呼叫的延遲（秒）
+    errors: int = 0
+    failed_sessions: int = 0
+    rss_per_session_kb: Optional[float] = None
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def rps(self) -> float:
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """以最近秩法（nearest-rank）計算延遲百分位數，單位為毫秒"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+
+    def summary(self) -> Dict:
+        return {
+            "transport": self.transport,
+            "sessions": self.sessions,
+            "failed_sessions": self.failed_sessions,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.percentile(50), 2),
+            "p90_ms": round(self.percentile(90), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "rss_per_session_kb": (
+                None if self.rss_per_session_kb is None else round(self.rss_per_session_kb, 1)
+            ),
+        }
+
+# ============================================================
+# 伺服器管理
+# ============================================================
+def free_port() -> int:
+    """向作業系統要一個目前沒被使用的 TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """讀取指定 process 的常駐記憶體（KB），僅支援有 /proc 的系統"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def start_server(port: int, show_logs: bool = False) -> subprocess.Popen:
+    """
+    以子程序方式啟動 main.py 的 FastAPI app，並等待首頁可以回應
+
+    使用 uvicorn 的命令列而不是 `python main.py`，
+    才能指定 port 並只綁定 127.0.0.1。
+    FastMCP 每個請求都會輸出一行 INFO 日誌，預設丟棄以免影響量測。
+    """
+    output = None if show_logs else subprocess.DEVNULL
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).parent,
+        stdout=output,
+        stderr=output,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"MCP server exited early with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("MCP server did not become ready within 30 seconds")
+
+# ============================================================
+# 工作負載
+# ============================================================
+async def open_session(stack: AsyncExitStack, transport: str, url: str) -> ClientSession:
+    """依傳輸方式建立並初始化一個 MCP client session"""
+    if transport == "mcp":
+        read, write, _ = await stack.enter_async_context(streamablehttp_client(url))
+    else:
+        read, write = await stack.enter_async_context(sse_client(url))
+    session = await stack.enter_async_context(ClientSession(read, write))
+    await session.initialize()
+    return session
+
+
+async def drive_session(
+        session: ClientSession,
+        stats: TransportStats,
+        deadline: float,
+        fetch_ratio: float,
+        rng: random.Random,
+) -> None:
+    """在期限內反覆送出 search / fetch 混合請求，並記錄延遲或錯誤"""
+    while time.monotonic() < deadline:
+        if rng.random() < fetch_ratio:
+            name, arguments = "fetch", {"ids": rng.sample(PRODUCTS, k=rng.randint(1, 2))}
+        else:
+            name, arguments = "search", {"query": rng.choice(PRODUCTS)[:1], "limit": 5}
+        started = time.perf_counter()
+        try:
+            result = await session.call_tool(name, arguments)
+        except Exception:
+            stats.errors += 1
+            continue
+        if result.isError:
+            stats.errors += 1
+        else:
+            stats.latencies.append(time.perf_counter() - started)
+
+
+async def run_transport(
+        transport: str,
+        base_url: str,
+        sessions: int,
+        duration: float,
+        fetch_ratio: float,
+        seed: int,
+        server_pid: Optional[int],
+) -> TransportStats:
+    """對單一傳輸方式開啟 N 個 session，量測記憶體後執行混合工作負載"""
+    stats = TransportStats(transport=transport, sessions=sessions)
+    url = base_url.rstrip("/") + TRANSPORT_PATHS[transport]
+    rss_before = read_rss_kb(server_pid) if server_pid else None
+
+    async with AsyncExitStack() as stack:
+        opened: List[ClientSession] = []
+        for _ in range(sessions):
+            try:
+                opened.append(await open_session(stack, transport, url))
+            except Exception:
+                stats.failed_sessions += 1
+
+        rss_after = read_rss_kb(server_pid) if server_pid else None
+        if rss_before is not None and rss_after is not None and opened:
+            stats.rss_per_session_kb = (rss_after - rss_before) / len(opened)
+
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(
+            drive_session(session, stats, deadline, fetch_ratio, random.Random(seed + i))
+            for i, session in enumerate(opened)
+        ))
+        stats.duration = time.monotonic() - started
+
+    return stats
+
+# ============================================================
+# 回歸檢查
+# ============================================================
+def check_thresholds(results: List[TransportStats], args: argparse.Namespace) -> List[str]:
+    """比對門檻值，回傳所有未達標的說明（空清單表示通過）"""
+    failures = []
+    for stats in results:
+        if stats.failed_sessions:
+            failures.append(f"{stats.transport}: {stats.failed_sessions} sessions failed to open")
+        if args.min_rps is not None and stats.rps < args.min_rps:
+            failures.append(f"{stats.transport}: rps {stats.rps:.1f} < {args.min_rps}")
+        if args.max_p95_ms is not None and stats.percentile(95) > args.max_p95_ms:
+            failures.append(f"{stats.transport}: p95 {stats.percentile(95):.1f}ms > {args.max_p95_ms}ms")
+        if args.max_error_rate is not None and stats.error_rate > args.max_error_rate:
+            failures.append(f"{stats.transport}: error rate {stats.error_rate:.2%} > {args.max_error_rate:.2%}")
+    return failures
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="KOKO store MCP server load test")
+    parser.add_argument("--url", help="測試既有的伺服器（例如 http://127.0.0.1:8000）；未指定時自動在本機啟動")
+    parser.add_argument("--sessions", type=int, default=20, help="每種傳輸方式同時開啟的 session 數")
+    parser.add_argument("--duration", type=float, default=10.0, help="每種傳輸方式的測試秒數")
+    parser.add_argument("--transports", default="mcp,sse", help="要測試的傳輸方式，以逗號分隔")
+    parser.add_argument("--fetch-ratio", type=float, default=0.5, help="fetch 請求佔全部請求的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-logs", action="store_true", help="顯示本機伺服器的日誌輸出")
+    parser.add_argument("--json", dest="json_path", help="將結果另存為 JSON 檔")
+    parser.add_argument("--min-rps", type=float)
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    args = parser.parse_args(argv)
+    for transport in args.transports.split(","):
+        if transport not in TRANSPORT_PATHS:
+            parser.error(f"unknown transport: {transport}")
+    return args
+
+# ============================================================
+# 主程式
+# ============================================================
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        server = start_server(port, args.server_logs)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        results = []
+        for transport in args.transports.split(","):
+            stats = await run_transport(
+                transport, base_url, args.sessions, args.duration,
+                args.fetch_ratio, args.seed, server.pid if server else None,
+            )
+            results.append(stats)
+            print(json.dumps(stats.summary(), ensure_ascii=False))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as out:
+            json.dump([stats.summary() for stats in results], out, ensure_ascii=False, indent=2)
+
+    failures = check_thresholds(results, args)
+    for failure in failures:
+        print(f"[FAIL] {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,7 +1,9 @@
 from typing import List, Dict
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 import uvicorn, os
+from manifest import CachedManifest
 
 # 庫存資料
 inventory: Dict[str,int] = {
@@ -47,16 +49,35 @@ def fetch(ids: List[str]) -> List[Dict]:
             })
     return docs
 
+# 工具清單快取：tools/list 直接回傳啟動時預先建立好的結果
+manifest = CachedManifest(mcp)
+manifest.install()
+
 # FastAPI
 # 先初始化 MCP HTTP app，session_manager 才會被建立
 mcp_http_app = mcp.streamable_http_app()
 mcp_sse_app = mcp.sse_app()
-app = FastAPI(title="KOKO 便利商店", lifespan=lambda app: mcp.session_manager.run())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manifest.build()  # 啟動時預先計算工具與資源清單
+    async with mcp.session_manager.run():
+        yield
+
+app = FastAPI(title="KOKO 便利商店", lifespan=lifespan)
 app.mount("/mcp", mcp_http_app)  # /mcp
 app.mount("/sse", mcp_sse_app)   # /sse 與 /sse/messages/
 @app.get("/")
 def index():
     return {"message":"歡迎來到 KOKO 便利商店的 MCP 服務!"}
 
+@app.get("/manifest")
+async def get_manifest(request: Request):
+    """回傳快取的工具與資源清單；If-None-Match 與版本相同時回 304"""
+    headers = {"ETag": manifest.etag, "Cache-Control": "no-cache"}
+    if await manifest.not_modified(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=manifest.body, media_type="application/json", headers=headers)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0",port=8000, log_level="info")
@@ -0,0 +1,154 @@
+"""
+多輪對話：沿用 previous_response_id 與快取的 MCP 工具清單
+
+原本每次呼叫 client.responses.create 都是獨立的請求，平台每一次都要連到 MCP 伺服器（ngrok）重新列出工具
+（mcp_list_tools），增加延遲，也增加 MCP 伺服器的負載。
+只要請求的上下文中已經有某個 server_label 的 mcp_list_tools 項目，平台就不會再列出一次。
+
+Conversation 改為：
+1. 每一輪都帶上一輪的 previous_response_id，上下文中已有工具清單，只有第一輪需要列出工具
+2. ToolListingCache 依 server_label（與 server_url）快取 mcp_list_tools 項目，
+   新對話的第一輪直接把快取的清單放進 input，不同對話之間也不必重新列出；超過 ttl 才重新列出
+3. previous_response_id 失效（NotFoundError）時，改用快取的工具清單重送一次；
+   先前各輪的對話內容不會帶到新的上下文，因此記錄 warning 並累計 reset_count
+
+用法：
+    conversation = Conversation(client, model="gpt-4.1", tools=tools)
+    response = await conversation.send("茶葉蛋還有多少庫存")
+    await print_updates(conversation.stream("咖啡還有嗎"))
+"""
+
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import openai
+
+from stream_client import Update, stream_response
+
+logger = logging.getLogger(__name__)
+
+class ToolListingCache:
+    """快取 MCP 伺服器的 mcp_list_tools 項目（可在多個對話間共用）"""
+
+    def __init__(self, ttl: float = 600.0):
+        """
+        參數：
+            ttl: 工具清單的有效秒數（MCP 伺服器的工具有變動時，最多 ttl 秒後生效）
+        """
+        self._ttl = ttl
+        # server_label -> (server_url, mcp_list_tools 項目, 到期時間)
+        self._items: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, response: Any, tools: List[Dict[str, Any]]) -> None:
+        """從 Response 的輸出中取出成功的 mcp_list_tools 項目"""
+        urls = {tool.get("server_label"): tool.get("server_url") for tool in tools if tool.get("type") == "mcp"}
+        for item in response.output:
+            if item.type == "mcp_list_tools" and not item.error and item.server_label in urls:
+                listing = item.model_dump(exclude_none=True)
+                self._items[item.server_label] = (urls[item.server_label], listing, time.monotonic() + self._ttl)
+
+    def listings(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """tools 中每個 MCP 伺服器仍有效的工具清單（可直接放進 input）"""
+        now = time.monotonic()
+        found = []
+        for tool in tools:
+            if tool.get("type") != "mcp":
+                continue
+            cached = self._items.get(tool["server_label"])
+            if cached and cached[0] == tool.get("server_url") and cached[2] > now:
+                found.append(cached[1])
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+
+def user_message(text: str) -> Dict[str, Any]:
+    return {"role": "user", "content": [{"type": "input_text", "text": text}]}
+
+
+class Conversation:
+    """一段多輪對話：每一輪沿用上一輪的 response id，第一輪使用快取的工具清單"""
+
+    def __init__(
+            self,
+            client: Any,
+            model: str,
+            tools: List[Dict[str, Any]],
+            cache: Optional[ToolListingCache] = None,
+            **defaults: Any,
+    ):
+        """
+        參數：
+            client: AsyncOpenAI
+            model: 使用的模型
+            tools: 工具設定（MCP 伺服器等）
+            cache: 共用的工具清單快取（未指定時每個對話各自一個）
+            defaults: 每一輪都要帶的 responses.create 參數，例如 temperature=0.3
+        """
+        self.client = client
+        self.model = model
+        self.tools = tools
+        self.cache = cache or ToolListingCache()
+        self.defaults = defaults
+        self.previous_response_id: Optional[str] = None
+        self.turns = 0
+        self.listed_tools = 0
+        # previous_response_id 失效、先前的對話內容遺失的次數
+        self.reset_count = 0
+
+    def _params(self, text: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(self.defaults, model=self.model, tools=self.tools, **overrides)
+        if self.previous_response_id:
+            params.update(previous_response_id=self.previous_response_id, input=[user_message(text)])
+        else:
+            params["input"] = [*self.cache.listings(self.tools), user_message(text)]
+        return params
+
+    def _reset(self) -> None:
+        """上一輪的 Response 已失效：之後的請求從新的上下文開始，先前各輪的內容不再可用"""
+        logger.warning(
+            f"previous_response_id {self.previous_response_id} not found after {self.turns} turns; "
+            "conversation history is lost, starting a new context"
+        )
+        self.previous_response_id = None
+        self.reset_count += 1
+
+    def _remember(self, response: Any) -> None:
+        self.previous_response_id = response.id
+        self.turns += 1
+        self.listed_tools += sum(1 for item in response.output if item.type == "mcp_list_tools")
+        self.cache.update(response, self.tools)
+
+    async def send(self, text: str, **overrides: Any) -> Any:
+        """送出一輪對話並等待完整的 Response"""
+        try:
+            response = await self.client.responses.create(**self._params(text, overrides))
+        except openai.NotFoundError:
+            if not self.previous_response_id:
+                raise
+            # 上一輪的 Response 已失效，改用快取的工具清單開始新的上下文
+            self._reset()
+            response = await self.client.responses.create(**self._params(text, overrides))
+        self._remember(response)
+        return response
+
+    async def stream(self, text: str, **overrides: Any) -> AsyncIterator[Update]:
+        """以串流模式送出一輪對話，更新格式與 stream_client.stream_response 相同"""
+        while True:
+            started = False
+            try:
+                async for update in stream_response(self.client, **self._params(text, overrides)):
+                    started = True
+                    if update["type"] == "done":
+                        self._remember(update["response"])
+                    yield update
+                return
+            except openai.NotFoundError:
+                # 與 send() 相同：請求被接受前 previous_response_id 已失效，改用快取的工具清單重送一次
+                if started or not self.previous_response_id:
+                    raise
+                self._reset()
@@ -0,0 +1,66 @@
+"""
+MCP 工具清單重用量測（使用本機模擬的 Responses API，不需要 API Key）
+
+同樣的多段對話，比較三種作法每一輪的延遲與列出工具（mcp_list_tools）的次數：
+1. independent : 原本的作法，每一輪都是獨立的 responses.create
+2. previous_id : Conversation 沿用 previous_response_id（每段對話只有第一輪列出工具）
+3. shared_cache: 再加上多段對話共用的 ToolListingCache（只有第一段對話的第一輪列出工具）
+
+用法：
+    uv run python conversation_bench.py --conversations 5 --turns 4 --list-tools-ms 300
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from conversation import Conversation, ToolListingCache, user_message
+from mock_responses import FakeAsyncClient
+
+TOOLS = [{"type": "mcp", "server_url": "http://localhost/mcp", "server_label": "KOKO-Store", "require_approval": "never"}]
+QUESTIONS = ["茶葉蛋還有多少庫存", "咖啡還有嗎", "洋芋片呢", "牛奶還剩幾瓶"]
+
+
+async def run_scenario(name: str, args: argparse.Namespace) -> dict:
+    client = FakeAsyncClient(
+        list_tools_delay=args.list_tools_ms / 1000, tool_delay=args.tool_ms / 1000,
+        first_token_delay=args.first_token_ms / 1000, delta_delay=0.0,
+    )
+    cache = ToolListingCache()
+    latencies = []
+    for _ in range(args.conversations):
+        conversation = Conversation(client, model="gpt-4.1", tools=TOOLS,
+                                    cache=cache if name == "shared_cache" else None)
+        for turn in range(args.turns):
+            question = QUESTIONS[turn % len(QUESTIONS)]
+            started = time.perf_counter()
+            if name == "independent":
+                await client.responses.create(model="gpt-4.1", tools=TOOLS, input=[user_message(question)])
+            else:
+                await conversation.send(question)
+            latencies.append(time.perf_counter() - started)
+    return {"latencies": latencies, "list_tools": client.list_tools_calls}
+
+
+async def run(args: argparse.Namespace) -> None:
+    turns = args.conversations * args.turns
+    print(f"conversations={args.conversations} turns={args.turns}  simulated list_tools={args.list_tools_ms}ms "
+          f"tool={args.tool_ms}ms first_token={args.first_token_ms}ms")
+    baseline = None
+    for name in ("independent", "previous_id", "shared_cache"):
+        result = await run_scenario(name, args)
+        mean = statistics.mean(result["latencies"]) * 1000
+        baseline = baseline or mean
+        print(f"{name:<13} list_tools={result['list_tools']:>3}/{turns}  "
+              f"mean turn latency={mean:6.0f}ms  saved per turn={baseline - mean:5.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MCP tool listing reuse benchmark with a mock Responses API")
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--list-tools-ms", type=float, default=300)
+    parser.add_argument("--tool-ms", type=float, default=100)
+    parser.add_argument("--first-token-ms", type=float, default=100)
+    asyncio.run(run(parser.parse_args()))
@@ -2,8 +2,12 @@
 # 匯入必要的函式庫
 # ============================================================
 import os, asyncio  # os: 用於存取環境變數；asyncio: 用於非同步程式執行
+import argparse, json  # argparse: 解析批次模式的命令列參數；json: 輸出批次執行的摘要
+from pathlib import Path  # 批次模式的輸入與輸出檔路徑
 from openai import AsyncOpenAI  # OpenAI 的非同步客戶端，用於呼叫 GPT 模型
-from openai.types.responses import ResponseTextDeltaEvent  # 串流回應的事件類型
+from conversation import Conversation  # 多輪對話：沿用 previous_response_id 與快取的 MCP 工具清單
+from stream_client import print_updates  # 在終端顯示串流更新（含 MCP 工具事件）與各階段時間
+from runner import read_prompts, run_queries  # 批次模式：以有限並行度執行 JSONL 中的查詢
 
 # ============================================================
 # 環境設定：取得 OpenAI API 金鑰並建立客戶端
@@ -16,6 +20,7 @@ if not api_key:
     raise RuntimeError("OPENAI_API_KEY is not set; please export a valid OpenAI API key.")
 
 # 建立 OpenAI 非同步客戶端實例
+# 有設定 OPENAI_BASE_URL 時 SDK 會改連到該位址（例如本機的 mock_server.py）
 client = AsyncOpenAI(api_key=api_key)
 
 # ============================================================
@@ -35,23 +40,21 @@ tools = [
 # 主程式：執行 OpenAI API 呼叫的非同步函數
 # ============================================================
 async def main():
+    # 兩個範例屬於同一段對話：第二輪沿用第一輪的 previous_response_id，
+    # 上下文中已有 KOKO-Store 的工具清單（mcp_list_tools），平台不必再連到 MCP 伺服器列出工具
+    conversation = Conversation(
+        client,
+        model="gpt-4.1",  # 使用的 GPT 模型版本
+        tools=tools,  # 提供 MCP 工具供模型使用（可查詢 KOKO-Store 資料）
+    )
+
     # ============================================================
     # 範例 1：非串流式 API 呼叫
     # ============================================================
     # 建立一個完整的回應請求，等待模型完成後一次性返回結果
-    response = await client.responses.create(
-        model="gpt-4.1",  # 使用的 GPT 模型版本
-        input=[  # 輸入訊息陣列
-            {
-                "role":"user",  # 訊息角色：使用者
-                "content":[  # 訊息內容陣列
-                    {
-                        "type":"input_text",  # 內容類型：文字輸入
-                        "text":"茶葉蛋還有多少庫存"  # 查詢文字：詢問茶葉蛋庫存
-                    }]
-            }
-        ],
-        tools=tools,  # 提供 MCP 工具供模型使用（可查詢 KOKO-Store 資料）
+    # send() 會把文字包成使用者訊息（role=user、type=input_text）
+    response = await conversation.send(
+        "茶葉蛋還有多少庫存",  # 查詢文字：詢問茶葉蛋庫存
         temperature=0.3  # 溫度參數：較低的值（0.3）使回應更確定、一致
     )
     # 輸出模型的完整回應文字
@@ -61,32 +64,43 @@ async def main():
     # 範例 2：串流式 API 呼叫
     # ============================================================
     # 建立一個串流回應請求，模型會逐步產生並即時返回內容
-    stream = await client.responses.create(
-        model="gpt-4.1",  # 使用的 GPT 模型版本
-        input=[  # 輸入訊息陣列
-            {
-                "role":"user",  # 訊息角色：使用者
-                "content":[  # 訊息內容陣列
-                    {
-                        "type":"input_text",  # 內容類型：文字輸入
-                        "text":"咖啡還有嗎"  # 查詢文字：詢問咖啡庫存
-                    }]
-            }
-        ],
-        tools=tools,  # 提供 MCP 工具供模型使用
-        stream=True  # 啟用串流模式：逐步返回回應內容
-    )
+    # 串流事件由 stream_client.stream_response 處理：MCP 列出工具、工具呼叫與結果、文字增量，
+    # 工具結果一回來就顯示，不必等模型開始輸出文字；最後顯示各階段花費的時間
+    await print_updates(conversation.stream(
+        "咖啡還有嗎"  # 查詢文字：詢問咖啡庫存
+    ))
+
+    # 兩輪對話只列出一次工具
+    print(f"對話輪數: {conversation.turns}，列出工具次數: {conversation.listed_tools}，上下文重置次數: {conversation.reset_count}")
 
-    # 逐一處理串流中的每個資料塊
-    async for chunk in stream:
-        # 檢查資料塊是否為文字增量事件（ResponseTextDeltaEvent）
-        if isinstance(chunk, ResponseTextDeltaEvent):
-            # 即時輸出文字增量，不換行（end=""）且立即刷新緩衝區（flush=True）
-            print(chunk.delta, end="", flush=True)
+# ============================================================
+# 批次模式：從 JSONL 讀取查詢，並行執行並把結果寫入 JSONL
+# ============================================================
+async def run_batch(args):
+    summary = await run_queries(
+        client.with_options(max_retries=0),  # 由 runner 負責重試（退避時不佔用並行名額）
+        read_prompts(Path(args.prompts)),  # 每行一筆：{"id": ..., "input": ...} 或純文字
+        Path(args.output),  # 每完成一筆就追加寫入；重新執行時略過已成功的 id
+        model="gpt-4.1",
+        tools=tools,
+        concurrency=args.concurrency,  # 最多同時進行幾個請求
+        max_attempts=args.max_attempts,  # 每個查詢最多嘗試幾次（429、5xx、連線錯誤）
+        temperature=0.3,
+    )
+    # 輸出吞吐量與延遲百分位數
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
 
 # ============================================================
 # 程式執行入口
 # ============================================================
+# 沒有指定 --prompts 時執行兩個範例；指定時以批次模式執行
+parser = argparse.ArgumentParser(description="OpenAI Responses API with MCP tools")
+parser.add_argument("--prompts", help="JSONL file of prompts to run in batch mode")
+parser.add_argument("--output", default="results.jsonl", help="JSONL file for results (also the resume checkpoint)")
+parser.add_argument("--concurrency", type=int, default=8, help="maximum requests in flight")
+parser.add_argument("--max-attempts", type=int, default=5, help="attempts per prompt for retryable errors")
+args = parser.parse_args()
+
 # 使用 asyncio.run() 執行非同步主程式
-# 這會啟動事件迴圈並執行 main() 函數直到完成
-asyncio.run(main())
\ No newline at end of file
+# 這會啟動事件迴圈並執行 main()（或 run_batch()）直到完成
+asyncio.run(run_batch(args) if args.prompts else main())
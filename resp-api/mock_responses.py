@@ -0,0 +1,241 @@
+"""
+本機模擬的 Responses API 串流（不需要 OpenAI API Key 與 MCP 伺服器）
+
+依照 Responses API 呼叫 MCP 工具時實際的事件順序產生事件（JSON 與 SSE 送出的內容相同），
+並以 openai SDK 的型別驗證後交給呼叫端，行為與 AsyncOpenAI 的串流一致：
+
+    response.created → mcp_list_tools（列出 KOKO-Store 工具）
+    → mcp_call（search，參數 delta、工具執行、結果） → message（文字 delta） → response.completed
+
+每個階段之前的等待時間可以設定（列出工具、工具執行、第一個 token、每個 delta），
+用來量測各階段對使用者看到內容的時間有什麼影響。
+
+與平台相同，上下文（input 中的項目或 previous_response_id 指到的 Response）已有某個
+server_label 的 mcp_list_tools 時不會再列出工具；previous_response_id 不存在時拋出 NotFoundError。
+
+用法：
+    client = FakeAsyncClient(list_tools_delay=0.3, tool_delay=0.4)
+    stream = await client.responses.create(model="gpt-4.1", input="咖啡還有嗎", tools=tools, stream=True)
+    async for event in stream:
+        ...
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import httpx
+import openai
+from openai.types.responses import Response, ResponseStreamEvent
+from pydantic import TypeAdapter
+
+# 與 mcpserver2（KOKO-Store）相同的庫存資料與工具
+INVENTORY = {"咖啡": 42, "茶葉蛋": 18, "洋芋片": 30, "牛奶": 25}
+TOOLS = [
+    {
+        "name": "search",
+        "description": "依關鍵字搜尋產品並提供摘要",
+        "input_schema": {"type": "object", "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}}},
+    },
+    {
+        "name": "fetch",
+        "description": "依 ID 取回商品完整庫存資訊",
+        "input_schema": {"type": "object", "properties": {"ids": {"type": "array", "items": {"type": "string"}}}},
+    },
+]
+
+_EVENT = TypeAdapter(ResponseStreamEvent)
+
+# (事件之前要等待的階段, 事件 JSON)
+Step = Tuple[Optional[str], Dict[str, Any]]
+
+
+def input_text(input: Any) -> str:
+    """取出 input 中最後一則使用者文字"""
+    if isinstance(input, str):
+        return input
+    for message in reversed(input):
+        if message.get("role") == "user":
+            content = message["content"]
+            if isinstance(content, str):
+                return content
+            return "".join(part.get("text", "") for part in content if part.get("type") == "input_text")
+    return ""
+
+
+def answer_for(text: str) -> Tuple[str, str, str]:
+    """依問題中的商品名稱產生 search 的參數、工具結果與回答"""
+    product = next((name for name in INVENTORY if name in text), "咖啡")
+    arguments = json.dumps({"query": product}, ensure_ascii=False)
+    output = json.dumps([{"id": product, "title": product, "snippet": f"{product} 庫存 {INVENTORY[product]} 件"}], ensure_ascii=False)
+    answer = f"目前{product}還有 {INVENTORY[product]} 件庫存，歡迎選購！"
+    return arguments, output, answer
+
+
+def response_json(response_id: str, model: str, status: str, output: List[Dict[str, Any]], tools: List[Any], **extra: Any) -> Dict[str, Any]:
+    usage = None
+    if status == "completed":
+        usage = {
+            "input_tokens": 120, "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 30, "output_tokens_details": {"reasoning_tokens": 0}, "total_tokens": 150,
+        }
+    return {
+        "id": response_id, "object": "response", "created_at": int(time.time()), "model": model,
+        "status": status, "output": output, "parallel_tool_calls": True, "tool_choice": "auto",
+        "tools": tools, "usage": usage, **extra,
+    }
+
+
+def mcp_steps(params: Dict[str, Any], list_tools: bool = True, chunk_chars: int = 4) -> List[Step]:
+    """
+    一次呼叫 MCP 工具的完整事件序列
+
+    參數：
+        params: responses.create 的參數（model、input、tools）
+        list_tools: 是否包含 mcp_list_tools（列出工具）的事件
+        chunk_chars: 每個文字 delta 的字數
+    """
+    model = params.get("model", "gpt-4.1")
+    tools = params.get("tools") or []
+    server_label = tools[0]["server_label"] if tools else "KOKO-Store"
+    arguments, tool_output, answer = answer_for(input_text(params.get("input", "")))
+    response_id = f"resp_{uuid.uuid4().hex}"
+    steps: List[Step] = []
+    output: List[Dict[str, Any]] = []
+
+    def add(phase: Optional[str], event_type: str, **fields: Any) -> None:
+        steps.append((phase, {"type": event_type, "sequence_number": len(steps), **fields}))
+
+    add(None, "response.created", response=response_json(response_id, model, "in_progress", [], tools))
+    add(None, "response.in_progress", response=response_json(response_id, model, "in_progress", [], tools))
+
+    if list_tools:
+        index = len(output)
+        item = {"type": "mcp_list_tools", "id": f"mcpl_{uuid.uuid4().hex}", "server_label": server_label, "tools": []}
+        add(None, "response.output_item.added", output_index=index, item=item)
+        add(None, "response.mcp_list_tools.in_progress", output_index=index, item_id=item["id"])
+        item = dict(item, tools=TOOLS)
+        add("list_tools", "response.mcp_list_tools.completed", output_index=index, item_id=item["id"])
+        add(None, "response.output_item.done", output_index=index, item=item)
+        output.append(item)
+
+    index = len(output)
+    call = {"type": "mcp_call", "id": f"mcp_{uuid.uuid4().hex}", "server_label": server_label, "name": "search",
+            "arguments": "", "status": "in_progress"}
+    add("first_token", "response.output_item.added", output_index=index, item=call)
+    add(None, "response.mcp_call_arguments.delta", output_index=index, item_id=call["id"], delta=arguments)
+    add(None, "response.mcp_call_arguments.done", output_index=index, item_id=call["id"], arguments=arguments)
+    add(None, "response.mcp_call.in_progress", output_index=index, item_id=call["id"])
+    call = dict(call, arguments=arguments, output=tool_output, status="completed")
+    add("tool", "response.mcp_call.completed", output_index=index, item_id=call["id"])
+    add(None, "response.output_item.done", output_index=index, item=call)
+    output.append(call)
+
+    index = len(output)
+    message = {"type": "message", "id": f"msg_{uuid.uuid4().hex}", "role": "assistant", "status": "in_progress", "content": []}
+    add(None, "response.output_item.added", output_index=index, item=message)
+    part = {"type": "output_text", "text": "", "annotations": []}
+    add(None, "response.content_part.added", output_index=index, item_id=message["id"], content_index=0, part=part)
+    for i in range(0, len(answer), chunk_chars):
+        add("first_token" if i == 0 else "delta", "response.output_text.delta", output_index=index,
+            item_id=message["id"], content_index=0, delta=answer[i:i + chunk_chars], logprobs=[])
+    part = dict(part, text=answer)
+    add(None, "response.output_text.done", output_index=index, item_id=message["id"], content_index=0, text=answer, logprobs=[])
+    add(None, "response.content_part.done", output_index=index, item_id=message["id"], content_index=0, part=part)
+    message = dict(message, status="completed", content=[part])
+    add(None, "response.output_item.done", output_index=index, item=message)
+    output.append(message)
+
+    add(None, "response.completed", response=response_json(response_id, model, "completed", output, tools))
+    return steps
+
+
+class FakeAsyncStream:
+    """與 openai.AsyncStream 一樣可 async 迭代的事件串流，只能讀一次"""
+
+    def __init__(self, steps: List[Step], delays: Dict[str, float]):
+        self._steps = steps
+        self._delays = delays
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        for phase, event in self._steps:
+            delay = self._delays.get(phase, 0.0) if phase else 0.0
+            if delay:
+                await asyncio.sleep(delay)
+            yield _EVENT.validate_python(event)
+
+    async def close(self) -> None:
+        pass
+
+
+class _FakeResponses:
+    def __init__(self, client: "FakeAsyncClient"):
+        self._client = client
+
+    async def create(self, stream: bool = False, **params: Any) -> Any:
+        client = self._client
+        client.requests.append(params)
+        steps = client.plan(params)
+        if stream:
+            return FakeAsyncStream(steps, client.delays)
+        # 非串流：等待所有階段完成後一次回傳
+        await asyncio.sleep(sum(client.delays.get(phase, 0.0) for phase, _ in steps if phase))
+        return Response.model_validate(steps[-1][1]["response"])
+
+
+class FakeAsyncClient:
+    """
+    假的 AsyncOpenAI，只提供 responses.create
+
+    參數：
+        list_tools_delay: MCP 伺服器列出工具所需時間
+        tool_delay: MCP 工具執行所需時間
+        first_token_delay: 模型每次開始輸出（工具呼叫或文字）前的時間
+        delta_delay: 每個文字 delta 之間的時間
+        chunk_chars: 每個文字 delta 的字數
+    """
+
+    def __init__(
+            self,
+            list_tools_delay: float = 0.3,
+            tool_delay: float = 0.4,
+            first_token_delay: float = 0.2,
+            delta_delay: float = 0.02,
+            chunk_chars: int = 4,
+    ):
+        self.delays = {
+            "list_tools": list_tools_delay,
+            "tool": tool_delay,
+            "first_token": first_token_delay,
+            "delta": delta_delay,
+        }
+        self.chunk_chars = chunk_chars
+        self.requests: List[Dict[str, Any]] = []
+        self.list_tools_calls = 0
+        # response id -> 該 Response 的上下文中已列出工具的 server_label
+        self._listed: Dict[str, Set[str]] = {}
+        self.responses = _FakeResponses(self)
+
+    def plan(self, params: Dict[str, Any]) -> List[Step]:
+        """依上下文決定是否需要列出工具，產生這次請求的事件序列"""
+        listed: Set[str] = set()
+        previous = params.get("previous_response_id")
+        if previous:
+            if previous not in self._listed:
+                request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+                raise openai.NotFoundError(
+                    f"Previous response with id '{previous}' not found.",
+                    response=httpx.Response(404, request=request), body=None,
+                )
+            listed |= self._listed[previous]
+        items = params.get("input")
+        if isinstance(items, list):
+            listed |= {item["server_label"] for item in items if item.get("type") == "mcp_list_tools"}
+        labels = {tool["server_label"] for tool in params.get("tools") or [] if tool.get("type") == "mcp"}
+        list_tools = bool(labels - listed)
+        self.list_tools_calls += list_tools
+        steps = mcp_steps(params, list_tools=list_tools, chunk_chars=self.chunk_chars)
+        self._listed[steps[-1][1]["response"]["id"]] = listed | labels
+        return steps
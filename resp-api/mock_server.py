@@ -0,0 +1,183 @@
+"""
+本機模擬的 Responses API HTTP 伺服器（不需要 OpenAI API Key 與 MCP 伺服器）
+
+提供 POST /v1/responses（串流 SSE 與非串流 JSON），事件內容與 mock_responses 相同，
+讓真正的 AsyncOpenAI（含 SDK 的 SSE 解析、錯誤對應與連線池）可以離線測試：
+
+    OPENAI_BASE_URL=http://127.0.0.1:8080/v1 OPENAI_API_KEY=mock uv run python main.py
+
+可模擬：
+- 各階段延遲（列出工具、工具執行、第一個 token、每個 delta）
+- 服務端容量：同時進行中的請求超過 capacity 時回傳 429（含 retry-after）
+- 隨機錯誤：error_rate 比例的請求回傳 500
+- previous_response_id 不存在時回傳 404
+
+用法：
+    uv run python mock_server.py --port 8080 --capacity 16 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import openai
+
+from mock_responses import FakeAsyncClient
+
+
+class MockResponsesServer(ThreadingHTTPServer):
+    """每個請求一個執行緒的模擬 Responses API 伺服器"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(
+            self,
+            address: Tuple[str, int],
+            backend: FakeAsyncClient,
+            capacity: int = 1_000_000,
+            error_rate: float = 0.0,
+            retry_after: float = 0.2,
+    ):
+        super().__init__(address, _Handler)
+        self.backend = backend
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "throttled": 0, "failed": 0, "max_in_flight": 0}
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # 用戶端中途取消請求（例如中斷批次執行）時不顯示錯誤
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockResponsesServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, code: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._json(status, {"error": {"message": message, "type": code, "code": code, "param": None}}, headers)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/health":
+            self._json(200, dict(self.server.stats, in_flight=self.server.in_flight))
+        else:
+            self._error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        params = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/v1/responses":
+            self._error(404, f"Unknown path {self.path}", "not_found")
+            return
+
+        server = self.server
+        with server.lock:
+            server.stats["requests"] += 1
+            if server.in_flight >= server.capacity:
+                server.stats["throttled"] += 1
+                throttled = True
+            else:
+                throttled = False
+                server.in_flight += 1
+                server.stats["max_in_flight"] = max(server.stats["max_in_flight"], server.in_flight)
+        if throttled:
+            self._error(429, "Rate limit reached", "rate_limit_exceeded", {"retry-after": str(server.retry_after)})
+            return
+
+        try:
+            if random.random() < server.error_rate:
+                with server.lock:
+                    server.stats["failed"] += 1
+                self._error(500, "The server had an error while processing your request.", "server_error")
+                return
+            try:
+                with server.lock:
+                    steps = server.backend.plan(params)
+            except openai.NotFoundError as e:
+                self._error(404, e.message, "not_found")
+                return
+
+            delays = server.backend.delays
+            if params.get("stream"):
+                # SSE：沒有 Content-Length，送完後關閉連線
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for phase, event in steps:
+                    if phase and delays.get(phase):
+                        time.sleep(delays[phase])
+                    self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+            else:
+                time.sleep(sum(delays.get(phase, 0.0) for phase, _ in steps if phase))
+                self._json(200, steps[-1][1]["response"])
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def start_server(port: int = 0, **kwargs: Any) -> MockResponsesServer:
+    """
+    在背景執行緒啟動模擬伺服器（port=0 時自動選擇可用的埠號）
+
+    參數：
+        kwargs: FakeAsyncClient 的延遲設定（list_tools_delay 等），
+                以及 capacity、error_rate、retry_after
+    """
+    server_options = {key: kwargs.pop(key) for key in ("capacity", "error_rate", "retry_after") if key in kwargs}
+    server = MockResponsesServer(("127.0.0.1", port), FakeAsyncClient(**kwargs), **server_options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI Responses API with MCP tool events")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--capacity", type=int, default=1_000_000, help="in-flight requests before returning 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--list-tools-ms", type=float, default=300)
+    parser.add_argument("--tool-ms", type=float, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--delta-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = MockResponsesServer(
+        ("127.0.0.1", args.port),
+        FakeAsyncClient(
+            list_tools_delay=args.list_tools_ms / 1000, tool_delay=args.tool_ms / 1000,
+            first_token_delay=args.first_token_ms / 1000, delta_delay=args.delta_ms / 1000,
+        ),
+        capacity=args.capacity,
+        error_rate=args.error_rate,
+    )
+    print(f"Mock Responses API on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,202 @@
+"""
+Responses API 並行查詢執行器
+
+原本的範例依序送出兩個問題，無法跑一整批的查詢。run_queries() 改為：
+1. 以 asyncio.Semaphore 限制同時進行的請求數（concurrency），所有請求共用同一個 AsyncOpenAI 連線池
+2. 被限流（429）、伺服器錯誤（5xx）、連線失敗或逾時時，以指數退避（full jitter）重試，
+   伺服器有回傳 retry-after 時以它為準
+3. 每個查詢是一段獨立的 Conversation，共用同一個 ToolListingCache；
+   第一個查詢先單獨執行（取得工具清單），其餘查詢不必再列出 MCP 工具
+4. 每完成一筆就以 JSONL 追加寫入輸出檔，同一個檔案也是 checkpoint：重新執行時略過已成功的 id
+5. 結束時回傳吞吐量與延遲百分位數（p50 / p95 / p99，不含排隊等待並行名額的時間）
+
+輸入檔每行一筆，可以是 JSON（{"id": ..., "input": ...}）或純文字（以行號為 id）。
+
+用法：
+    summary = await run_queries(client, read_prompts(Path("prompts.jsonl")), Path("results.jsonl"),
+                                model="gpt-4.1", tools=tools, concurrency=8)
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import openai
+
+from conversation import Conversation, ToolListingCache
+
+# 可以稍後重試的錯誤（APITimeoutError 是 APIConnectionError 的子類別）
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+@dataclass
+class Prompt:
+    id: str
+    input: str
+
+
+def read_prompts(path: Path) -> List[Prompt]:
+    prompts = []
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                prompts.append(Prompt(id=str(record.get("id", line_no)), input=record["input"]))
+            else:
+                prompts.append(Prompt(id=str(line_no), input=line))
+    return prompts
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """讀取既有輸出檔中已成功的 id（失敗的會在下次執行時重跑）"""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 上次中斷時寫到一半的最後一行
+            if record.get("error") is None:
+                done.add(record["id"])
+    return done
+
+
+def retry_delay(error: Exception, attempt: int, base: float) -> float:
+    """
+    以指數退避（full jitter）計算等待時間，但不短於伺服器指定的 retry-after
+
+    所有被限流的請求若都剛好等 retry-after 秒，會在同一時間再次湧入；加上隨機值把它們錯開。
+    """
+    delay = random.uniform(0, base * 2 ** attempt)
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_one(
+        client: Any,
+        prompt: Prompt,
+        semaphore: asyncio.Semaphore,
+        cache: ToolListingCache,
+        model: str,
+        tools: List[Dict[str, Any]],
+        max_attempts: int,
+        backoff: float,
+        **params: Any,
+) -> Dict[str, Any]:
+    """執行一個查詢（可重試的錯誤以退避重試），回傳要寫入輸出檔的紀錄"""
+    record: Dict[str, Any] = {"id": prompt.id, "input": prompt.input}
+    conversation = Conversation(client, model=model, tools=tools, cache=cache, **params)
+    # 整個查詢（含重試與退避）佔用一個並行名額：退避時讓出名額的話，重試要排到所有等待中的查詢之後，
+    # 而且被限流時新的請求仍會繼續湧入伺服器；延遲從取得名額開始計算，不含排隊的時間
+    async with semaphore:
+        started = time.perf_counter()
+        for attempt in range(1, max_attempts + 1):
+            try:
+                response = await conversation.send(prompt.input)
+                record.update(output=response.output_text, response_id=response.id, error=None)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt < max_attempts:
+                    await asyncio.sleep(retry_delay(e, attempt, backoff))
+                    continue
+                record.update(output=None, error=f"{type(e).__name__}: {e}")
+            except openai.APIError as e:
+                record.update(output=None, error=f"{type(e).__name__}: {e}")
+                break
+    record.update(
+        attempts=attempt,
+        listed_tools=conversation.listed_tools,
+        latency_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+    return record
+
+
+async def run_queries(
+        client: Any,
+        prompts: List[Prompt],
+        output: Path,
+        model: str,
+        tools: List[Dict[str, Any]],
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        backoff: float = 0.5,
+        **params: Any,
+) -> Dict[str, Any]:
+    """
+    以有限並行度執行所有查詢，每完成一筆就寫入 output，回傳摘要統計
+
+    參數：
+        client: AsyncOpenAI（建議 max_retries=0，由這裡負責重試）
+        prompts: 要執行的查詢
+        output: JSONL 輸出檔（同時作為 checkpoint）
+        model / tools: responses.create 的模型與工具設定
+        concurrency: 最多同時進行幾個請求
+        max_attempts: 每個查詢最多嘗試幾次
+        backoff: 指數退避的基本秒數
+        params: 其他 responses.create 參數，例如 temperature=0.3
+    """
+    done = completed_ids(output)
+    pending = [prompt for prompt in prompts if prompt.id not in done]
+    semaphore = asyncio.Semaphore(concurrency)
+    cache = ToolListingCache()
+    records: List[Dict[str, Any]] = []
+
+    def submit(batch: List[Prompt]) -> List[asyncio.Task]:
+        return [
+            asyncio.create_task(run_one(client, prompt, semaphore, cache, model, tools, max_attempts, backoff, **params))
+            for prompt in batch
+        ]
+
+    started = time.perf_counter()
+    tasks: List[asyncio.Task] = []
+    # 只有這個協程會寫檔，不需要額外的鎖
+    try:
+        with output.open("a", encoding="utf-8") as f:
+            # 第一個查詢先單獨執行，取得的工具清單供其餘查詢共用
+            for batch in (pending[:1], pending[1:]):
+                tasks = submit(batch)
+                for next_done in asyncio.as_completed(tasks):
+                    record = await next_done
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    records.append(record)
+    finally:
+        for task in tasks:
+            task.cancel()
+    elapsed = time.perf_counter() - started
+
+    latencies = [record["latency_ms"] for record in records]
+    return {
+        "processed": len(records),
+        "skipped": len(prompts) - len(pending),
+        "errors": sum(1 for record in records if record["error"]),
+        "retries": sum(record["attempts"] - 1 for record in records),
+        "listed_tools": sum(record["listed_tools"] for record in records),
+        "seconds": round(elapsed, 2),
+        "throughput_per_s": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
@@ -0,0 +1,91 @@
+"""
+並行查詢執行器量測（使用本機模擬的 Responses API 伺服器，不需要 API Key）
+
+啟動 mock_server（有容量上限與隨機 500 錯誤），以真正的 AsyncOpenAI 透過 HTTP 執行同一批查詢，
+比較不同並行度的吞吐量與延遲百分位數；最後中斷一次執行再重跑，確認只補跑未完成的查詢。
+
+用法：
+    uv run python runner_bench.py --prompts 64 --capacity 16 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from openai import AsyncOpenAI
+
+from mock_responses import INVENTORY
+from mock_server import start_server
+from runner import Prompt, read_prompts, run_queries
+
+TOOLS = [{"type": "mcp", "server_url": "http://localhost/mcp", "server_label": "KOKO-Store", "require_approval": "never"}]
+
+
+def write_prompts(path: Path, count: int) -> None:
+    products = list(INVENTORY)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"q{i}", "input": f"{products[i % len(products)]}還有多少庫存"}, ensure_ascii=False) + "\n")
+
+
+def count_lines(path: Path) -> int:
+    if not path.exists():
+        return 0
+    with path.open(encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = start_server(
+        list_tools_delay=args.list_tools_ms / 1000, tool_delay=args.tool_ms / 1000,
+        first_token_delay=args.first_token_ms / 1000, delta_delay=0.0,
+        capacity=args.capacity, error_rate=args.error_rate, retry_after=0.1,
+    )
+    client = AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+    print(f"prompts={args.prompts} server capacity={args.capacity} error_rate={args.error_rate}  "
+          f"simulated list_tools={args.list_tools_ms}ms tool={args.tool_ms}ms first_token={args.first_token_ms}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prompts_path = Path(tmp) / "prompts.jsonl"
+        write_prompts(prompts_path, args.prompts)
+        prompts = read_prompts(prompts_path)
+
+        for concurrency in args.concurrency:
+            output = Path(tmp) / f"results-{concurrency}.jsonl"
+            summary = await run_queries(client, prompts, output, model="gpt-4.1", tools=TOOLS,
+                                        concurrency=concurrency, backoff=0.1)
+            print(f"concurrency={concurrency:<3} {summary['throughput_per_s']:6.2f} req/s  "
+                  f"p50={summary['p50_ms']:6.0f}ms p95={summary['p95_ms']:6.0f}ms p99={summary['p99_ms']:6.0f}ms  "
+                  f"errors={summary['errors']} retries={summary['retries']} list_tools={summary['listed_tools']}")
+
+        # 中斷後重跑：第一次在完成一半左右時取消，第二次只補跑剩下的查詢
+        output = Path(tmp) / "results-resume.jsonl"
+        task = asyncio.create_task(run_queries(client, prompts, output, model="gpt-4.1", tools=TOOLS,
+                                               concurrency=args.concurrency[-1], backoff=0.1))
+        while count_lines(output) < len(prompts) // 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        first = count_lines(output)
+        summary = await run_queries(client, prompts + [Prompt(id="extra", input="牛奶還剩幾瓶")], output,
+                                    model="gpt-4.1", tools=TOOLS, concurrency=args.concurrency[-1], backoff=0.1)
+        print(f"resume: interrupted after {first} results, rerun skipped={summary['skipped']} "
+              f"processed={summary['processed']} errors={summary['errors']}")
+
+    await client.close()
+    print(f"server: {server.stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent query runner benchmark with a mock Responses API server")
+    parser.add_argument("--prompts", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--capacity", type=int, default=16, help="in-flight requests before the mock returns 429")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--list-tools-ms", type=float, default=300)
+    parser.add_argument("--tool-ms", type=float, default=100)
+    parser.add_argument("--first-token-ms", type=float, default=100)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""
+MCP 串流事件處理量測（使用本機模擬的 Responses API 串流，不需要 API Key）
+
+比較原本的串流迴圈（只輸出 ResponseTextDeltaEvent）與 stream_client.stream_response()：
+1. 使用者第一次看到內容的時間（原本要等第一段文字；現在工具結果一回來就顯示）
+2. 各階段時間：列出工具、工具執行、第一段文字、完成
+3. 處理到的事件種類（原本忽略的事件數）
+
+用法：
+    uv run python stream_bench.py --list-tools-ms 300 --tool-ms 400 --first-token-ms 200 --runs 5
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+from openai.types.responses import ResponseTextDeltaEvent
+
+from mock_responses import FakeAsyncClient
+from stream_client import stream_response
+
+TOOLS = [{"type": "mcp", "server_url": "http://localhost/mcp", "server_label": "KOKO-Store", "require_approval": "never"}]
+PARAMS = dict(model="gpt-4.1", input="咖啡還有嗎", tools=TOOLS)
+
+
+async def legacy(client: FakeAsyncClient) -> dict:
+    """原本 main.py 範例 2 的串流迴圈"""
+    started = time.perf_counter()
+    first_visible = None
+    ignored = 0
+    out = io.StringIO()
+    stream = await client.responses.create(**PARAMS, stream=True)
+    async for chunk in stream:
+        if isinstance(chunk, ResponseTextDeltaEvent):
+            first_visible = first_visible or time.perf_counter() - started
+            out.write(chunk.delta)
+        else:
+            ignored += 1
+    return {"first_visible": first_visible, "total": time.perf_counter() - started, "ignored": ignored}
+
+
+async def wrapped(client: FakeAsyncClient) -> dict:
+    started = time.perf_counter()
+    first_visible = None
+    timings = {}
+    async for update in stream_response(client, **PARAMS):
+        if update["type"] in ("tools_listed", "tool_call", "tool_result", "text"):
+            first_visible = first_visible or time.perf_counter() - started
+        if update["type"] == "done":
+            timings = update["timings"]
+    return {"first_visible": first_visible, "total": time.perf_counter() - started, "timings": timings}
+
+
+async def run(args: argparse.Namespace) -> None:
+    client = FakeAsyncClient(
+        list_tools_delay=args.list_tools_ms / 1000,
+        tool_delay=args.tool_ms / 1000,
+        first_token_delay=args.first_token_ms / 1000,
+        delta_delay=args.delta_ms / 1000,
+    )
+    print(f"simulated phases: list_tools={args.list_tools_ms}ms tool={args.tool_ms}ms "
+          f"first_token={args.first_token_ms}ms delta={args.delta_ms}ms")
+
+    legacy_runs = [await legacy(client) for _ in range(args.runs)]
+    wrapped_runs = [await wrapped(client) for _ in range(args.runs)]
+
+    def median_ms(runs: list, key: str) -> float:
+        return statistics.median(run[key] for run in runs) * 1000
+
+    print(f"legacy  : first visible {median_ms(legacy_runs, 'first_visible'):6.0f}ms  "
+          f"total {median_ms(legacy_runs, 'total'):6.0f}ms  ignored events={legacy_runs[0]['ignored']}")
+    print(f"wrapper : first visible {median_ms(wrapped_runs, 'first_visible'):6.0f}ms  "
+          f"total {median_ms(wrapped_runs, 'total'):6.0f}ms")
+    timings = wrapped_runs[-1]["timings"]
+    print(f"phases  : list_tools={timings['list_tools_ms']} tool_calls={timings['tool_calls_ms']} "
+          f"first_text={timings['first_text_ms']}ms total={timings['total_ms']}ms")
+    print(f"events  : {sum(timings['events'].values())} events of {len(timings['events'])} types processed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Responses API MCP streaming benchmark with a mock event stream")
+    parser.add_argument("--list-tools-ms", type=float, default=300)
+    parser.add_argument("--tool-ms", type=float, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--delta-ms", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,179 @@
+"""
+Responses API 串流用戶端（處理 MCP 工具事件、記錄各階段時間）
+
+原本的範例只處理 ResponseTextDeltaEvent：MCP 伺服器列出工具、呼叫工具的過程都被忽略，
+使用者在模型開始輸出文字之前什麼都看不到，也無法知道時間花在哪一個階段。
+
+stream_response() 讀取 client.responses.create(stream=True) 的每一種事件，轉成「更新（update）」：
+1. MCP 列出工具（mcp_list_tools）完成時送出 tools_listed
+2. MCP 工具的參數產生完畢時送出 tool_call，工具結果一回來就送出 tool_result（或 tool_error），
+   不必等模型開始輸出文字
+3. 文字 delta 送出 text；response.completed 時送出 done（含完整的 Response 與各階段時間）
+4. response.failed / error 事件送出 error；其他事件（reasoning、content_part 等）只計數
+
+更新格式（dict，可直接轉成 JSON，ms 為距離送出請求的毫秒數）：
+    {"type": "tools_listed", "server": "...", "tools": [...], "ms": ...}
+    {"type": "tool_call", "name": "...", "arguments": "...", "ms": ...}
+    {"type": "tool_result", "name": "...", "output": "...", "ms": ...}
+    {"type": "tool_error", "name": "...", "error": "...", "ms": ...}
+    {"type": "text", "text": "...", "ms": ...}
+    {"type": "done", "response": Response, "timings": {...}, "ms": ...}
+    {"type": "error", "message": "...", "ms": ...}
+
+用法：
+    async for update in stream_response(client, model="gpt-4.1", input=..., tools=tools):
+        ...
+    await print_updates(stream_response(client, model="gpt-4.1", input=..., tools=tools))
+"""
+
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO, Tuple
+
+Update = Dict[str, Any]
+
+
+@dataclass
+class StreamTimings:
+    """一次串流請求各階段的時間（time.perf_counter 的秒數）"""
+
+    started: float
+    first_event: Optional[float] = None
+    first_text: Optional[float] = None
+    completed: Optional[float] = None
+    # item_id -> [名稱, 開始, 結束]
+    list_tools: Dict[str, List[Any]] = field(default_factory=dict)
+    tool_calls: Dict[str, List[Any]] = field(default_factory=dict)
+    events: Counter = field(default_factory=Counter)
+
+    def ms(self, moment: Optional[float]) -> Optional[float]:
+        return None if moment is None else round((moment - self.started) * 1000, 1)
+
+    def phases(self) -> Dict[str, Any]:
+        """各階段的毫秒數：第一個事件、列出工具、每次工具呼叫、第一段文字、完成"""
+
+        def spans(entries: Dict[str, List[Any]]) -> List[Tuple[str, Optional[float]]]:
+            return [
+                (name, None if end is None else round((end - start) * 1000, 1))
+                for name, start, end in entries.values()
+            ]
+
+        return {
+            "first_event_ms": self.ms(self.first_event),
+            "list_tools_ms": spans(self.list_tools),
+            "tool_calls_ms": spans(self.tool_calls),
+            "first_text_ms": self.ms(self.first_text),
+            "total_ms": self.ms(self.completed),
+            "events": dict(self.events),
+        }
+
+
+async def stream_response(client: Any, **params: Any) -> AsyncIterator[Update]:
+    """
+    以串流模式呼叫 client.responses.create，逐一產出更新
+
+    參數：
+        client: AsyncOpenAI（或任何提供 responses.create(stream=True) 的物件）
+        params: responses.create 的參數（stream 會自動設為 True）
+    """
+    timings = StreamTimings(started=time.perf_counter())
+    stream = await client.responses.create(**params, stream=True)
+    # item_id -> 工具名稱（mcp_call 的事件只帶 item_id）
+    names: Dict[str, str] = {}
+
+    def elapsed() -> Optional[float]:
+        return timings.ms(time.perf_counter())
+
+    try:
+        async for event in stream:
+            now = time.perf_counter()
+            timings.first_event = timings.first_event or now
+            timings.events[event.type] += 1
+
+            if event.type == "response.output_text.delta":
+                timings.first_text = timings.first_text or now
+                yield {"type": "text", "text": event.delta, "ms": elapsed()}
+
+            elif event.type == "response.output_item.added":
+                item = event.item
+                if item.type == "mcp_list_tools":
+                    timings.list_tools[item.id] = [item.server_label, now, None]
+                elif item.type == "mcp_call":
+                    names[item.id] = item.name
+                    timings.tool_calls[item.id] = [item.name, now, None]
+
+            elif event.type == "response.mcp_call_arguments.done":
+                name = names.get(event.item_id, "")
+                yield {"type": "tool_call", "name": name, "arguments": event.arguments, "ms": elapsed()}
+
+            elif event.type == "response.output_item.done":
+                item = event.item
+                if item.type == "mcp_list_tools":
+                    timings.list_tools.setdefault(item.id, [item.server_label, now, None])[2] = now
+                    if item.error:
+                        yield {"type": "tool_error", "name": item.server_label, "error": item.error, "ms": elapsed()}
+                    else:
+                        tools = [tool.name for tool in item.tools]
+                        yield {"type": "tools_listed", "server": item.server_label, "tools": tools, "ms": elapsed()}
+                elif item.type == "mcp_call":
+                    timings.tool_calls.setdefault(item.id, [item.name, now, None])[2] = now
+                    if item.error:
+                        yield {"type": "tool_error", "name": item.name, "error": item.error, "ms": elapsed()}
+                    else:
+                        yield {"type": "tool_result", "name": item.name, "output": item.output, "ms": elapsed()}
+                elif item.type == "mcp_approval_request":
+                    # require_approval 不是 never 時，需要呼叫端回覆 mcp_approval_response
+                    yield {"type": "tool_error", "name": item.name, "error": "approval required", "ms": elapsed()}
+
+            elif event.type == "response.completed":
+                timings.completed = now
+                yield {"type": "done", "response": event.response, "timings": timings.phases(), "ms": elapsed()}
+
+            elif event.type == "response.incomplete":
+                timings.completed = now
+                reason = getattr(event.response.incomplete_details, "reason", None)
+                yield {"type": "error", "message": f"incomplete: {reason}", "ms": elapsed()}
+
+            elif event.type == "response.failed":
+                error = event.response.error
+                yield {"type": "error", "message": error.message if error else "response failed", "ms": elapsed()}
+
+            elif event.type == "error":
+                yield {"type": "error", "message": event.message, "ms": elapsed()}
+
+            # 其他事件（response.created、mcp_*.in_progress、reasoning、content_part 等）只計數
+    finally:
+        # 呼叫端提早停止讀取時，關閉 HTTP 串流
+        await stream.close()
+
+
+async def print_updates(updates: AsyncIterator[Update], out: TextIO = sys.stdout) -> Optional[Update]:
+    """
+    在終端顯示更新：工具結果一回來就顯示，文字 delta 逐段輸出，最後顯示各階段時間
+
+    返回：
+        done 更新（含完整 Response 與時間），發生錯誤時為 None
+    """
+    done = None
+    async for update in updates:
+        kind = update["type"]
+        if kind == "tools_listed":
+            out.write(f"[{update['ms']:.0f}ms] 🔧 {update['server']} 工具：{', '.join(update['tools'])}\n")
+        elif kind == "tool_call":
+            out.write(f"[{update['ms']:.0f}ms] ▶ 呼叫 {update['name']}({update['arguments']})\n")
+        elif kind == "tool_result":
+            out.write(f"[{update['ms']:.0f}ms] ✔ {update['name']} → {update['output']}\n")
+        elif kind == "tool_error":
+            out.write(f"[{update['ms']:.0f}ms] ✘ {update['name']}：{update['error']}\n")
+        elif kind == "text":
+            out.write(update["text"])
+        elif kind == "error":
+            out.write(f"\n❌ {update['message']}\n")
+        elif kind == "done":
+            done = update
+            phases = {key: value for key, value in done["timings"].items() if key != "events"}
+            out.write(f"\n⏱ {phases}\n")
+        out.flush()
+    return done